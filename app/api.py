@@ -1,15 +1,71 @@
+import hmac
+import asyncio
 import reflex as rx
-from fastapi import FastAPI, Depends, UploadFile, File, Form, HTTPException
-from typing import Annotated, Optional
+from fastapi import (
+    FastAPI,
+    Depends,
+    HTTPException,
+    Request,
+    UploadFile,
+    File,
+    Form,
+    Header,
+    Query,
+)
+from fastapi.responses import Response, StreamingResponse
+from typing import Annotated, Literal, Optional
 from supabase import Client
-import logging
+from app.backend import services
 from app.backend.database import get_supabase_client
-from app.backend.auth import get_current_user_data, role_required
-from app.backend.utils import calculate_file_hash, generate_qr_code
-from app.backend.blockchain import notarize_hash, verify_hash_on_chain
-from app.backend.models import RecordCreate, RecordResponse, UserRole
+from app.backend.auth import get_current_user_data, role_required, admin_required
+from app.backend.utils import QR_MEDIA_TYPES
+from app.backend.export import EXPORT_MEDIA_TYPES
+from app.backend.ai_stream import sse_event
+from app.backend.metrics import (
+    METRICS_TOKEN,
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    render_metrics,
+)
+from app.backend.tracing import TracingMiddleware
+from app.backend.logs import RequestIdMiddleware
+from app.backend.profiler import (
+    PROFILER_MAX_SECONDS,
+    ProfilingMiddleware,
+    install_stack_dump_signal,
+)
+from app.backend.models import (
+    RecordFinalize,
+    RecordResponse,
+    UploadUrlRequest,
+    UploadUrlResponse,
+    UserRole,
+    SearchResponse,
+    CurrentUser,
+    ImportResult,
+)
 
 api = FastAPI(title="ArogyaChain API")
+api.add_middleware(TracingMiddleware)
+api.add_middleware(MetricsMiddleware)
+api.add_middleware(ProfilingMiddleware)
+api.add_middleware(RequestIdMiddleware)
+
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+async def cancel_on_disconnect(request: Request, coro):
+    """Awaits `coro`, cancelling it if the HTTP client goes away first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client closed request.")
+    finally:
+        task.cancel()
 
 
 @api.get("/api/health")
@@ -17,6 +73,20 @@ async def health_check():
     return {"status": "ok"}
 
 
+@api.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Annotated[Optional[str], Header()] = None):
+    if METRICS_TOKEN and not hmac.compare_digest(
+        authorization or "", f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token.")
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api.get("/api/me", response_model=CurrentUser)
+async def get_me(current_user=Depends(get_current_user_data)):
+    return current_user
+
+
 @api.post("/api/records/upload", response_model=RecordResponse)
 async def upload_record(
     patient_email: Annotated[str, Form()],
@@ -26,99 +96,34 @@ async def upload_record(
     current_user=Depends(role_required(UserRole.DOCTOR)),
     supabase: Client = Depends(get_supabase_client),
 ):
-    logging.info(f"Upload request from doctor: {current_user['email']}")
-    allowed_mime_types = ["application/pdf", "image/png", "image/jpeg", "image/jpg"]
-    if file.content_type not in allowed_mime_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type: {file.content_type}. Please upload a PDF, PNG, or JPG.",
-        )
-    try:
-        patient_res = (
-            supabase.table("users")
-            .select("id, role")
-            .eq("email", patient_email)
-            .single()
-            .execute()
-        )
-        if not patient_res.data or patient_res.data["role"] != UserRole.PATIENT.value:
-            raise HTTPException(status_code=404, detail="Patient not found.")
-        patient_id = patient_res.data["id"]
-    except Exception as e:
-        logging.exception(f"Error validating patient '{patient_email}': {e}")
-        raise HTTPException(status_code=500, detail="Error validating patient details.")
-    try:
-        file_content = await file.read()
-        file_hash = calculate_file_hash(file_content)
-        file_extension = file.filename.split(".")[-1]
-        file_path_in_storage = (
-            f"{current_user['id']}/{patient_id}/{file_hash}.{file_extension}"
-        )
-        supabase.storage.from_("records").upload(
-            file_path_in_storage,
-            file_content,
-            file_options={"content-type": file.content_type},
-        )
-        file_url = supabase.storage.from_("records").get_public_url(
-            file_path_in_storage
-        )
-    except Exception as e:
-        logging.exception(f"Failed to upload file to Supabase: {e}")
-        raise HTTPException(
-            status_code=500, detail="File upload failed during storage."
-        )
-    try:
-        tx_hash = notarize_hash(file_hash)
-        notarization_status = "success" if tx_hash else "pending"
-    except Exception as e:
-        logging.exception(f"Blockchain notarization failed: {e}")
-        tx_hash = None
-        notarization_status = "failed"
-    try:
-        record_data = {
-            "patient_id": patient_id,
-            "doctor_id": str(current_user["id"]),
-            "file_url": file_url,
-            "file_hash": file_hash,
-            "tx_hash": tx_hash,
-            "notarization_status": notarization_status,
-            "title": title,
-            "notes": notes,
-        }
-        inserted_record_res = supabase.table("records").insert(record_data).execute()
-        if not inserted_record_res.data:
-            raise Exception("No data returned from insert operation.")
-        new_record = inserted_record_res.data[0]
-    except Exception as e:
-        logging.exception(f"Failed to save record to database: {e}")
-        try:
-            supabase.storage.from_("records").remove([file_path_in_storage])
-            logging.info(f"Cleaned up orphaned file: {file_path_in_storage}")
-        except Exception as remove_e:
-            logging.exception(f"Failed to cleanup orphaned storage file: {remove_e}")
-        raise HTTPException(status_code=500, detail="Failed to save record metadata.")
-    try:
-        record_id = new_record["id"]
-        frontend_url = "http://localhost:3000"
-        qr_code_bytes = generate_qr_code(record_id, tx_hash, frontend_url)
-        qr_path = f"{record_id}_qr.png"
-        supabase.storage.from_("qrcodes").upload(
-            qr_path, qr_code_bytes, file_options={"content-type": "image/png"}
-        )
-        qr_url = supabase.storage.from_("qrcodes").get_public_url(qr_path)
-        updated_record = (
-            supabase.table("records")
-            .update({"qr_url": qr_url})
-            .eq("id", record_id)
-            .execute()
-            .data[0]
-        )
-        return RecordResponse(**updated_record)
-    except Exception as e:
-        logging.exception(f"Failed to upload QR code or finalize record: {e}")
-        raise HTTPException(
-            status_code=500, detail="Failed to generate and save QR code."
-        )
+    return await services.upload_record(
+        supabase,
+        current_user,
+        patient_email,
+        title,
+        notes,
+        await file.read(),
+        file.filename,
+        file.content_type,
+    )
+
+
+@api.post("/api/records/upload-url", response_model=UploadUrlResponse)
+async def create_upload_url(
+    upload_in: UploadUrlRequest,
+    current_user=Depends(role_required(UserRole.DOCTOR)),
+    supabase: Client = Depends(get_supabase_client),
+):
+    return await services.create_upload_url(supabase, current_user, upload_in)
+
+
+@api.post("/api/records/finalize", response_model=RecordResponse)
+async def finalize_upload(
+    finalize_in: RecordFinalize,
+    current_user=Depends(role_required(UserRole.DOCTOR)),
+    supabase: Client = Depends(get_supabase_client),
+):
+    return await services.finalize_upload(supabase, current_user, finalize_in)
 
 
 @api.get("/api/records", response_model=list[RecordResponse])
@@ -126,69 +131,155 @@ async def get_user_records(
     current_user=Depends(get_current_user_data),
     supabase: Client = Depends(get_supabase_client),
 ):
-    user_id = str(current_user["id"])
-    user_role = current_user["role"]
-    query_field = "patient_id" if user_role == UserRole.PATIENT else "doctor_id"
-    records_res = (
-        supabase.table("records")
-        .select("*")
-        .eq(query_field, user_id)
-        .order("created_at", desc=True)
-        .execute()
+    return await services.list_records(supabase, current_user)
+
+
+@api.get("/api/records/{record_id}/qr")
+async def record_qr_code(
+    record_id: str,
+    format: Literal["png", "svg"] = "png",
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    supabase: Client = Depends(get_supabase_client),
+):
+    qr_code_bytes, etag = await services.render_record_qr(
+        supabase, record_id, format, if_none_match
+    )
+    headers = {"Cache-Control": "public, no-cache", "ETag": etag}
+    if qr_code_bytes is None:
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=qr_code_bytes, media_type=QR_MEDIA_TYPES[format], headers=headers
     )
-    if not records_res.data:
-        return []
-    return [RecordResponse(**record) for record in records_res.data]
+
+
+@api.get("/api/search", response_model=SearchResponse)
+async def search(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    current_user=Depends(get_current_user_data),
+    supabase: Client = Depends(get_supabase_client),
+):
+    return await services.search(supabase, current_user, q, limit, offset)
 
 
 @api.get("/api/verify/{record_id}")
 async def verify_record_endpoint(
     record_id: str, supabase: Client = Depends(get_supabase_client)
 ):
-    record_res = (
-        supabase.table("records")
-        .select("id, title, created_at, file_hash, tx_hash")
-        .eq("id", record_id)
-        .single()
-        .execute()
+    return await services.verify_record(supabase, record_id)
+
+
+from app.backend.models import (
+    NoteCreate,
+    NoteUpdate,
+    NotePatch,
+    NoteResponse,
+    NotesPage,
+    MedicineInput,
+    MedicineBatchInput,
+    MedicineSuggestion,
+)
+from app.backend.gemini_service import MedicineLookup, MedicineBatchResponse
+
+
+@api.post("/api/ai/medicine-alternatives", response_model=Optional[MedicineLookup])
+async def medicine_alternatives(
+    medicine_in: MedicineInput,
+    request: Request,
+    current_user=Depends(get_current_user_data),
+):
+    return await cancel_on_disconnect(
+        request, services.medicine_alternatives(current_user, medicine_in.medicine_name)
     )
-    if not record_res.data:
-        raise HTTPException(status_code=404, detail="Record not found.")
-    record = record_res.data
-    file_hash = record["file_hash"]
-    verification_details = verify_hash_on_chain(file_hash)
-    if not verification_details:
-        raise HTTPException(
-            status_code=500, detail="Blockchain verification service is unavailable."
-        )
-    return {
-        "record": {
-            "id": record["id"],
-            "title": record["title"],
-            "created_at": record["created_at"],
-            "tx_hash": record["tx_hash"],
+
+
+@api.post("/api/ai/medicine-alternatives/batch", response_model=MedicineBatchResponse)
+async def medicine_alternatives_batch(
+    batch_in: MedicineBatchInput,
+    request: Request,
+    current_user=Depends(get_current_user_data),
+):
+    return await cancel_on_disconnect(
+        request,
+        services.medicine_alternatives_batch(current_user, batch_in.medicine_names),
+    )
+
+
+@api.get("/api/ai/usage")
+async def ai_usage(current_user=Depends(admin_required)):
+    return services.ai_usage_report()
+
+
+def folded_profile_response(profiler, name: str) -> Response:
+    return Response(
+        content=profiler.collapsed(),
+        media_type="text/plain",
+        headers={
+            "X-Profile-Samples": str(profiler.samples),
+            "Content-Disposition": f'attachment; filename="profile-{name}.folded"',
         },
-        "verification": verification_details,
-    }
+    )
 
 
-from app.backend.models import NoteCreate, NoteUpdate, NoteResponse, MedicineInput
-from app.backend.gemini_service import get_medicine_alternatives, MedicineInfo
+@api.post("/api/admin/profile")
+async def profile_worker(
+    seconds: Annotated[float, Query(gt=0, le=PROFILER_MAX_SECONDS)] = 10,
+    interval_ms: Annotated[int, Query(ge=1, le=1000)] = 10,
+    include_idle: bool = False,
+    loop_only: bool = False,
+    current_user=Depends(admin_required),
+):
+    profiler = await services.profile_worker(seconds, interval_ms, include_idle, loop_only)
+    return folded_profile_response(profiler, "worker")
 
 
-@api.post("/api/ai/medicine-alternatives", response_model=Optional[MedicineInfo])
-async def medicine_alternatives(
-    request: MedicineInput, current_user=Depends(get_current_user_data)
+@api.post("/api/admin/profile/requests")
+async def profile_requests(
+    route: Annotated[str, Query(min_length=1, max_length=200, pattern=r"^/")],
+    count: Annotated[int, Query(ge=1, le=1000)] = 10,
+    timeout: Annotated[float, Query(gt=0, le=PROFILER_MAX_SECONDS)] = 60,
+    interval_ms: Annotated[int, Query(ge=1, le=1000)] = 5,
+    include_idle: bool = False,
+    current_user=Depends(admin_required),
+):
+    profiler = await services.profile_matching_requests(
+        route, count, timeout, interval_ms, include_idle
+    )
+    return folded_profile_response(profiler, "requests")
+
+
+@api.get("/api/admin/tasks")
+async def async_tasks(current_user=Depends(admin_required)):
+    return services.dump_async_tasks()
+
+
+@api.get("/api/ai/medicines/suggest", response_model=list[MedicineSuggestion])
+async def suggest_medicines(
+    q: Annotated[str, Query(min_length=1, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=20)] = 8,
+    current_user=Depends(get_current_user_data),
+):
+    return await services.suggest_medicines(q, limit)
+
+
+@api.post("/api/ai/medicine-alternatives/stream")
+async def medicine_alternatives_stream(
+    medicine_in: MedicineInput, current_user=Depends(get_current_user_data)
 ):
-    logging.info(
-        f"Medicine alternative request for '{request.medicine_name}' from user: {current_user['email']}"
+    events = services.medicine_alternatives_stream(
+        current_user, medicine_in.medicine_name
+    )
+
+    async def event_stream():
+        async for event, data in events:
+            yield sse_event(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    alternatives = get_medicine_alternatives(request.medicine_name)
-    if not alternatives:
-        raise HTTPException(
-            status_code=503, detail="AI service is currently unavailable."
-        )
-    return alternatives
 
 
 @api.post("/api/notes", response_model=NoteResponse)
@@ -197,76 +288,91 @@ async def create_note(
     current_user=Depends(role_required(UserRole.PATIENT)),
     supabase: Client = Depends(get_supabase_client),
 ):
-    try:
-        note_data = note_in.dict()
-        note_data["patient_id"] = str(current_user["id"])
-        inserted_note_res = supabase.table("notes").insert(note_data).execute()
-        if not inserted_note_res.data:
-            raise HTTPException(status_code=500, detail="Failed to create note.")
-        return NoteResponse(**inserted_note_res.data[0])
-    except Exception as e:
-        logging.exception(f"Error creating note: {e}")
-        raise HTTPException(status_code=500, detail="Could not create note.")
-
-
-@api.get("/api/notes", response_model=list[NoteResponse])
+    return await services.create_note(supabase, current_user, note_in)
+
+
+@api.get("/api/notes", response_model=NotesPage)
 async def get_notes(
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    offset: Annotated[int, Query(ge=0)] = 0,
     current_user=Depends(role_required(UserRole.PATIENT)),
     supabase: Client = Depends(get_supabase_client),
 ):
-    user_id = str(current_user["id"])
-    notes_res = (
-        supabase.table("notes")
-        .select("*")
-        .eq("patient_id", user_id)
-        .order("updated_at", desc=True)
-        .execute()
-    )
-    return [NoteResponse(**note) for note in notes_res.data]
+    return await services.list_notes(supabase, current_user, limit, offset)
+
+
+@api.get("/api/notes/{note_id}", response_model=NoteResponse)
+async def get_note(
+    note_id: str,
+    response: Response,
+    current_user=Depends(role_required(UserRole.PATIENT)),
+    supabase: Client = Depends(get_supabase_client),
+):
+    note = await services.get_note(supabase, current_user, note_id)
+    response.headers["ETag"] = services.note_etag(note)
+    return note
 
 
 @api.put("/api/notes/{note_id}", response_model=NoteResponse)
 async def update_note(
     note_id: str,
     note_in: NoteUpdate,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
     current_user=Depends(role_required(UserRole.PATIENT)),
     supabase: Client = Depends(get_supabase_client),
 ):
-    user_id = str(current_user["id"])
-    existing_note_res = (
-        supabase.table("notes")
-        .select("id")
-        .eq("id", note_id)
-        .eq("patient_id", user_id)
-        .single()
-        .execute()
+    note = await services.update_note(
+        supabase, current_user, note_id, note_in, services.parse_if_match(if_match)
     )
-    if not existing_note_res.data:
-        raise HTTPException(status_code=404, detail="Note not found or access denied.")
-    updated_note_res = (
-        supabase.table("notes").update(note_in.dict()).eq("id", note_id).execute()
+    response.headers["ETag"] = services.note_etag(note)
+    return note
+
+
+@api.patch("/api/notes/{note_id}", response_model=NoteResponse)
+async def patch_note(
+    note_id: str,
+    patch: NotePatch,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
+    current_user=Depends(role_required(UserRole.PATIENT)),
+    supabase: Client = Depends(get_supabase_client),
+):
+    note = await services.patch_note(
+        supabase, current_user, note_id, patch, services.parse_if_match(if_match)
     )
-    if not updated_note_res.data:
-        raise HTTPException(status_code=500, detail="Failed to update note.")
-    return NoteResponse(**updated_note_res.data[0])
+    response.headers["ETag"] = services.note_etag(note)
+    return note
 
 
-@api.delete("/api/notes/{note_id}", status_code=204)
+@api.delete("/api/notes/{note_id}", response_model=NoteResponse)
 async def delete_note(
     note_id: str,
     current_user=Depends(role_required(UserRole.PATIENT)),
     supabase: Client = Depends(get_supabase_client),
 ):
-    user_id = str(current_user["id"])
-    delete_res = (
-        supabase.table("notes")
-        .delete()
-        .eq("id", note_id)
-        .eq("patient_id", user_id)
-        .execute()
+    return await services.delete_note(supabase, current_user, note_id)
+
+
+@api.get("/api/export")
+async def export_data(
+    format: Literal["ndjson", "fhir"] = "ndjson",
+    current_user=Depends(role_required(UserRole.PATIENT)),
+    supabase: Client = Depends(get_supabase_client),
+):
+    return StreamingResponse(
+        services.export_patient_data(supabase, current_user, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="arogyachain-export.{format}"'
+        },
     )
-    if not delete_res.data:
-        raise HTTPException(
-            status_code=404, detail="Note not found or could not be deleted."
-        )
-    return
\ No newline at end of file
+
+
+@api.post("/api/import", response_model=ImportResult)
+async def import_data(
+    file: UploadFile = File(...),
+    current_user=Depends(role_required(UserRole.PATIENT)),
+    supabase: Client = Depends(get_supabase_client),
+):
+    return await services.import_notes(supabase, current_user, file)
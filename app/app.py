@@ -1,7 +1,7 @@
 import reflex as rx
 from app.states.state import AuthState
 from app.states.dashboard import DashboardState
-from app.states.upload import UploadState
+from app.states.upload import UploadState, DIRECT_UPLOADS, FILE_INPUT_ID
 
 
 def login_input(
@@ -267,7 +267,12 @@ def dashboard() -> rx.Component:
     )
 
 
-from app.states.notes import NotesState, Note
+from app.states.notes import (
+    NotesState,
+    Note,
+    AUTOSAVE_DEBOUNCE_MS,
+    SUGGEST_DEBOUNCE_MS,
+)
 
 
 def note_modal() -> rx.Component:
@@ -284,24 +289,41 @@ def note_modal() -> rx.Component:
                         name="title",
                         class_name="w-full p-2 border rounded",
                         default_value=NotesState.current_title,
-                        key=NotesState.current_note_id | "new",
+                        key=NotesState.editor_key,
+                        disabled=NotesState.is_loading_note,
+                        on_change=NotesState.set_draft_title.debounce(
+                            AUTOSAVE_DEBOUNCE_MS
+                        ),
                     ),
                     class_name="space-y-2",
                 ),
                 rx.el.div(
                     rx.el.label("Content"),
-                    rx.el.textarea(
-                        name="content",
-                        default_value=NotesState.current_content,
-                        class_name="w-full p-2 border rounded",
-                        rows=8,
-                        key=NotesState.current_note_id | "new",
+                    rx.cond(
+                        NotesState.is_loading_note,
+                        rx.el.div(
+                            class_name="h-40 w-full bg-gray-100 rounded animate-pulse"
+                        ),
+                        rx.el.textarea(
+                            name="content",
+                            default_value=NotesState.current_content,
+                            class_name="w-full p-2 border rounded",
+                            rows=8,
+                            key=NotesState.editor_key,
+                            on_change=NotesState.set_draft_content.debounce(
+                                AUTOSAVE_DEBOUNCE_MS
+                            ),
+                        ),
                     ),
                     class_name="space-y-2",
                 ),
                 rx.el.div(
+                    rx.el.p(
+                        NotesState.autosave_status,
+                        class_name="mr-auto self-center text-xs text-gray-500",
+                    ),
                     rx.el.button(
-                        "Cancel",
+                        "Close",
                         on_click=NotesState.close_note_modal,
                         type="button",
                         class_name="px-4 py-2 bg-gray-200 rounded",
@@ -309,7 +331,8 @@ def note_modal() -> rx.Component:
                     rx.el.button(
                         "Save Note",
                         type="submit",
-                        class_name="px-4 py-2 bg-blue-600 text-white rounded",
+                        disabled=NotesState.is_loading_note,
+                        class_name="px-4 py-2 bg-blue-600 text-white rounded disabled:opacity-50",
                     ),
                     class_name="flex justify-end gap-4 mt-4",
                 ),
@@ -319,7 +342,7 @@ def note_modal() -> rx.Component:
             style={"max_width": "500px"},
         ),
         open=NotesState.show_note_modal,
-        on_open_change=NotesState.set_show_note_modal,
+        on_open_change=NotesState.set_modal_open,
     )
 
 
@@ -334,8 +357,8 @@ def note_card(note: Note) -> rx.Component:
             class_name="flex justify-between items-start",
         ),
         rx.el.p(
-            note["content"].to_string()[:100] + "...",
-            class_name="text-sm text-gray-700 mt-2",
+            note["preview"],
+            class_name="text-sm text-gray-700 mt-2 line-clamp-3",
         ),
         rx.el.div(
             rx.el.button(
@@ -366,9 +389,21 @@ def ai_medicine_assistant() -> rx.Component:
         rx.el.div(
             rx.el.input(
                 placeholder="Enter a medicine name (e.g., Aspirin)",
-                on_change=NotesState.set_medicine_input,
+                on_change=NotesState.update_medicine_input.debounce(
+                    SUGGEST_DEBOUNCE_MS
+                ),
+                list="medicine-suggestions",
                 class_name="flex-1 px-4 py-2 border border-gray-300 rounded-l-lg focus:ring-blue-500 focus:border-blue-500",
             ),
+            rx.el.datalist(
+                rx.foreach(
+                    NotesState.medicine_suggestions,
+                    lambda suggestion: rx.el.option(
+                        suggestion["generic"], value=suggestion["name"]
+                    ),
+                ),
+                id="medicine-suggestions",
+            ),
             rx.el.button(
                 rx.icon("search", class_name="h-4 w-4 mr-2"),
                 "Get Alternatives",
@@ -418,6 +453,13 @@ def ai_medicine_assistant() -> rx.Component:
                         NotesState.alternatives_result["notes"],
                         class_name="text-xs text-gray-600 mt-3 p-3 bg-yellow-50 border-l-4 border-yellow-400 rounded-r-lg",
                     ),
+                    rx.cond(
+                        NotesState.alternatives_result["stale"],
+                        rx.el.p(
+                            "Showing a saved result because the AI service is unavailable.",
+                            class_name="text-xs text-gray-500 mt-2",
+                        ),
+                    ),
                     class_name="p-4 border rounded-lg bg-white mt-4",
                 ),
                 rx.cond(
@@ -476,8 +518,18 @@ def notes() -> rx.Component:
                         rx.cond(
                             NotesState.notes,
                             rx.el.div(
-                                rx.foreach(NotesState.notes, note_card),
-                                class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6",
+                                rx.el.div(
+                                    rx.foreach(NotesState.notes, note_card),
+                                    class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6",
+                                ),
+                                rx.cond(
+                                    NotesState.notes_has_more,
+                                    rx.el.button(
+                                        "Load more",
+                                        on_click=NotesState.fetch_more_notes,
+                                        class_name="mt-6 mx-auto block px-4 py-2 bg-gray-100 text-gray-700 font-medium rounded-lg hover:bg-gray-200",
+                                    ),
+                                ),
                             ),
                             rx.el.div(
                                 rx.icon(
@@ -506,14 +558,18 @@ def notes() -> rx.Component:
 
 
 from app.states.dashboard import Record
-from app.states.upload import UploadState
 
 
 def record_card(record: Record) -> rx.Component:
     return rx.el.div(
         rx.el.a(
             rx.image(
-                src=record.get("qr_url", "/placeholder.svg"),
+                src=rx.cond(
+                    record["thumbnail_url"],
+                    record["thumbnail_url"],
+                    record.get("qr_url", "/placeholder.svg"),
+                ),
+                loading="lazy",
                 class_name="w-full h-40 object-cover rounded-t-lg",
             ),
             href=f"/verify/{record.get('id', '')}",
@@ -600,6 +656,62 @@ def records() -> rx.Component:
     )
 
 
+def record_file_picker() -> rx.Component:
+    """Native file input for direct-to-storage uploads, dropzone otherwise."""
+    if DIRECT_UPLOADS:
+        return rx.el.label(
+            rx.icon(
+                "cloud-upload",
+                class_name="h-10 w-10 text-gray-400 mx-auto",
+            ),
+            rx.el.p(
+                "Choose a file to upload",
+                class_name="mt-2 text-sm font-medium text-gray-600",
+            ),
+            rx.el.p(
+                "PDF, PNG, JPG (max. 10MB)",
+                class_name="text-xs text-gray-500",
+            ),
+            rx.el.input(
+                type="file",
+                id=FILE_INPUT_ID,
+                accept=".pdf,.png,.jpg,.jpeg",
+                class_name="mt-4 text-sm text-gray-600",
+            ),
+            html_for=FILE_INPUT_ID,
+            border="2px dashed #d1d5db",
+            class_name="w-full mt-6 flex flex-col items-center justify-center p-6 rounded-lg cursor-pointer bg-gray-50 hover:bg-gray-100 transition-colors",
+        )
+    return rx.upload.root(
+        rx.el.div(
+            rx.icon(
+                "cloud-upload",
+                class_name="h-10 w-10 text-gray-400 mx-auto",
+            ),
+            rx.el.p(
+                "Click to upload or drag and drop",
+                class_name="mt-2 text-sm font-medium text-gray-600",
+            ),
+            rx.el.p(
+                "PDF, PNG, JPG (max. 10MB)",
+                class_name="text-xs text-gray-500",
+            ),
+            border="2px dashed #d1d5db",
+            class_name="w-full mt-6 flex flex-col items-center justify-center p-6 rounded-lg cursor-pointer bg-gray-50 hover:bg-gray-100 transition-colors",
+        ),
+        id="upload1",
+        multiple=False,
+        accept={
+            "application/pdf": [".pdf"],
+            "image/png": [".png"],
+            "image/jpeg": [".jpg", ".jpeg"],
+        },
+        on_drop=UploadState.handle_upload(
+            rx.upload_files(upload_id="upload1")
+        ),
+    )
+
+
 def upload() -> rx.Component:
     return rx.el.div(
         sidebar(),
@@ -656,36 +768,11 @@ def upload() -> rx.Component:
                         ),
                         class_name="mt-6",
                     ),
-                    rx.upload.root(
-                        rx.el.div(
-                            rx.icon(
-                                "cloud-upload",
-                                class_name="h-10 w-10 text-gray-400 mx-auto",
-                            ),
-                            rx.el.p(
-                                "Click to upload or drag and drop",
-                                class_name="mt-2 text-sm font-medium text-gray-600",
-                            ),
-                            rx.el.p(
-                                "PDF, PNG, JPG (max. 10MB)",
-                                class_name="text-xs text-gray-500",
-                            ),
-                            border="2px dashed #d1d5db",
-                            class_name="w-full mt-6 flex flex-col items-center justify-center p-6 rounded-lg cursor-pointer bg-gray-50 hover:bg-gray-100 transition-colors",
-                        ),
-                        id="upload1",
-                        multiple=False,
-                        accept={
-                            "application/pdf": [".pdf"],
-                            "image/png": [".png"],
-                            "image/jpeg": [".jpg", ".jpeg"],
-                        },
-                        on_drop=UploadState.handle_upload(
-                            rx.upload_files(upload_id="upload1")
-                        ),
-                    ),
+                    record_file_picker(),
                     rx.el.div(
-                        rx.foreach(
+                        rx.fragment()
+                        if DIRECT_UPLOADS
+                        else rx.foreach(
                             rx.selected_files("upload1"),
                             lambda file: rx.el.div(
                                 rx.el.p(file, class_name="font-medium"),
@@ -708,12 +795,16 @@ def upload() -> rx.Component:
                         rx.el.button(
                             rx.icon("check", class_name="h-4 w-4 mr-2"),
                             "Submit Record",
-                            on_click=[
-                                UploadState.handle_upload(
-                                    rx.upload_files(upload_id="upload1")
-                                ),
-                                UploadState.submit_record,
-                            ],
+                            on_click=(
+                                UploadState.start_direct_upload
+                                if DIRECT_UPLOADS
+                                else [
+                                    UploadState.handle_upload(
+                                        rx.upload_files(upload_id="upload1")
+                                    ),
+                                    UploadState.submit_record,
+                                ]
+                            ),
                             disabled=UploadState.is_uploading,
                             class_name="flex items-center justify-center px-6 py-3 border border-transparent text-base font-medium rounded-md shadow-sm text-white bg-blue-600 hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50",
                         ),
@@ -729,8 +820,11 @@ def upload() -> rx.Component:
     )
 
 
+from app.backend.logs import configure_logging
 from app.api import api as fastapi_app
 
+configure_logging()
+
 app = rx.App(
     theme=rx.theme(appearance="light"),
     head_components=[
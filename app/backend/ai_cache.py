@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from cachetools import LRUCache
+
+APP_CACHE_DIR = os.environ.get(
+    "APP_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "arogyachain"),
+)
+AI_CACHE_PATH = os.environ.get("AI_CACHE_PATH", os.path.join(APP_CACHE_DIR, "ai_cache.db"))
+AI_CACHE_TTL_SECONDS = int(os.environ.get("AI_CACHE_TTL_SECONDS", str(30 * 86400)))
+AI_CACHE_MEMORY_SIZE = int(os.environ.get("AI_CACHE_MEMORY_SIZE", "1024"))
+
+SALT_FORM_SUFFIXES = {
+    "hydrochloride",
+    "hcl",
+    "hydrobromide",
+    "sodium",
+    "potassium",
+    "calcium",
+    "magnesium",
+    "sulfate",
+    "sulphate",
+    "phosphate",
+    "maleate",
+    "besylate",
+    "besilate",
+    "citrate",
+    "tartrate",
+    "mesylate",
+    "succinate",
+    "fumarate",
+    "acetate",
+    "bromide",
+    "dihydrate",
+    "monohydrate",
+    "trihydrate",
+}
+
+# Cations and minerals that are the active ingredient of their salts, so
+# 'magnesium sulfate' and 'magnesium citrate' must not both become 'magnesium'.
+MINERAL_NAMES = {
+    "sodium",
+    "potassium",
+    "calcium",
+    "magnesium",
+    "zinc",
+    "iron",
+    "ferrous",
+    "ferric",
+    "lithium",
+    "aluminium",
+    "aluminum",
+    "ammonium",
+    "copper",
+    "cupric",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.-][a-z0-9]+)*")
+
+
+def normalize_medicine_name(medicine_name: str) -> str:
+    """Cache key for a medicine, e.g. 'Metformin  HCl' and 'metformin' both map to 'metformin'.
+
+    Salt suffixes are only dropped when a drug name remains; mineral salts such
+    as 'zinc sulfate' keep their full name.
+    """
+    words = _WORD_RE.findall(medicine_name.lower())
+    stripped = list(words)
+    while len(stripped) > 1 and stripped[-1] in SALT_FORM_SUFFIXES:
+        stripped.pop()
+    if all(word in MINERAL_NAMES or word in SALT_FORM_SUFFIXES for word in stripped):
+        return " ".join(words)
+    return " ".join(stripped)
+
+
+class MedicineCache:
+    """Two-tier cache of validated Gemini results: an in-process LRU over SQLite.
+
+    Entries older than `ttl` are still returned, flagged stale, so callers can
+    refresh them and fall back to the stale value when the model is unavailable.
+    """
+
+    def __init__(self, path: str, ttl: int, memory_size: int):
+        self.ttl = ttl
+        self._memory: LRUCache = LRUCache(maxsize=memory_size)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS medicine_cache (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                cached_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, cache_key: str) -> tuple[dict, float] | None:
+        """Returns (payload, cached_at) from memory, then disk, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is not None:
+                return entry
+            row = self._conn.execute(
+                "SELECT payload, cached_at FROM medicine_cache WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (json.loads(row[0]), row[1])
+            self._memory[cache_key] = entry
+            return entry
+
+    def set(self, cache_key: str, payload: dict):
+        entry = (payload, time.time())
+        with self._lock:
+            self._memory[cache_key] = entry
+            self._conn.execute(
+                "INSERT OR REPLACE INTO medicine_cache (cache_key, payload, cached_at) "
+                "VALUES (?, ?, ?)",
+                (cache_key, json.dumps(payload), entry[1]),
+            )
+            self._conn.commit()
+
+    def is_stale(self, cached_at: float) -> bool:
+        return time.time() - cached_at > self.ttl
+
+    def purge_expired(self, max_age: int):
+        """Drops disk entries older than `max_age` seconds; stale ones are kept until then."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM medicine_cache WHERE cached_at < ?", (time.time() - max_age,)
+            )
+            self._conn.commit()
+
+
+@lru_cache
+def get_medicine_cache() -> MedicineCache:
+    cache = MedicineCache(AI_CACHE_PATH, AI_CACHE_TTL_SECONDS, AI_CACHE_MEMORY_SIZE)
+    try:
+        cache.purge_expired(AI_CACHE_TTL_SECONDS * 4)
+    except sqlite3.Error as e:
+        logging.exception("Failed to purge expired medicine cache entries: %s", e)
+    return cache
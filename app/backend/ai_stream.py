@@ -0,0 +1,84 @@
+import json
+import logging
+from pydantic import BaseModel, ValidationError
+
+
+class ArrayItemStreamParser:
+    """Pulls complete objects out of a JSON array while the document is still arriving.
+
+    Fed the model's partial output chunk by chunk, it finds the array under
+    `array_key` and returns each element as soon as its closing brace is seen,
+    validated against `item_model`.
+    """
+
+    def __init__(self, array_key: str, item_model: type[BaseModel]):
+        self._marker = f'"{array_key}"'
+        self._item_model = item_model
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._array_done = False
+        self._depth = 0
+        self._item_start = None
+        self._in_string = False
+        self._escaped = False
+
+    def _find_array_start(self) -> bool:
+        marker_at = self._buffer.find(self._marker)
+        if marker_at < 0:
+            return False
+        bracket_at = self._buffer.find("[", marker_at + len(self._marker))
+        if bracket_at < 0:
+            return False
+        self._pos = bracket_at + 1
+        self._in_array = True
+        return True
+
+    def feed(self, text: str) -> list[BaseModel]:
+        self._buffer += text
+        if self._array_done or (not self._in_array and not self._find_array_start()):
+            return []
+        items = []
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._item_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    item = self._parse_item(buffer[self._item_start : self._pos + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = None
+            elif char == "]" and self._depth == 0:
+                self._array_done = True
+                self._pos += 1
+                break
+            self._pos += 1
+        return items
+
+    def _parse_item(self, raw: str) -> BaseModel | None:
+        try:
+            return self._item_model.model_validate(json.loads(raw))
+        except (ValueError, ValidationError) as e:
+            logging.warning("Skipping malformed streamed item: %s", e)
+            return None
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    """Formats one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode(
+        "utf-8"
+    )
@@ -0,0 +1,206 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from cachetools import LRUCache
+from app.backend.database import get_supabase_client
+from app.backend.metrics import timed_execute
+
+AI_USAGE_TABLE = "ai_usage"
+AI_USAGE_FLUSH_SIZE = int(os.environ.get("AI_USAGE_FLUSH_SIZE", "200"))
+AI_USAGE_FLUSH_SECONDS = float(os.environ.get("AI_USAGE_FLUSH_SECONDS", "30"))
+AI_USAGE_TRACKED_KEYS = 10000
+AI_QUOTA_REQUESTS = int(os.environ.get("AI_QUOTA_REQUESTS", "30"))
+AI_QUOTA_WINDOW_SECONDS = float(os.environ.get("AI_QUOTA_WINDOW_SECONDS", "600"))
+
+current_ai_user: ContextVar[str | None] = ContextVar("current_ai_user", default=None)
+
+_flush_tasks: set[asyncio.Task] = set()
+
+
+class UsageMeter:
+    """Aggregates AI usage in memory and buffers raw events for batched persistence.
+
+    Two kinds of event are recorded: a "lookup" per medicine answered (with where
+    the answer came from), and an "upstream" per Gemini call (tokens and latency).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: list[dict] = []
+        self._last_flush = time.monotonic()
+        self.totals: Counter = Counter()
+        self.by_user: LRUCache = LRUCache(maxsize=AI_USAGE_TRACKED_KEYS)
+        self.by_medicine: LRUCache = LRUCache(maxsize=AI_USAGE_TRACKED_KEYS)
+
+    def _bump(self, table: LRUCache, key: str | None, counts: dict):
+        if key is None:
+            return
+        counter = table.get(key)
+        if counter is None:
+            counter = table[key] = Counter()
+        counter.update(counts)
+
+    def record(self, event: dict) -> bool:
+        """Adds one event; returns True when the buffer is due to be flushed."""
+        if event["kind"] == "lookup":
+            counts = {"lookups": 1, f"source_{event['source']}": 1}
+        else:
+            counts = {
+                "upstream_calls": 1,
+                "upstream_errors": 0 if event["ok"] else 1,
+                "prompt_tokens": event["prompt_tokens"],
+                "response_tokens": event["response_tokens"],
+                "upstream_latency_ms": event["latency_ms"],
+            }
+        with self._lock:
+            self.totals.update(counts)
+            self._bump(self.by_user, event["user_id"], counts)
+            self._bump(self.by_medicine, event["medicine"], counts)
+            self._pending.append(event)
+            return (
+                len(self._pending) >= AI_USAGE_FLUSH_SIZE
+                or time.monotonic() - self._last_flush >= AI_USAGE_FLUSH_SECONDS
+            )
+
+    def drain(self) -> list[dict]:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        return pending
+
+    def summary(self, top: int = 10) -> dict:
+        def ranked(table: LRUCache, field: str) -> list[dict]:
+            rows = sorted(table.items(), key=lambda item: -item[1][field])[:top]
+            return [{"key": key, **counts} for key, counts in rows]
+
+        with self._lock:
+            totals = dict(self.totals)
+            lookups = totals.get("lookups", 0)
+            upstream_calls = totals.get("upstream_calls", 0)
+            return {
+                "totals": totals,
+                "local_hit_ratio": (
+                    (totals.get("source_catalog", 0) + totals.get("source_cache", 0))
+                    / lookups
+                    if lookups
+                    else None
+                ),
+                "avg_upstream_latency_ms": (
+                    totals.get("upstream_latency_ms", 0) / upstream_calls
+                    if upstream_calls
+                    else None
+                ),
+                "top_users_by_tokens": ranked(self.by_user, "prompt_tokens"),
+                "top_medicines_by_lookups": ranked(self.by_medicine, "lookups"),
+                "top_medicines_by_upstream_calls": ranked(self.by_medicine, "upstream_calls"),
+                "pending_events": len(self._pending),
+            }
+
+
+_meter = UsageMeter()
+
+
+def _event(kind: str, medicine: str | None, **fields) -> dict:
+    return {
+        "kind": kind,
+        "user_id": current_ai_user.get(),
+        "medicine": medicine,
+        "source": None,
+        "prompt_tokens": 0,
+        "response_tokens": 0,
+        "latency_ms": 0,
+        "ok": True,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **fields,
+    }
+
+
+def _persist(events: list[dict]):
+    timed_execute(
+        get_supabase_client().table(AI_USAGE_TABLE).insert(events), f"{AI_USAGE_TABLE}.insert"
+    )
+
+
+async def flush_ai_usage():
+    events = _meter.drain()
+    if not events:
+        return
+    try:
+        await asyncio.to_thread(_persist, events)
+    except Exception as e:
+        logging.exception("Failed to persist %s AI usage events: %s", len(events), e)
+
+
+def _record(event: dict):
+    if not _meter.record(event):
+        return
+    try:
+        task = asyncio.get_running_loop().create_task(flush_ai_usage())
+    except RuntimeError:
+        return
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+
+
+def record_lookup(medicine: str, source: str, latency_seconds: float):
+    _record(
+        _event("lookup", medicine, source=source, latency_ms=int(latency_seconds * 1000))
+    )
+
+
+def record_upstream(
+    medicine: str | None,
+    latency_seconds: float,
+    usage_metadata=None,
+    ok: bool = True,
+):
+    """Records one Gemini call, reading token counts from the response's usage_metadata."""
+    _record(
+        _event(
+            "upstream",
+            medicine,
+            source="gemini",
+            prompt_tokens=getattr(usage_metadata, "prompt_token_count", None) or 0,
+            response_tokens=getattr(usage_metadata, "candidates_token_count", None) or 0,
+            latency_ms=int(latency_seconds * 1000),
+            ok=ok,
+        )
+    )
+
+
+def ai_usage_summary(top: int = 10) -> dict:
+    return _meter.summary(top)
+
+
+class SlidingWindowQuota:
+    """Per-user request quota over a sliding time window."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._hits: LRUCache = LRUCache(maxsize=AI_USAGE_TRACKED_KEYS)
+
+    def consume(self, user_id: str, cost: int = 1) -> float | None:
+        """Takes `cost` units for the user; returns seconds to wait if over quota."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(user_id)
+            if hits is None:
+                hits = self._hits[user_id] = deque()
+            while hits and hits[0] <= now - self.window_seconds:
+                hits.popleft()
+            if len(hits) + cost > self.limit:
+                if not hits:
+                    return self.window_seconds
+                return max(hits[0] + self.window_seconds - now, 0.0)
+            hits.extend([now] * cost)
+            return None
+
+
+ai_quota = SlidingWindowQuota(AI_QUOTA_REQUESTS, AI_QUOTA_WINDOW_SECONDS)
@@ -1,20 +1,44 @@
 import os
-import os
+import threading
 from functools import wraps
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from supabase import create_client, Client
 import logging
 from app.backend.database import get_supabase_client
+from app.backend.metrics import timed_execute, track
+from app.backend.tracing import span
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/token")
 
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.environ.get("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+# Opt-in: while a token is cached, revocation, logout and role changes are not
+# seen, so the TTL is capped at a few seconds. 0 (the default) disables it.
+AUTH_CACHE_MAX_TTL_SECONDS = 5
+AUTH_CACHE_TTL_SECONDS = min(
+    float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "0")), AUTH_CACHE_MAX_TTL_SECONDS
+)
+_user_cache: TTLCache | None = (
+    TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL_SECONDS) if AUTH_CACHE_TTL_SECONDS > 0 else None
+)
+_user_cache_lock = threading.Lock()
 
-def get_current_user_data(
-    token: str = Depends(reusable_oauth2), client: Client = Depends(get_supabase_client)
-):
+
+def authenticate_token(client: Client, token: str) -> dict:
+    """Resolves a bearer token to the user and role, optionally caching results briefly."""
+    if _user_cache is not None:
+        with _user_cache_lock:
+            cached_user = _user_cache.get(token)
+        if cached_user:
+            return cached_user
     try:
-        user_response = client.auth.get_user(token)
+        with track("supabase", "auth.get_user"):
+            user_response = client.auth.get_user(token)
         user = user_response.user
         if not user:
             raise HTTPException(
@@ -22,32 +46,57 @@ def get_current_user_data(
                 detail="Invalid authentication credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        db_user_res = (
+        db_user_res = timed_execute(
             client.table("users")
             .select("id, role")
             .eq("id", str(user.id))
-            .single()
-            .execute()
+            .single(),
+            "users.select",
         )
         if not db_user_res.data:
             raise HTTPException(status_code=404, detail="User not found in database")
-        return {**user.dict(), "role": db_user_res.data["role"]}
+        user_data = {**user.dict(), "role": db_user_res.data["role"]}
     except Exception as e:
-        logging.exception(f"Authentication error: {e}")
+        logging.exception("Authentication error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if _user_cache is not None:
+        with _user_cache_lock:
+            _user_cache[token] = user_data
+    return user_data
+
+
+def get_current_user_data(
+    token: str = Depends(reusable_oauth2), client: Client = Depends(get_supabase_client)
+):
+    with span("auth"):
+        return authenticate_token(client, token)
+
+
+def ensure_role(current_user: dict, required_role: str):
+    if not current_user or current_user.get("role") != required_role:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Operation not permitted. Requires '{required_role}' role.",
+        )
 
 
 def role_required(required_role: str):
     def role_checker(current_user: dict = Depends(get_current_user_data)):
-        if not current_user or current_user.get("role") != required_role:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Operation not permitted. Requires '{required_role}' role.",
-            )
+        ensure_role(current_user, required_role)
         return current_user
 
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+
+def admin_required(current_user: dict = Depends(get_current_user_data)):
+    """Restricts ops endpoints to the accounts listed in ADMIN_EMAILS."""
+    if (current_user.get("email") or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operation not permitted. Requires admin access.",
+        )
+    return current_user
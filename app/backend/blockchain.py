@@ -1,6 +1,7 @@
 import os
 import logging
 from web3 import Web3
+from app.backend.metrics import track
 
 ALCHEMY_URL = os.environ.get("ALCHEMY_URL")
 DEPLOYER_PRIVATE_KEY = os.environ.get("DEPLOYER_PRIVATE_KEY")
@@ -23,22 +24,24 @@ def notarize_hash(record_hash: str) -> str | None:
             "Blockchain environment variables not set. Simulating notarization."
         )
         return f"0x_simulated_{record_hash[:16]}"
-    try:
-        account = w3.eth.account.from_key(DEPLOYER_PRIVATE_KEY)
-        contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
-        tx = contract.functions.addRecord(record_hash).build_transaction(
-            {
-                "from": account.address,
-                "nonce": w3.eth.get_transaction_count(account.address),
-            }
-        )
-        signed_tx = w3.eth.account.sign_transaction(tx, DEPLOYER_PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        logging.info(f"Notarized hash {record_hash} with tx: {tx_hash.hex()}")
-        return tx_hash.hex()
-    except Exception as e:
-        logging.exception(f"Error notarizing hash on blockchain: {e}")
-        return None
+    with track("web3", "notarize") as timer:
+        try:
+            account = w3.eth.account.from_key(DEPLOYER_PRIVATE_KEY)
+            contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+            tx = contract.functions.addRecord(record_hash).build_transaction(
+                {
+                    "from": account.address,
+                    "nonce": w3.eth.get_transaction_count(account.address),
+                }
+            )
+            signed_tx = w3.eth.account.sign_transaction(tx, DEPLOYER_PRIVATE_KEY)
+            tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            logging.info("Notarized hash %s with tx: %s", record_hash, tx_hash.hex())
+            return tx_hash.hex()
+        except Exception as e:
+            timer.fail()
+            logging.exception("Error notarizing hash on blockchain: %s", e)
+            return None
 
 
 def verify_hash_on_chain(record_hash: str) -> dict | None:
@@ -61,17 +64,19 @@ def verify_hash_on_chain(record_hash: str) -> dict | None:
             "doctor_address": None,
             "error": "Blockchain not configured or invalid hash",
         }
-    try:
-        contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
-        is_verified, doctor_address, timestamp = contract.functions.verifyRecord(
-            record_hash
-        ).call()
-        return {
-            "is_verified": is_verified,
-            "timestamp": timestamp,
-            "doctor_address": doctor_address,
-            "error": None,
-        }
-    except Exception as e:
-        logging.exception(f"Error verifying hash on blockchain: {e}")
-        return None
\ No newline at end of file
+    with track("web3", "verify") as timer:
+        try:
+            contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+            is_verified, doctor_address, timestamp = contract.functions.verifyRecord(
+                record_hash
+            ).call()
+            return {
+                "is_verified": is_verified,
+                "timestamp": timestamp,
+                "doctor_address": doctor_address,
+                "error": None,
+            }
+        except Exception as e:
+            timer.fail()
+            logging.exception("Error verifying hash on blockchain: %s", e)
+            return None
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+import json
+import bisect
+import difflib
+import logging
+from functools import lru_cache
+from app.backend.ai_cache import normalize_medicine_name
+
+MEDICINE_CATALOG_PATH = os.environ.get(
+    "MEDICINE_CATALOG_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "medicine_catalog.json"),
+)
+SUGGESTION_LIMIT = 8
+
+
+class MedicineCatalog:
+    """In-memory brand/generic index with exact lookup and prefix/fuzzy typeahead.
+
+    Every brand and generic name maps to its catalog entry by normalized key. Keys
+    are also kept sorted, so prefix queries are a bisect plus a short scan.
+    """
+
+    def __init__(self, medicines: list[dict], notes: str):
+        self.notes = notes
+        self._entries = medicines
+        self._names: dict[str, tuple[str, int]] = {}
+        for position, medicine in enumerate(medicines):
+            for name in [medicine["generic"], *medicine.get("brands", [])]:
+                key = normalize_medicine_name(name)
+                if key:
+                    self._names.setdefault(key, (name, position))
+        self._keys = sorted(self._names)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _prefix_keys(self, prefix: str, limit: int) -> list[str]:
+        start = bisect.bisect_left(self._keys, prefix)
+        keys = []
+        for key in self._keys[start:]:
+            if not key.startswith(prefix) or len(keys) >= limit:
+                break
+            keys.append(key)
+        return keys
+
+    def match(self, medicine_name: str) -> dict | None:
+        """Returns a MedicineInfo-shaped answer for an exact brand or generic name.
+
+        Near misses are not answered here: 'citalopram' is one edit away from
+        'escitalopram', so a fuzzy hit would be a different drug. They fall
+        through to the model instead.
+        """
+        key = normalize_medicine_name(medicine_name)
+        if key not in self._names:
+            return None
+        display_name, position = self._names[key]
+        medicine = self._entries[position]
+        price_bands = medicine["price_bands"]
+        alternatives = [
+            {"name": f"{medicine['generic']} (generic)", "price_range": price_bands["generic"]}
+        ]
+        alternatives += [
+            {"name": f"{brand} (brand)", "price_range": price_bands["brand"]}
+            for brand in medicine.get("brands", [])
+        ]
+        return {
+            "medicine_name": display_name,
+            "generic_alternatives": alternatives,
+            "notes": medicine.get("notes", self.notes),
+        }
+
+    def suggest(self, query: str, limit: int = SUGGESTION_LIMIT) -> list[dict]:
+        """Typeahead: prefix matches first, topped up with fuzzy matches for typos."""
+        prefix = normalize_medicine_name(query)
+        if not prefix:
+            return []
+        keys = self._prefix_keys(prefix, limit)
+        if len(keys) < limit:
+            for key in difflib.get_close_matches(prefix, self._keys, n=limit, cutoff=0.6):
+                if key not in keys:
+                    keys.append(key)
+        suggestions = []
+        for key in keys[:limit]:
+            name, position = self._names[key]
+            suggestions.append({"name": name, "generic": self._entries[position]["generic"]})
+        return suggestions
+
+
+@lru_cache
+def get_medicine_catalog() -> MedicineCatalog:
+    try:
+        with open(MEDICINE_CATALOG_PATH, encoding="utf-8") as catalog_file:
+            catalog_data = json.load(catalog_file)
+    except (OSError, ValueError) as e:
+        logging.exception("Failed to load medicine catalog %s: %s", MEDICINE_CATALOG_PATH, e)
+        catalog_data = {"medicines": [], "notes": ""}
+    catalog = MedicineCatalog(catalog_data["medicines"], catalog_data.get("notes", ""))
+    logging.info("Loaded %s medicines from %s", len(catalog), MEDICINE_CATALOG_PATH)
+    return catalog
@@ -0,0 +1,316 @@
+import os
+import json
+import asyncio
+import httpx
+from functools import lru_cache
+from fastapi import HTTPException
+from app.backend import services
+from app.backend.auth import authenticate_token
+from app.backend.database import get_supabase_client
+from app.backend.spool import SpooledUpload, open_spool
+from app.backend.tracing import span, start_trace, traceparent
+from app.backend.logs import REQUEST_ID_HEADER, bind_request_id
+from app.backend.models import (
+    NoteCreate,
+    NoteUpdate,
+    NotePatch,
+    RecordFinalize,
+    UploadUrlRequest,
+)
+
+API_INTERNAL_URL = os.environ.get("API_INTERNAL_URL")
+
+
+class InProcessApiClient:
+    """Calls the service layer directly from Reflex event handlers.
+
+    Used when the API is mounted on the same process through `api_transformer`,
+    so UI actions skip the HTTP loopback, JSON round trip and second auth call.
+    """
+
+    async def _user(self, token: str) -> dict:
+        with span("auth"):
+            return await asyncio.to_thread(
+                authenticate_token, get_supabase_client(), token
+            )
+
+    async def current_user(self, token: str) -> dict:
+        user = await self._user(token)
+        return {"id": str(user["id"]), "email": user.get("email"), "role": user["role"]}
+
+    async def list_records(self, token: str) -> list[dict]:
+        records = await services.list_records(
+            get_supabase_client(), await self._user(token)
+        )
+        return [record.model_dump() for record in records]
+
+    async def upload_record(
+        self, token: str, patient_email: str, title: str, notes: str, spooled: SpooledUpload
+    ) -> dict:
+        with start_trace("upload_record"):
+            current_user = await self._user(token)
+            with open_spool(spooled) as spool_file:
+                record = await services.upload_record(
+                    get_supabase_client(),
+                    current_user,
+                    patient_email,
+                    title,
+                    notes,
+                    spool_file,
+                    spooled["filename"],
+                    spooled["content_type"],
+                )
+        return record.model_dump()
+
+    async def create_upload_url(self, token: str, upload_in: dict) -> dict:
+        upload = await services.create_upload_url(
+            get_supabase_client(), await self._user(token), UploadUrlRequest(**upload_in)
+        )
+        return upload.model_dump()
+
+    async def finalize_upload(self, token: str, finalize_in: dict) -> dict:
+        record = await services.finalize_upload(
+            get_supabase_client(), await self._user(token), RecordFinalize(**finalize_in)
+        )
+        return record.model_dump()
+
+    async def verify_record(self, record_id: str) -> dict:
+        with start_trace("verify_record"):
+            return await services.verify_record(get_supabase_client(), record_id)
+
+    async def medicine_alternatives(self, token: str, medicine_name: str) -> dict:
+        result = await services.medicine_alternatives(
+            await self._user(token), medicine_name
+        )
+        return result.model_dump()
+
+    async def medicine_alternatives_batch(
+        self, token: str, medicine_names: list[str]
+    ) -> dict:
+        result = await services.medicine_alternatives_batch(
+            await self._user(token), medicine_names
+        )
+        return result.model_dump()
+
+    async def suggest_medicines(self, token: str, q: str, limit: int = 8) -> list[dict]:
+        await self._user(token)
+        suggestions = await services.suggest_medicines(q, limit)
+        return [suggestion.model_dump() for suggestion in suggestions]
+
+    async def stream_medicine_alternatives(self, token: str, medicine_name: str):
+        current_user = await self._user(token)
+        async for event, data in services.medicine_alternatives_stream(
+            current_user, medicine_name
+        ):
+            yield event, data
+
+    async def list_notes(self, token: str, limit: int = 50, offset: int = 0) -> dict:
+        notes_page = await services.list_notes(
+            get_supabase_client(), await self._user(token), limit, offset
+        )
+        return notes_page.model_dump()
+
+    async def get_note(self, token: str, note_id: str) -> dict:
+        note = await services.get_note(
+            get_supabase_client(), await self._user(token), note_id
+        )
+        return note.model_dump()
+
+    async def create_note(self, token: str, note_in: dict) -> dict:
+        note = await services.create_note(
+            get_supabase_client(), await self._user(token), NoteCreate(**note_in)
+        )
+        return note.model_dump()
+
+    async def update_note(
+        self, token: str, note_id: str, note_in: dict, expected_version: str | None = None
+    ) -> dict:
+        note = await services.update_note(
+            get_supabase_client(),
+            await self._user(token),
+            note_id,
+            NoteUpdate(**note_in),
+            expected_version,
+        )
+        return note.model_dump()
+
+    async def patch_note(
+        self, token: str, note_id: str, patch: dict, expected_version: str | None = None
+    ) -> dict:
+        note = await services.patch_note(
+            get_supabase_client(),
+            await self._user(token),
+            note_id,
+            NotePatch(**patch),
+            expected_version,
+        )
+        return note.model_dump()
+
+    async def delete_note(self, token: str, note_id: str) -> dict:
+        note = await services.delete_note(
+            get_supabase_client(), await self._user(token), note_id
+        )
+        return note.model_dump()
+
+
+class HttpApiClient:
+    """Talks to an API running as a separate process over a pooled connection."""
+
+    def __init__(self, base_url: str):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=60,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+
+    def _headers(self, token: str | None, headers: dict | None = None) -> dict:
+        """Auth plus the trace and request id propagated to the API."""
+        headers = dict(headers or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if trace_header := traceparent():
+            headers["traceparent"] = trace_header
+        headers[REQUEST_ID_HEADER] = bind_request_id()
+        return headers
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        token: str | None = None,
+        headers: dict | None = None,
+        **kwargs,
+    ):
+        response = await self._client.request(
+            method, url, headers=self._headers(token, headers), **kwargs
+        )
+        if response.is_error:
+            detail = f"Request failed: {response.status_code}"
+            try:
+                detail = response.json().get("detail", detail)
+            except Exception:
+                pass
+            raise HTTPException(status_code=response.status_code, detail=detail)
+        return response.json() if response.content else None
+
+    async def current_user(self, token: str) -> dict:
+        return await self._request("GET", "/api/me", token)
+
+    async def list_records(self, token: str) -> list[dict]:
+        return await self._request("GET", "/api/records", token)
+
+    async def upload_record(
+        self, token: str, patient_email: str, title: str, notes: str, spooled: SpooledUpload
+    ) -> dict:
+        with start_trace("upload_record"), open_spool(spooled) as spool_file:
+            return await self._request(
+                "POST",
+                "/api/records/upload",
+                token,
+                files={
+                    "file": (spooled["filename"], spool_file, spooled["content_type"])
+                },
+                data={"patient_email": patient_email, "title": title, "notes": notes},
+            )
+
+    async def create_upload_url(self, token: str, upload_in: dict) -> dict:
+        return await self._request(
+            "POST", "/api/records/upload-url", token, json=upload_in
+        )
+
+    async def finalize_upload(self, token: str, finalize_in: dict) -> dict:
+        return await self._request(
+            "POST", "/api/records/finalize", token, json=finalize_in
+        )
+
+    async def verify_record(self, record_id: str) -> dict:
+        with start_trace("verify_record"):
+            return await self._request("GET", f"/api/verify/{record_id}")
+
+    async def medicine_alternatives(self, token: str, medicine_name: str) -> dict:
+        return await self._request(
+            "POST",
+            "/api/ai/medicine-alternatives",
+            token,
+            json={"medicine_name": medicine_name},
+        )
+
+    async def medicine_alternatives_batch(
+        self, token: str, medicine_names: list[str]
+    ) -> dict:
+        return await self._request(
+            "POST",
+            "/api/ai/medicine-alternatives/batch",
+            token,
+            json={"medicine_names": medicine_names},
+        )
+
+    async def suggest_medicines(self, token: str, q: str, limit: int = 8) -> list[dict]:
+        return await self._request(
+            "GET", "/api/ai/medicines/suggest", token, params={"q": q, "limit": limit}
+        )
+
+    async def stream_medicine_alternatives(self, token: str, medicine_name: str):
+        """Yields (event, data) pairs parsed from the server-sent event stream."""
+        async with self._client.stream(
+            "POST",
+            "/api/ai/medicine-alternatives/stream",
+            headers=self._headers(token),
+            json={"medicine_name": medicine_name},
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"Request failed: {response.status_code}",
+                )
+            event = "message"
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:") :].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:") :])
+                    event = "message"
+
+    async def list_notes(self, token: str, limit: int = 50, offset: int = 0) -> dict:
+        return await self._request(
+            "GET", "/api/notes", token, params={"limit": limit, "offset": offset}
+        )
+
+    async def get_note(self, token: str, note_id: str) -> dict:
+        return await self._request("GET", f"/api/notes/{note_id}", token)
+
+    async def create_note(self, token: str, note_in: dict) -> dict:
+        return await self._request("POST", "/api/notes", token, json=note_in)
+
+    async def update_note(
+        self, token: str, note_id: str, note_in: dict, expected_version: str | None = None
+    ) -> dict:
+        headers = {"If-Match": f'"{expected_version}"'} if expected_version else {}
+        return await self._request(
+            "PUT", f"/api/notes/{note_id}", token, json=note_in, headers=headers
+        )
+
+    async def patch_note(
+        self, token: str, note_id: str, patch: dict, expected_version: str | None = None
+    ) -> dict:
+        headers = {"If-Match": f'"{expected_version}"'} if expected_version else {}
+        return await self._request(
+            "PATCH", f"/api/notes/{note_id}", token, json=patch, headers=headers
+        )
+
+    async def delete_note(self, token: str, note_id: str) -> dict:
+        return await self._request("DELETE", f"/api/notes/{note_id}", token)
+
+
+@lru_cache
+def _api_client() -> InProcessApiClient | HttpApiClient:
+    if API_INTERNAL_URL:
+        return HttpApiClient(API_INTERNAL_URL)
+    return InProcessApiClient()
+
+
+def get_api_client() -> InProcessApiClient | HttpApiClient:
+    """The shared API client; also binds a request id to the calling Reflex event."""
+    bind_request_id()
+    return _api_client()
@@ -0,0 +1,147 @@
+import os
+import json
+import base64
+import asyncio
+from typing import AsyncIterator, Literal
+from supabase import Client
+from app.backend.metrics import timed_execute
+
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_LINE_BYTES = 1024 * 1024
+
+ExportFormat = Literal["ndjson", "fhir"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "fhir": "application/fhir+ndjson"}
+
+NOTE_EXPORT_COLUMNS = "id, title, content, created_at, updated_at"
+RECORD_EXPORT_COLUMNS = (
+    "id, doctor_id, title, notes, file_url, file_hash, tx_hash, "
+    "notarization_status, created_at"
+)
+FILE_HASH_SYSTEM = "urn:arogyachain:file-sha256"
+TX_HASH_SYSTEM = "urn:arogyachain:tx-hash"
+
+
+async def iter_rows(
+    supabase: Client, table: str, columns: str, owner_field: str, owner_id: str
+) -> AsyncIterator[dict]:
+    """Yields every row owned by `owner_id`, one keyset page in memory at a time.
+
+    Pages are ordered and resumed by primary key rather than offset, so each page
+    costs the same no matter how deep into the table the export is.
+    """
+    last_id = None
+    while True:
+        query = (
+            supabase.table(table)
+            .select(columns)
+            .eq(owner_field, owner_id)
+            .order("id")
+            .limit(EXPORT_PAGE_SIZE)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        page = await asyncio.to_thread(timed_execute, query, f"{table}.select")
+        for row in page.data:
+            yield row
+        if len(page.data) < EXPORT_PAGE_SIZE:
+            return
+        last_id = page.data[-1]["id"]
+
+
+def note_to_fhir(note: dict, patient_id: str) -> dict:
+    return {
+        "resourceType": "DocumentReference",
+        "id": note["id"],
+        "status": "current",
+        "type": {"text": "Patient note"},
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "date": note["updated_at"],
+        "content": [
+            {
+                "attachment": {
+                    "contentType": "text/plain; charset=utf-8",
+                    "title": note["title"],
+                    "data": base64.b64encode(note["content"].encode("utf-8")).decode(),
+                    "creation": note["created_at"],
+                }
+            }
+        ],
+    }
+
+
+def record_to_fhir(record: dict, patient_id: str) -> dict:
+    identifiers = [{"system": FILE_HASH_SYSTEM, "value": record["file_hash"]}]
+    if record.get("tx_hash"):
+        identifiers.append({"system": TX_HASH_SYSTEM, "value": record["tx_hash"]})
+    return {
+        "resourceType": "DocumentReference",
+        "id": record["id"],
+        "status": "current",
+        "identifier": identifiers,
+        "type": {"text": "Medical record"},
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "author": [{"reference": f"Practitioner/{record['doctor_id']}"}],
+        "date": record["created_at"],
+        "description": record.get("notes"),
+        "content": [{"attachment": {"url": record["file_url"], "title": record["title"]}}],
+    }
+
+
+def _ndjson_line(item: dict) -> bytes:
+    return (json.dumps(item, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+async def export_patient_ndjson(
+    supabase: Client, patient_id: str, export_format: ExportFormat = "ndjson"
+) -> AsyncIterator[bytes]:
+    """Streams a patient's notes, then record metadata, as one NDJSON line per row."""
+    async for note in iter_rows(
+        supabase, "notes", NOTE_EXPORT_COLUMNS, "patient_id", patient_id
+    ):
+        if export_format == "fhir":
+            yield _ndjson_line(note_to_fhir(note, patient_id))
+        else:
+            yield _ndjson_line({"type": "note", **note})
+    async for record in iter_rows(
+        supabase, "records", RECORD_EXPORT_COLUMNS, "patient_id", patient_id
+    ):
+        if export_format == "fhir":
+            yield _ndjson_line(record_to_fhir(record, patient_id))
+        else:
+            yield _ndjson_line({"type": "record", **record})
+
+
+def parse_import_line(item: dict) -> dict | None:
+    """Extracts a note's title and content from a native or FHIR export line.
+
+    Returns None for lines that are not notes, such as record metadata, which can
+    only be created through a notarized upload. Raises ValueError for lines that
+    are valid JSON but not an object.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Expected a JSON object.")
+    if item.get("type") == "note":
+        return {"title": item["title"], "content": item["content"]}
+    if item.get("resourceType") == "DocumentReference" and not item.get("identifier"):
+        attachment = item["content"][0]["attachment"]
+        return {
+            "title": attachment["title"],
+            "content": base64.b64decode(attachment["data"]).decode("utf-8"),
+        }
+    return None
+
+
+async def iter_upload_lines(upload_file, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Yields the non-empty lines of an uploaded file without reading it whole."""
+    buffer = b""
+    while chunk := await upload_file.read(chunk_size):
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            raise ValueError(f"Import line exceeds {IMPORT_MAX_LINE_BYTES} bytes")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
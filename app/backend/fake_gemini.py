@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import random
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_AI_LATENCY = os.environ.get("FAKE_AI_LATENCY", "lognormal:0.8,0.5")
+FAKE_AI_ERROR_RATE = float(os.environ.get("FAKE_AI_ERROR_RATE", "0"))
+FAKE_AI_STREAM_CHUNK_CHARS = int(os.environ.get("FAKE_AI_STREAM_CHUNK_CHARS", "40"))
+FAKE_AI_STREAM_INTERVAL = float(os.environ.get("FAKE_AI_STREAM_INTERVAL", "0.05"))
+FAKE_AI_SEED = os.environ.get("FAKE_AI_SEED")
+
+_rng = random.Random(FAKE_AI_SEED)
+_SINGLE_RE = re.compile(r"^Medicine: (.+)$", re.MULTILINE)
+_BATCH_RE = re.compile(r"^- (.+)$", re.MULTILINE)
+
+
+class FakeBackendError(Exception):
+    pass
+
+
+def sample_latency(spec: str = FAKE_AI_LATENCY) -> float:
+    """Seconds to wait, from a spec like 'fixed:0.5', 'uniform:0.2,2' or 'lognormal:0.8,0.5'.
+
+    For lognormal the first number is the median in seconds and the second sigma.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return _rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values
+        return _rng.lognormvariate(0, sigma) * median
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def should_fail(error_rate: float = FAKE_AI_ERROR_RATE) -> bool:
+    return _rng.random() < error_rate
+
+
+def fake_medicine_info(medicine_name: str) -> dict:
+    """A schema-valid MedicineInfo payload, stable for a given name."""
+    seed = int(hashlib.sha256(medicine_name.lower().encode()).hexdigest()[:8], 16)
+    base_price = 5 + seed % 40
+    return {
+        "medicine_name": medicine_name,
+        "generic_alternatives": [
+            {
+                "name": f"{medicine_name} generic {index + 1}",
+                "price_range": f"${base_price + index * 3}-${base_price + index * 3 + 10}",
+            }
+            for index in range(2 + seed % 3)
+        ],
+        "notes": "Synthetic response from the fake model backend.",
+    }
+
+
+def fake_response_text(prompt: str, batch: bool) -> str:
+    if batch:
+        names = _BATCH_RE.findall(prompt)
+        return json.dumps([fake_medicine_info(name.strip()) for name in names])
+    match = _SINGLE_RE.search(prompt)
+    return json.dumps(fake_medicine_info(match.group(1).strip() if match else "unknown"))
+
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _is_batch_schema(schema) -> bool:
+    return getattr(schema, "__origin__", None) is list
+
+
+class FakeModels:
+    """Drop-in for `genai.Client().aio.models` that fabricates MedicineInfo JSON."""
+
+    def _response(self, prompt: str, text: str) -> SimpleNamespace:
+        return SimpleNamespace(
+            text=text,
+            parts=[text] if text else [],
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=_token_count(prompt),
+                candidates_token_count=_token_count(text),
+            ),
+        )
+
+    async def generate_content(self, model: str, contents: str, config=None):
+        await asyncio.sleep(sample_latency())
+        if should_fail():
+            raise FakeBackendError("Injected fake model failure")
+        batch = _is_batch_schema(getattr(config, "response_schema", None))
+        return self._response(contents, fake_response_text(contents, batch))
+
+    async def generate_content_stream(self, model: str, contents: str, config=None):
+        text = fake_response_text(contents, batch=False)
+
+        async def chunks():
+            await asyncio.sleep(sample_latency())
+            for start in range(0, len(text), FAKE_AI_STREAM_CHUNK_CHARS):
+                if should_fail():
+                    raise FakeBackendError("Injected fake model failure mid-stream")
+                chunk = text[start : start + FAKE_AI_STREAM_CHUNK_CHARS]
+                last = start + FAKE_AI_STREAM_CHUNK_CHARS >= len(text)
+                response = self._response(contents, chunk)
+                if not last:
+                    response.usage_metadata = None
+                yield response
+                await asyncio.sleep(FAKE_AI_STREAM_INTERVAL)
+
+        return chunks()
+
+
+# Serves the Gemini REST API so the real SDK can be load-tested end to end:
+#   uvicorn app.backend.fake_gemini:fake_gemini_api --port 8090
+#   GEMINI_BASE_URL=http://localhost:8090 GOOGLE_API_KEY=fake reflex run
+fake_gemini_api = FastAPI(title="Fake Gemini API")
+
+
+def _rest_response(prompt: str, text: str) -> dict:
+    return {
+        "candidates": [
+            {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}
+        ],
+        "usageMetadata": {
+            "promptTokenCount": _token_count(prompt),
+            "candidatesTokenCount": _token_count(text),
+            "totalTokenCount": _token_count(prompt) + _token_count(text),
+        },
+    }
+
+
+@fake_gemini_api.post("/{api_version}/models/{model_action}")
+async def generate(api_version: str, model_action: str, request: Request):
+    """Serves `models/{model}:generateContent` and `:streamGenerateContent?alt=sse`."""
+    body = await request.json()
+    prompt = "".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+    schema = body.get("generationConfig", {}).get("responseSchema") or {}
+    batch = str(schema.get("type", "")).lower() == "array"
+    await asyncio.sleep(sample_latency())
+    if should_fail():
+        return JSONResponse(
+            status_code=503,
+            content={"error": {"code": 503, "message": "Injected fake failure", "status": "UNAVAILABLE"}},
+        )
+    text = fake_response_text(prompt, batch)
+    if not model_action.endswith(":streamGenerateContent"):
+        return _rest_response(prompt, text)
+
+    async def events():
+        for start in range(0, len(text), FAKE_AI_STREAM_CHUNK_CHARS):
+            chunk = _rest_response(prompt, text[start : start + FAKE_AI_STREAM_CHUNK_CHARS])
+            yield f"data: {json.dumps(chunk)}\r\n\r\n"
+            await asyncio.sleep(FAKE_AI_STREAM_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
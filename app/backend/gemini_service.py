@@ -1,11 +1,32 @@
 import os
+import time
+import asyncio
 import logging
+from datetime import datetime, timezone
 from google import genai
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel
+from functools import lru_cache
+from typing import AsyncIterator, Optional
 import json
+from app.backend.ai_stream import ArrayItemStreamParser
+from app.backend.ai_usage import record_lookup, record_upstream
+from app.backend.ai_cache import get_medicine_cache, normalize_medicine_name
+from app.backend.catalog import get_medicine_catalog
+from app.backend.coalesce import SingleFlight
+from app.backend.metrics import track
 
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL")
+AI_BACKEND = os.environ.get("AI_BACKEND", "gemini")
+AI_CALL_TIMEOUT_SECONDS = float(os.environ.get("AI_CALL_TIMEOUT_SECONDS", "20"))
+AI_MAX_CONCURRENCY = int(os.environ.get("AI_MAX_CONCURRENCY", "8"))
+AI_SLOW_QUEUE_SECONDS = float(os.environ.get("AI_SLOW_QUEUE_SECONDS", "1"))
+AI_BATCH_SIZE = int(os.environ.get("AI_BATCH_SIZE", "10"))
+
+_ai_flights = SingleFlight()
+_ai_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+_ai_queue_stats = {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0}
 
 
 class MedicineAlternative(BaseModel):
@@ -19,6 +40,22 @@ class MedicineInfo(BaseModel):
     notes: str
 
 
+class MedicineLookup(MedicineInfo):
+    source: str = "gemini"
+    cached: bool = False
+    stale: bool = False
+    cached_at: Optional[str] = None
+
+
+class MedicineBatchItem(BaseModel):
+    result: Optional[MedicineLookup] = None
+    error: Optional[str] = None
+
+
+class MedicineBatchResponse(BaseModel):
+    results: dict[str, MedicineBatchItem]
+
+
 PROMPT_TEMPLATE = """You are an AI medical assistant. Your task is to provide generic alternatives for a given medicine, along with an approximate price comparison in USD. Be concise and clear.
 
 Medicine: {medicine_name}
@@ -42,26 +79,465 @@ class MedicineInfo(BaseModel):
 Do not include any introductory text or code block formatting in your final JSON output. Just return the raw JSON object.
 """
 
+BATCH_PROMPT_TEMPLATE = """You are an AI medical assistant. Your task is to provide generic alternatives for each of the given medicines, along with an approximate price comparison in USD. Be concise and clear.
+
+Medicines:
+{medicine_list}
+
+Return a JSON array with exactly one MedicineInfo object per medicine, in the same order as listed. Set medicine_name to the medicine's name exactly as written above. Each object must conform to this Pydantic model:
+
+pydantic
+from pydantic import BaseModel, Field
+from typing import List
+
+class MedicineAlternative(BaseModel):
+    name: str
+    price_range: str
+
+class MedicineInfo(BaseModel):
+    medicine_name: str
+    generic_alternatives: List[MedicineAlternative]
+    notes: str
+
+
+Do not include any introductory text or code block formatting in your final JSON output. Just return the raw JSON array.
+"""
+
+
+@lru_cache
+def get_genai_client() -> genai.Client:
+    """One client per process, so its connection pool is reused across lookups."""
+    return genai.Client(
+        api_key=GOOGLE_API_KEY,
+        http_options=genai.types.HttpOptions(
+            base_url=GEMINI_BASE_URL, timeout=int(AI_CALL_TIMEOUT_SECONDS * 1000)
+        ),
+    )
+
+
+@lru_cache
+def get_model_backend():
+    """The async `models` interface used for generation: real Gemini or the local fake."""
+    if AI_BACKEND == "fake":
+        from app.backend.fake_gemini import FakeModels
 
-def get_medicine_alternatives(medicine_name: str) -> Optional[MedicineInfo]:
-    if not GOOGLE_API_KEY:
+        return FakeModels()
+    return get_genai_client().aio.models
+
+
+def _backend_available() -> bool:
+    if AI_BACKEND != "fake" and not GOOGLE_API_KEY:
         logging.error("GOOGLE_API_KEY is not set. Cannot contact Gemini API.")
+        return False
+    return True
+
+
+def _generation_config() -> genai.types.GenerateContentConfig:
+    return genai.types.GenerateContentConfig(
+        response_mime_type="application/json", response_schema=MedicineInfo
+    )
+
+
+async def get_medicine_alternatives(medicine_name: str) -> Optional[MedicineInfo]:
+    if not _backend_available():
         return None
+    started = time.perf_counter()
+    response = None
+    ok = False
     try:
-        client = genai.Client(api_key=GOOGLE_API_KEY)
         prompt = PROMPT_TEMPLATE.format(medicine_name=medicine_name)
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=genai.types.GenerateContentConfig(
-                response_mime_type="application/json", response_schema=MedicineInfo
-            ),
-        )
+        with track("gemini", "generate_content"):
+            response = await asyncio.wait_for(
+                get_model_backend().generate_content(
+                    model=GEMINI_MODEL, contents=prompt, config=_generation_config()
+                ),
+                timeout=AI_CALL_TIMEOUT_SECONDS,
+            )
         if response.parts:
-            return MedicineInfo.model_validate_json(response.text)
+            result = MedicineInfo.model_validate_json(response.text)
+            ok = True
+            return result
         else:
             logging.warning("Gemini API returned an empty response.")
             return None
+    except asyncio.TimeoutError:
+        logging.warning(
+            "Gemini lookup for '%s' exceeded %ss", medicine_name, AI_CALL_TIMEOUT_SECONDS
+        )
+        return None
     except Exception as e:
-        logging.exception(f"Error fetching medicine alternatives from Gemini: {e}")
-        return None
\ No newline at end of file
+        logging.exception("Error fetching medicine alternatives from Gemini: %s", e)
+        return None
+    finally:
+        record_upstream(
+            normalize_medicine_name(medicine_name),
+            time.perf_counter() - started,
+            getattr(response, "usage_metadata", None),
+            ok,
+        )
+
+
+def _cached_lookup(payload: dict, cached_at: float, stale: bool) -> MedicineLookup:
+    return MedicineLookup(
+        **payload,
+        source="cache",
+        cached=True,
+        stale=stale,
+        cached_at=datetime.fromtimestamp(cached_at, timezone.utc).isoformat(),
+    )
+
+
+def ai_queue_stats() -> dict:
+    """Time spent waiting for a Gemini slot, across upstream calls in this process."""
+    return {
+        **_ai_queue_stats,
+        "in_flight": _ai_flights.in_flight(),
+        "max_concurrency": AI_MAX_CONCURRENCY,
+    }
+
+
+def _record_queue_time(seconds: float, cache_key: str):
+    _ai_queue_stats["calls"] += 1
+    _ai_queue_stats["total_seconds"] += seconds
+    _ai_queue_stats["max_seconds"] = max(_ai_queue_stats["max_seconds"], seconds)
+    if seconds >= AI_SLOW_QUEUE_SECONDS:
+        logging.warning("Gemini lookup for '%s' queued for %.2fs", cache_key, seconds)
+
+
+def _catalog_lookup(medicine_name: str) -> Optional[MedicineLookup]:
+    try:
+        catalog_answer = get_medicine_catalog().match(medicine_name)
+    except Exception as e:
+        logging.exception("Medicine catalog lookup failed for '%s': %s", medicine_name, e)
+        return None
+    return MedicineLookup(**catalog_answer, source="catalog") if catalog_answer else None
+
+
+def _read_cache(cache_key: str) -> tuple[dict, float] | None:
+    try:
+        return get_medicine_cache().get(cache_key)
+    except Exception as e:
+        logging.exception("Medicine cache read failed for '%s': %s", cache_key, e)
+        return None
+
+
+def _write_cache(cache_key: str, result: MedicineInfo):
+    try:
+        get_medicine_cache().set(cache_key, result.model_dump())
+    except Exception as e:
+        logging.exception("Medicine cache write failed for '%s': %s", cache_key, e)
+
+
+async def _fetch_and_cache(medicine_name: str, cache_key: str) -> Optional[MedicineInfo]:
+    """One upstream call per key at a time, and at most AI_MAX_CONCURRENCY overall."""
+    queued_at = time.perf_counter()
+    async with _ai_slots:
+        _record_queue_time(time.perf_counter() - queued_at, cache_key)
+        result = await get_medicine_alternatives(medicine_name)
+    if result is not None:
+        _write_cache(cache_key, result)
+    return result
+
+
+def _record_lookup(medicine_name: str, lookup: Optional[MedicineLookup], started: float):
+    if lookup is None:
+        source = "unavailable"
+    else:
+        source = "stale" if lookup.stale else lookup.source
+    record_lookup(
+        normalize_medicine_name(medicine_name), source, time.perf_counter() - started
+    )
+
+
+async def lookup_medicine_alternatives(medicine_name: str) -> Optional[MedicineLookup]:
+    """Answers from the offline catalog or the cache, calling Gemini only on a miss.
+
+    Concurrent misses for the same normalized name share one Gemini call. A stale
+    entry is returned, flagged as such, when Gemini cannot be reached.
+    """
+    started = time.perf_counter()
+    lookup = await _resolve_medicine_alternatives(medicine_name)
+    _record_lookup(medicine_name, lookup, started)
+    return lookup
+
+
+async def _resolve_medicine_alternatives(medicine_name: str) -> Optional[MedicineLookup]:
+    catalog_lookup = _catalog_lookup(medicine_name)
+    if catalog_lookup:
+        return catalog_lookup
+    cache_key = normalize_medicine_name(medicine_name)
+    entry = _read_cache(cache_key)
+    if entry and not get_medicine_cache().is_stale(entry[1]):
+        return _cached_lookup(*entry, stale=False)
+    result = await _ai_flights.do(
+        cache_key, lambda: _fetch_and_cache(medicine_name, cache_key)
+    )
+    if result is None:
+        return _cached_lookup(*entry, stale=True) if entry else None
+    return MedicineLookup(**result.model_dump())
+
+
+async def _read_gemini_stream(
+    medicine_name: str, cache_key: str, items: asyncio.Queue
+):
+    """Reads the upstream stream into `items`, holding an AI slot only while reading.
+
+    Puts each alternative as it is parsed, then the validated MedicineInfo, or the
+    exception that ended the stream. The consumer is never awaited here, so a slow
+    client neither holds the slot nor counts towards the deadline or the latency.
+    """
+    loop = asyncio.get_running_loop()
+    queued_at = time.perf_counter()
+    try:
+        async with _ai_slots:
+            _record_queue_time(time.perf_counter() - queued_at, cache_key)
+            started = loop.time()
+            deadline = started + AI_CALL_TIMEOUT_SECONDS
+            usage_metadata = None
+            ok = False
+            try:
+                with track("gemini", "generate_content_stream"):
+                    stream = await asyncio.wait_for(
+                        get_model_backend().generate_content_stream(
+                            model=GEMINI_MODEL,
+                            contents=PROMPT_TEMPLATE.format(medicine_name=medicine_name),
+                            config=_generation_config(),
+                        ),
+                        timeout=AI_CALL_TIMEOUT_SECONDS,
+                    )
+                    parser = ArrayItemStreamParser("generic_alternatives", MedicineAlternative)
+                    chunks = aiter(stream)
+                    text_parts = []
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(
+                                anext(chunks), deadline - loop.time()
+                            )
+                        except StopAsyncIteration:
+                            break
+                        usage_metadata = chunk.usage_metadata or usage_metadata
+                        if not chunk.text:
+                            continue
+                        text_parts.append(chunk.text)
+                        for alternative in parser.feed(chunk.text):
+                            items.put_nowait(alternative)
+                    ok = True
+            finally:
+                record_upstream(cache_key, loop.time() - started, usage_metadata, ok)
+        items.put_nowait(MedicineInfo.model_validate_json("".join(text_parts)))
+    except Exception as e:
+        items.put_nowait(e)
+
+
+async def _stream_from_gemini(
+    medicine_name: str, cache_key: str
+) -> AsyncIterator[MedicineAlternative | MedicineInfo]:
+    """Yields alternatives as Gemini emits them, then the validated MedicineInfo.
+
+    Upstream reads run in a separate task bounded by AI_CALL_TIMEOUT_SECONDS;
+    time spent waiting on the consumer is not counted. Closing the generator
+    cancels the read.
+    """
+    items: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.create_task(_read_gemini_stream(medicine_name, cache_key, items))
+    try:
+        while True:
+            item = await items.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            if isinstance(item, MedicineInfo):
+                return
+    finally:
+        reader.cancel()
+
+
+async def stream_medicine_alternatives(
+    medicine_name: str,
+) -> AsyncIterator[tuple[str, dict]]:
+    """Streams ("alternative", item) events followed by one ("result", lookup) event.
+
+    Catalog and cache hits replay their alternatives immediately. When Gemini fails,
+    a stale cached result is sent if there is one, otherwise an ("error", detail) event.
+    """
+    started = time.perf_counter()
+    cache_key = normalize_medicine_name(medicine_name)
+    entry = _read_cache(cache_key)
+    lookup = _catalog_lookup(medicine_name)
+    if lookup is None and entry and not get_medicine_cache().is_stale(entry[1]):
+        lookup = _cached_lookup(*entry, stale=False)
+    if lookup:
+        _record_lookup(medicine_name, lookup, started)
+        for alternative in lookup.generic_alternatives:
+            yield "alternative", alternative.model_dump()
+        yield "result", lookup.model_dump()
+        return
+    result = None
+    if _backend_available():
+        try:
+            async for item in _stream_from_gemini(medicine_name, cache_key):
+                if isinstance(item, MedicineInfo):
+                    result = item
+                else:
+                    yield "alternative", item.model_dump()
+        except asyncio.TimeoutError:
+            logging.warning(
+                "Gemini stream for '%s' exceeded %ss", medicine_name, AI_CALL_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            logging.exception("Error streaming medicine alternatives from Gemini: %s", e)
+    if result is not None:
+        _write_cache(cache_key, result)
+        lookup = MedicineLookup(**result.model_dump())
+    elif entry:
+        lookup = _cached_lookup(*entry, stale=True)
+    _record_lookup(medicine_name, lookup, started)
+    if lookup:
+        yield "result", lookup.model_dump()
+    else:
+        yield "error", {"detail": "AI service is currently unavailable."}
+
+
+async def get_medicine_alternatives_batch(
+    medicine_names: list[str],
+) -> Optional[dict[str, MedicineInfo]]:
+    """One Gemini call for several medicines, keyed by normalized name.
+
+    Results are matched back by the medicine name the model echoes, never by
+    position. Medicines it skipped or renamed are absent from the returned dict;
+    None means the call itself failed.
+    """
+    if not _backend_available():
+        return None
+    keys = [normalize_medicine_name(name) for name in medicine_names]
+    started = time.perf_counter()
+    response = None
+    try:
+        prompt = BATCH_PROMPT_TEMPLATE.format(
+            medicine_list="\n".join(f"- {name}" for name in medicine_names)
+        )
+        with track("gemini", "generate_content_batch"):
+            response = await asyncio.wait_for(
+                get_model_backend().generate_content(
+                    model=GEMINI_MODEL,
+                    contents=prompt,
+                    config=genai.types.GenerateContentConfig(
+                        response_mime_type="application/json",
+                        response_schema=list[MedicineInfo],
+                    ),
+                ),
+                timeout=AI_CALL_TIMEOUT_SECONDS,
+            )
+        if not response.parts:
+            logging.warning("Gemini API returned an empty batch response.")
+            return None
+        items = [MedicineInfo.model_validate(item) for item in json.loads(response.text)]
+    except asyncio.TimeoutError:
+        logging.warning(
+            "Gemini batch of %s exceeded %ss", len(medicine_names), AI_CALL_TIMEOUT_SECONDS
+        )
+        return None
+    except Exception as e:
+        logging.exception("Error fetching batched medicine alternatives from Gemini: %s", e)
+        return None
+    finally:
+        record_upstream(
+            None,
+            time.perf_counter() - started,
+            getattr(response, "usage_metadata", None),
+            ok=bool(response and response.parts),
+        )
+    results = {}
+    for item in items:
+        key = normalize_medicine_name(item.medicine_name)
+        if key in keys and key not in results:
+            results[key] = item
+    return results
+
+
+async def _fetch_batch_and_cache(medicine_names: list[str]) -> dict[str, MedicineInfo]:
+    """One batch call; medicines it did not answer by name get single lookups.
+
+    Nothing is retried when the batch call itself failed.
+    """
+    queued_at = time.perf_counter()
+    async with _ai_slots:
+        _record_queue_time(time.perf_counter() - queued_at, f"batch of {len(medicine_names)}")
+        results = await get_medicine_alternatives_batch(medicine_names)
+    if results is None:
+        return {}
+    for cache_key, result in results.items():
+        _write_cache(cache_key, result)
+    left_out = {
+        normalize_medicine_name(name): name
+        for name in medicine_names
+        if normalize_medicine_name(name) not in results
+    }
+    singles = await asyncio.gather(
+        *(
+            _ai_flights.do(
+                cache_key,
+                lambda medicine_name=medicine_name, cache_key=cache_key: _fetch_and_cache(
+                    medicine_name, cache_key
+                ),
+            )
+            for cache_key, medicine_name in left_out.items()
+        )
+    )
+    for cache_key, result in zip(left_out, singles):
+        if result is not None:
+            results[cache_key] = result
+    return results
+
+
+async def lookup_medicine_alternatives_batch(
+    medicine_names: list[str],
+) -> MedicineBatchResponse:
+    """Resolves catalog and cache hits locally and packs the rest into few Gemini calls.
+
+    Misses are sent AI_BATCH_SIZE at a time, concurrently. Each requested name gets
+    either a result or an error, so one bad medicine never fails the whole batch.
+    """
+    started = time.perf_counter()
+    lookups: dict[str, MedicineLookup] = {}
+    stale_entries: dict[str, tuple[dict, float]] = {}
+    misses: dict[str, str] = {}
+    for medicine_name in medicine_names:
+        cache_key = normalize_medicine_name(medicine_name)
+        if not cache_key or cache_key in lookups or cache_key in misses:
+            continue
+        catalog_lookup = _catalog_lookup(medicine_name)
+        if catalog_lookup:
+            lookups[cache_key] = catalog_lookup
+            continue
+        entry = _read_cache(cache_key)
+        if entry and not get_medicine_cache().is_stale(entry[1]):
+            lookups[cache_key] = _cached_lookup(*entry, stale=False)
+            continue
+        if entry:
+            stale_entries[cache_key] = entry
+        misses[cache_key] = medicine_name
+    miss_names = list(misses.values())
+    batches = await asyncio.gather(
+        *(
+            _fetch_batch_and_cache(miss_names[start : start + AI_BATCH_SIZE])
+            for start in range(0, len(miss_names), AI_BATCH_SIZE)
+        )
+    )
+    for batch in batches:
+        for cache_key, result in batch.items():
+            lookups[cache_key] = MedicineLookup(**result.model_dump())
+    for cache_key, entry in stale_entries.items():
+        if cache_key not in lookups:
+            lookups[cache_key] = _cached_lookup(*entry, stale=True)
+    results = {}
+    for medicine_name in medicine_names:
+        lookup = lookups.get(normalize_medicine_name(medicine_name))
+        _record_lookup(medicine_name, lookup, started)
+        if lookup:
+            results[medicine_name] = MedicineBatchItem(result=lookup)
+        else:
+            results[medicine_name] = MedicineBatchItem(
+                error="No alternatives available for this medicine right now."
+            )
+    return MedicineBatchResponse(results=results)
@@ -0,0 +1,250 @@
+import os
+import re
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import secrets
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from app.backend.tracing import current_trace
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_DEDUP_WINDOW_SECONDS = float(os.environ.get("LOG_DEDUP_WINDOW_SECONDS", "60"))
+LOG_DEDUP_BURST = int(os.environ.get("LOG_DEDUP_BURST", "5"))
+LOG_REDACT_PII = os.environ.get("LOG_REDACT_PII", "true").lower() == "true"
+REQUEST_ID_HEADER = "x-request-id"
+MAX_DEDUP_KEYS = 1000
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_BEARER_RE = re.compile(r"(?i)\bbearer\s+[\w.~+/=-]+")
+_REQUEST_ID_RE = re.compile(r"^[\w.-]{1,64}$")
+# Attributes every LogRecord has; anything else came in through `extra=`.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_listener: QueueListener | None = None
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: str | None = None) -> str:
+    """Returns the request id of the current context, binding a new one if unset.
+
+    Reflex runs each event in its own task, so an id bound while handling an
+    event stays with that event's logs and service calls and no others.
+    """
+    bound = _request_id.get()
+    if bound is None:
+        bound = request_id or secrets.token_hex(16)
+        _request_id.set(bound)
+    return bound
+
+
+def redact(text: str) -> str:
+    """Masks email addresses and bearer tokens."""
+    text = _EMAIL_RE.sub("<email>", text)
+    return _BEARER_RE.sub("Bearer <token>", text)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request and trace ids of the logging context.
+
+    Runs in the calling thread, where the context variables are visible.
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        trace = current_trace()
+        record.trace_id = trace.trace_id if trace else None
+        return True
+
+
+class DuplicateErrorFilter(logging.Filter):
+    """Lets through `burst` repeats of a warning or error per window, then drops them.
+
+    Records are keyed on their unformatted message, so calls must pass their
+    arguments lazily (`logging.error("... %s", value)`) to be grouped. The
+    first record of the next window reports how many were dropped.
+    """
+
+    def __init__(self, window: float, burst: int):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._seen: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info else None
+        key = (record.name, record.levelno, str(record.msg), exc_type)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if len(self._seen) >= MAX_DEDUP_KEYS:
+                    self._prune(now)
+                suppressed = entry[2] if entry else 0
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if entry[1] < self.burst:
+                entry[1] += 1
+                return True
+            entry[2] += 1
+            return False
+
+    def _prune(self, now: float):
+        for key, (started, _, _) in list(self._seen.items()):
+            if now - started >= self.window:
+                del self._seen[key]
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without formatting tracebacks or blocking.
+
+    Only the message is merged with its arguments here, since they may be
+    mutated after the call; exceptions are formatted by the listener. When the
+    queue is full records are dropped and counted instead of stalling the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                self.queue.put_nowait(
+                    logging.makeLogRecord(
+                        {
+                            "name": __name__,
+                            "levelno": logging.WARNING,
+                            "levelname": "WARNING",
+                            "msg": f"Dropped {self.dropped} log records; the log queue was full.",
+                        }
+                    )
+                )
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields and redacted PII."""
+
+    converter = time.gmtime
+
+    def __init__(self, redact_pii: bool):
+        super().__init__()
+        self.redact_pii = redact_pii
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        text = json.dumps(entry, default=str)
+        return redact(text) if self.redact_pii else text
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, redact_pii: bool):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+        self.redact_pii = redact_pii
+
+    def format(self, record):
+        record.request_id = getattr(record, "request_id", None) or "-"
+        text = super().format(record)
+        if getattr(record, "suppressed", None):
+            text += f" ({record.suppressed} similar suppressed)"
+        return redact(text) if self.redact_pii else text
+
+
+def configure_logging(force: bool = False):
+    """Routes the root logger through a bounded queue to a background writer thread.
+
+    Meant for the process entrypoint. Leaves logging alone if the root logger
+    already has handlers, e.g. from uvicorn's `--log-config` or pytest, unless
+    `force` is set. Safe to call more than once; only the first call installs.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None or (root.handlers and not force):
+        return
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    writer = logging.StreamHandler()
+    writer.setFormatter(
+        TextFormatter(LOG_REDACT_PII)
+        if LOG_FORMAT == "text"
+        else JsonFormatter(LOG_REDACT_PII)
+    )
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(DuplicateErrorFilter(LOG_DEDUP_WINDOW_SECONDS, LOG_DEDUP_BURST))
+    handler.addFilter(RequestContextFilter())
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    _listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class RequestIdMiddleware:
+    """ASGI middleware binding each API request to an id and echoing it back.
+
+    A well-formed `X-Request-ID` from the caller, such as the HTTP API client
+    used by the Reflex states, is kept so both sides log under the same id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER.encode(), b"")
+        incoming = incoming.decode("latin-1")
+        request_id = incoming if _REQUEST_ID_RE.match(incoming) else secrets.token_hex(16)
+        token = _request_id.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
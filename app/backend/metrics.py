@@ -0,0 +1,181 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(label_names: tuple[str, ...], label_values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Fixed-bucket latency histogram keyed by a tuple of label values."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, label_values: tuple):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            ]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{self.name}_bucket{_label_text(self.label_names, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_label_text(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.label_names, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, amount: float, label_values: tuple):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_label_text(self.label_names, labels)} {value}")
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "API requests currently being served.", ("method",)
+)
+DEPENDENCY_CALL_DURATION = Histogram(
+    "dependency_call_duration_seconds",
+    "Latency of calls to Supabase, storage, Web3 and Gemini.",
+    ("dependency", "operation", "outcome"),
+)
+DEPENDENCY_CALLS_IN_FLIGHT = Gauge(
+    "dependency_calls_in_flight", "Calls to external dependencies in progress.", ("dependency",)
+)
+_REGISTRY = [
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    DEPENDENCY_CALL_DURATION,
+    DEPENDENCY_CALLS_IN_FLIGHT,
+]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _REGISTRY for line in metric.render()) + "\n"
+
+
+class _CallTimer:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+    def fail(self):
+        self.outcome = "error"
+
+
+@contextmanager
+def track(dependency: str, operation: str):
+    """Times one dependency call. Exceptions, or `timer.fail()`, mark it as an error."""
+    timer = _CallTimer()
+    DEPENDENCY_CALLS_IN_FLIGHT.add(1, (dependency,))
+    started = time.perf_counter()
+    try:
+        yield timer
+    except BaseException:
+        timer.outcome = "error"
+        raise
+    finally:
+        DEPENDENCY_CALLS_IN_FLIGHT.add(-1, (dependency,))
+        DEPENDENCY_CALL_DURATION.observe(
+            time.perf_counter() - started, (dependency, operation, timer.outcome)
+        )
+
+
+def timed_execute(query, operation: str):
+    """Executes a Supabase query builder, timing it as a `supabase` dependency call."""
+    with track("supabase", operation):
+        return query.execute()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per matched route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        method = scope["method"]
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.add(1, (method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.add(-1, (method,))
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, (route, method, str(status_code))
+            )
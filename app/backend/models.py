@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from enum import Enum
 from typing import Optional
 
@@ -8,6 +8,12 @@ class UserRole(str, Enum):
     PATIENT = "patient"
 
 
+class CurrentUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: str
+
+
 class RecordCreate(BaseModel):
     patient_email: EmailStr
     title: str
@@ -23,11 +29,33 @@ class RecordResponse(BaseModel):
     tx_hash: Optional[str] = None
     notarization_status: str
     qr_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
     title: str
     notes: Optional[str] = None
     created_at: str
 
 
+class UploadUrlRequest(BaseModel):
+    patient_email: EmailStr
+    filename: str
+    content_type: str
+
+
+class UploadUrlResponse(BaseModel):
+    upload_url: str
+    path: str
+    token: str
+    max_bytes: int
+
+
+class RecordFinalize(BaseModel):
+    path: str
+    content_type: str
+    title: str
+    notes: Optional[str] = None
+
+
 class NoteBase(BaseModel):
     title: str
     content: str
@@ -41,6 +69,18 @@ class NoteUpdate(NoteBase):
     pass
 
 
+class TextEdit(BaseModel):
+    start: int
+    end: int
+    text: str
+
+
+class NotePatch(BaseModel):
+    title: Optional[str] = None
+    content: Optional[str] = None
+    content_edits: Optional[list[TextEdit]] = None
+
+
 class NoteResponse(NoteBase):
     id: str
     patient_id: str
@@ -48,5 +88,54 @@ class NoteResponse(NoteBase):
     updated_at: str
 
 
+class NoteSummary(BaseModel):
+    id: str
+    patient_id: str
+    title: str
+    preview: str
+    content_bytes: int
+    created_at: str
+    updated_at: str
+
+
+class NotesPage(BaseModel):
+    items: list[NoteSummary]
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class ImportResult(BaseModel):
+    imported: int
+    skipped: int
+    errors: list[str]
+
+
 class MedicineInput(BaseModel):
-    medicine_name: str
\ No newline at end of file
+    medicine_name: str
+
+
+class MedicineBatchInput(BaseModel):
+    medicine_names: list[str] = Field(min_length=1, max_length=50)
+
+
+class MedicineSuggestion(BaseModel):
+    name: str
+    generic: str
+
+
+class SearchResult(BaseModel):
+    kind: str
+    id: str
+    title: str
+    snippet: Optional[str] = None
+    rank: float
+    created_at: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: list[SearchResult]
+    limit: int
+    offset: int
+    has_more: bool
@@ -0,0 +1,295 @@
+import os
+import sys
+import signal
+import asyncio
+import logging
+import threading
+import faulthandler
+from collections import Counter
+from starlette.routing import compile_path
+
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", "120"))
+STACK_DUMP_SIGNAL = os.environ.get("STACK_DUMP_SIGNAL")
+MAX_STACK_FRAMES = 64
+
+# Leaf frames of threads that are parked rather than doing work.
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+}
+
+_session_lock = threading.Lock()
+_request_session: "RequestProfileSession | None" = None
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _frame_label(code, cache: dict) -> str:
+    label = cache.get(code)
+    if label is None:
+        name = getattr(code, "co_qualname", code.co_name)
+        label = cache[code] = f"{name} ({os.path.basename(code.co_filename)})"
+    return label
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack on a timer and counts collapsed stacks.
+
+    Runs in a daemon thread using `sys._current_frames()`, so it needs no tracing
+    hooks and costs one stack walk per thread per interval. `should_sample` can
+    gate samples, e.g. to only while matching requests are in flight.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        include_idle: bool = False,
+        thread_ident: int | None = None,
+        should_sample=None,
+    ):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.thread_ident = thread_ident
+        self.should_sample = should_sample
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: dict = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_FRAMES:
+            labels.append(_frame_label(frame.f_code, self._labels))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _sample(self, thread_names: dict):
+        own_ident = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or (self.thread_ident and ident != self.thread_ident):
+                continue
+            if not self.include_idle and _is_idle(frame):
+                continue
+            thread_name = thread_names.get(ident, str(ident))
+            self.stacks[f"{thread_name};{self._collapse(frame)}"] += 1
+        self.samples += 1
+
+    def _run(self):
+        thread_names = {}
+        while not self._stop.wait(self.interval):
+            if self.should_sample is not None and not self.should_sample():
+                continue
+            if self.samples % 100 == 0:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(thread_names)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format, as read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _acquire_session():
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profiling session is already running.")
+
+
+async def profile_for(
+    seconds: float, interval: float, include_idle: bool = False, loop_only: bool = False
+) -> SamplingProfiler:
+    """Samples the whole worker for `seconds`; one session runs at a time."""
+    _acquire_session()
+    try:
+        profiler = SamplingProfiler(
+            interval, include_idle, threading.get_ident() if loop_only else None
+        )
+        profiler.start()
+        try:
+            await asyncio.sleep(min(seconds, PROFILER_MAX_SECONDS))
+        finally:
+            profiler.stop()
+        return profiler
+    finally:
+        _session_lock.release()
+
+
+class RequestProfileSession:
+    """Tracks the next `count` requests whose path matches a route template."""
+
+    def __init__(self, route: str, count: int):
+        self.route = route
+        self.pattern = compile_path(route)[0]
+        self.count = count
+        self.started = 0
+        self.finished = 0
+        self.in_flight = 0
+        self.done = asyncio.Event()
+
+    def admit(self, path: str) -> bool:
+        if self.started >= self.count or not self.pattern.match(path):
+            return False
+        self.started += 1
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self.finished += 1
+        if self.finished >= self.count:
+            self.done.set()
+
+
+async def profile_requests(
+    route: str,
+    count: int,
+    timeout: float,
+    interval: float,
+    include_idle: bool = False,
+) -> tuple[SamplingProfiler, RequestProfileSession]:
+    """Samples only while the next `count` requests matching `route` are in flight.
+
+    Other requests interleaved on the same event loop are sampled too while a
+    matching one is running; this narrows the window, it does not isolate tasks.
+    """
+    global _request_session
+    _acquire_session()
+    try:
+        session = RequestProfileSession(route, count)
+        profiler = SamplingProfiler(
+            interval, include_idle, should_sample=lambda: session.in_flight > 0
+        )
+        _request_session = session
+        profiler.start()
+        try:
+            await asyncio.wait_for(session.done.wait(), min(timeout, PROFILER_MAX_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _request_session = None
+            profiler.stop()
+        return profiler, session
+    finally:
+        _session_lock.release()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware feeding request-scoped profiling sessions; a no-op otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = _request_session
+        if scope["type"] != "http" or session is None or not session.admit(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.release()
+
+
+_FRAME_ATTRIBUTES = ("cr_frame", "gi_frame", "ag_frame")
+
+
+def _frame_location(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({code.co_filename}:{frame.f_lineno})"
+
+
+def _describe_awaitable(awaitable) -> str:
+    text = repr(awaitable)
+    return text if len(text) <= 200 else text[:197] + "..."
+
+
+def _await_chain(coro) -> tuple[list[str], str | None]:
+    """Frames from a task's coroutine down to what it is suspended on."""
+    frames = []
+    while coro is not None:
+        if not any(hasattr(coro, attribute) for attribute in _FRAME_ATTRIBUTES):
+            return frames, _describe_awaitable(coro)
+        frame = (
+            getattr(coro, "cr_frame", None)
+            or getattr(coro, "gi_frame", None)
+            or getattr(coro, "ag_frame", None)
+        )
+        if frame is not None:
+            frames.append(_frame_location(frame))
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+            or getattr(coro, "ag_await", None)
+        )
+    return frames, None
+
+
+def dump_tasks() -> list[dict]:
+    """Every asyncio task on the running loop with the await chain it is parked on."""
+    tasks = []
+    for task in asyncio.all_tasks():
+        frames, awaiting = _await_chain(task.get_coro())
+        tasks.append(
+            {
+                "name": task.get_name(),
+                "done": task.done(),
+                "cancelling": task.cancelling() if hasattr(task, "cancelling") else None,
+                "stack": frames,
+                "awaiting": awaiting,
+            }
+        )
+    return sorted(tasks, key=lambda task: len(task["stack"]), reverse=True)
+
+
+def dump_threads() -> list[dict]:
+    """Current stack of every thread, innermost frame last."""
+    names = {thread.ident: thread for thread in threading.enumerate()}
+    threads = []
+    for ident, leaf in sys._current_frames().items():
+        stack = []
+        frame = leaf
+        while frame is not None and len(stack) < MAX_STACK_FRAMES:
+            stack.append(_frame_location(frame))
+            frame = frame.f_back
+        thread = names.get(ident)
+        threads.append(
+            {
+                "name": thread.name if thread else str(ident),
+                "daemon": thread.daemon if thread else None,
+                "idle": _is_idle(leaf),
+                "stack": list(reversed(stack)),
+            }
+        )
+    return threads
+
+
+def install_stack_dump_signal():
+    """Dumps all thread stacks to stderr on STACK_DUMP_SIGNAL (e.g. SIGUSR1).
+
+    Works even when the event loop is blocked and the HTTP endpoints cannot answer.
+    """
+    if not STACK_DUMP_SIGNAL or not hasattr(faulthandler, "register"):
+        return
+    signal_number = getattr(signal, STACK_DUMP_SIGNAL, None)
+    if signal_number is None:
+        logging.warning("Unknown STACK_DUMP_SIGNAL %s; not installed.", STACK_DUMP_SIGNAL)
+        return
+    faulthandler.register(signal_number, all_threads=True)
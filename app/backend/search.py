@@ -0,0 +1,225 @@
+import os
+import re
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from supabase import Client
+from app.backend.models import UserRole
+from app.backend.metrics import timed_execute
+
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "postgres")
+APP_CACHE_DIR = os.environ.get(
+    "APP_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "arogyachain"),
+)
+SEARCH_INDEX_PATH = os.environ.get(
+    "SEARCH_INDEX_PATH", os.path.join(APP_CACHE_DIR, "search_index.db")
+)
+MAX_QUERY_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def extract_terms(query: str) -> list[str]:
+    """Splits a free-text query into lowercase search terms."""
+    return [term.lower() for term in _TERM_RE.findall(query)][:MAX_QUERY_TERMS]
+
+
+def to_tsquery(terms: list[str]) -> str:
+    """Builds a Postgres prefix tsquery, e.g. 'blood:* & test:*'."""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def to_fts5_query(terms: list[str]) -> str:
+    """Builds an SQLite FTS5 prefix query, e.g. '"blood"* "test"*'."""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_postgres(
+    supabase: Client, terms: list[str], user_id: str, role: str, limit: int, offset: int
+) -> list[dict]:
+    """Ranked search using the tsvector indexes and the search_user_content RPC."""
+    search_res = timed_execute(
+        supabase.rpc(
+            "search_user_content",
+            {
+                "p_query": to_tsquery(terms),
+                "p_user_id": user_id,
+                "p_role": role,
+                "p_limit": limit,
+                "p_offset": offset,
+            },
+        ),
+        "rpc.search_user_content",
+    )
+    return search_res.data or []
+
+
+class LocalSearchIndex:
+    """Embedded SQLite FTS5 index used in offline mode."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+                title,
+                body,
+                kind UNINDEXED,
+                item_id UNINDEXED,
+                patient_id UNINDEXED,
+                doctor_id UNINDEXED,
+                created_at UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """
+        )
+        self._conn.commit()
+
+    def upsert(
+        self,
+        kind: str,
+        item_id: str,
+        title: str,
+        body: str | None,
+        patient_id: str,
+        doctor_id: str | None,
+        created_at: str,
+    ):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM search_index WHERE kind = ? AND item_id = ?",
+                (kind, item_id),
+            )
+            self._conn.execute(
+                "INSERT INTO search_index (title, body, kind, item_id, patient_id, doctor_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (title, body or "", kind, item_id, patient_id, doctor_id, created_at),
+            )
+            self._conn.commit()
+
+    def remove(self, kind: str, item_id: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM search_index WHERE kind = ? AND item_id = ?",
+                (kind, item_id),
+            )
+            self._conn.commit()
+
+    def search(
+        self, terms: list[str], user_id: str, role: str, limit: int, offset: int
+    ) -> list[dict]:
+        if role == UserRole.PATIENT:
+            scope = "patient_id = ?"
+        else:
+            scope = "doctor_id = ? AND kind = 'record'"
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT kind, item_id, title,
+                       snippet(search_index, 1, '', '', '…', 12),
+                       bm25(search_index, 10.0, 1.0) AS score,
+                       created_at
+                FROM search_index
+                WHERE search_index MATCH ? AND {scope}
+                ORDER BY score, created_at DESC
+                LIMIT ? OFFSET ?
+                """,
+                (to_fts5_query(terms), user_id, limit, offset),
+            ).fetchall()
+        return [
+            {
+                "kind": kind,
+                "id": item_id,
+                "title": title,
+                "snippet": snippet,
+                "rank": -score,
+                "created_at": created_at,
+            }
+            for kind, item_id, title, snippet, score, created_at in rows
+        ]
+
+
+@lru_cache
+def get_local_index() -> LocalSearchIndex:
+    return LocalSearchIndex(SEARCH_INDEX_PATH)
+
+
+def index_record(record: dict):
+    """Keeps the local index in sync after a record is written."""
+    if SEARCH_BACKEND != "local":
+        return
+    try:
+        get_local_index().upsert(
+            "record",
+            record["id"],
+            record["title"],
+            record.get("notes"),
+            record["patient_id"],
+            record["doctor_id"],
+            record["created_at"],
+        )
+    except Exception as e:
+        logging.exception("Failed to index record %s: %s", record.get("id"), e)
+
+
+def index_note(note: dict):
+    """Keeps the local index in sync after a note is written."""
+    if SEARCH_BACKEND != "local":
+        return
+    try:
+        get_local_index().upsert(
+            "note",
+            note["id"],
+            note["title"],
+            note["content"],
+            note["patient_id"],
+            None,
+            note["created_at"],
+        )
+    except Exception as e:
+        logging.exception("Failed to index note %s: %s", note.get("id"), e)
+
+
+def unindex_note(note_id: str):
+    if SEARCH_BACKEND != "local":
+        return
+    try:
+        get_local_index().remove("note", note_id)
+    except Exception as e:
+        logging.exception("Failed to remove note %s from index: %s", note_id, e)
+
+
+def rebuild_local_index(supabase: Client, page_size: int = 1000):
+    """Backfills the local index from the records and notes tables."""
+    for table, indexer in (("records", index_record), ("notes", index_note)):
+        start = 0
+        while True:
+            page = timed_execute(
+                supabase.table(table)
+                .select("*")
+                .order("id")
+                .range(start, start + page_size - 1),
+                f"{table}.select",
+            ).data
+            for row in page:
+                indexer(row)
+            if len(page) < page_size:
+                break
+            start += page_size
+
+
+def search_content(
+    supabase: Client, query: str, user_id: str, role: str, limit: int, offset: int
+) -> list[dict]:
+    """Runs a scoped, ranked prefix search against the configured backend."""
+    terms = extract_terms(query)
+    if not terms:
+        return []
+    if SEARCH_BACKEND == "local":
+        return get_local_index().search(terms, user_id, role, limit, offset)
+    return search_postgres(supabase, terms, user_id, role, limit, offset)
@@ -0,0 +1,814 @@
+import os
+import json
+import math
+import uuid
+import httpx
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import BinaryIO, Optional
+from cachetools import TTLCache
+from fastapi import HTTPException
+from supabase import Client
+from app.backend.auth import ensure_role
+from app.backend.metrics import timed_execute, track
+from app.backend.tracing import span
+from app.backend.profiler import (
+    PROFILER_ENABLED,
+    ProfilerBusyError,
+    SamplingProfiler,
+    dump_tasks,
+    dump_threads,
+    profile_for,
+    profile_requests,
+)
+from app.backend.utils import (
+    calculate_file_hash,
+    calculate_stream_hash,
+    hash_remote_file,
+    apply_text_edits,
+    FileTooLargeError,
+    MAX_UPLOAD_BYTES,
+    render_qr_code,
+    qr_code_etag,
+    qr_code_url,
+)
+from app.backend.blockchain import notarize_hash, verify_hash_on_chain
+from app.backend.thumbnails import generate_record_renditions
+from app.backend.gemini_service import (
+    ai_queue_stats,
+    lookup_medicine_alternatives,
+    lookup_medicine_alternatives_batch,
+    MedicineBatchResponse,
+    stream_medicine_alternatives,
+    MedicineLookup,
+)
+from app.backend.search import search_content, index_record, index_note, unindex_note
+from app.backend.catalog import get_medicine_catalog
+from app.backend.ai_usage import ai_quota, ai_usage_summary, current_ai_user
+from app.backend.export import (
+    ExportFormat,
+    IMPORT_BATCH_SIZE,
+    export_patient_ndjson,
+    iter_upload_lines,
+    parse_import_line,
+)
+from app.backend.models import (
+    ImportResult,
+    MedicineSuggestion,
+    NoteCreate,
+    NoteUpdate,
+    NotePatch,
+    NoteResponse,
+    NoteSummary,
+    NotesPage,
+    RecordFinalize,
+    RecordResponse,
+    SearchResponse,
+    UploadUrlRequest,
+    UploadUrlResponse,
+    UserRole,
+)
+
+ALLOWED_MIME_TYPES = ["application/pdf", "image/png", "image/jpeg", "image/jpg"]
+MAX_IMPORT_ERRORS = 100
+
+NOTE_LIST_CACHE_TTL_SECONDS = int(os.environ.get("NOTE_LIST_CACHE_TTL_SECONDS", "300"))
+
+_background_tasks: set[asyncio.Task] = set()
+_note_list_cache: TTLCache = TTLCache(maxsize=5000, ttl=NOTE_LIST_CACHE_TTL_SECONDS)
+
+
+def run_in_background(coro):
+    """Schedules post-response work on the running loop and keeps a reference to it."""
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def record_response(record: dict) -> RecordResponse:
+    """Builds a RecordResponse, pointing qr_url at the on-demand QR endpoint."""
+    return RecordResponse(
+        **{**record, "qr_url": record.get("qr_url") or qr_code_url(record["id"])}
+    )
+
+
+def validate_content_type(content_type: str | None):
+    if content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {content_type}. Please upload a PDF, PNG, or JPG.",
+        )
+
+
+def lookup_patient_id(supabase: Client, patient_email: str) -> str:
+    try:
+        patient_res = timed_execute(
+            supabase.table("users")
+            .select("id, role")
+            .eq("email", patient_email)
+            .single(),
+            "users.select",
+        )
+    except Exception as e:
+        logging.exception("Error validating patient: %s", e)
+        raise HTTPException(status_code=500, detail="Error validating patient details.")
+    if not patient_res.data or patient_res.data["role"] != UserRole.PATIENT.value:
+        raise HTTPException(status_code=404, detail="Patient not found.")
+    return patient_res.data["id"]
+
+
+def create_record(
+    supabase: Client,
+    current_user: dict,
+    patient_id: str,
+    file_path_in_storage: str,
+    file_hash: str,
+    title: str,
+    notes: Optional[str],
+) -> dict:
+    """Inserts the record row, then notarizes its hash, cleaning up storage on failure.
+
+    The row is claimed with ON CONFLICT (file_url) DO NOTHING before notarizing,
+    so a retried or concurrent finalize of the same object gets the existing
+    record back and the hash is notarized once.
+    """
+    file_url = supabase.storage.from_("records").get_public_url(file_path_in_storage)
+    try:
+        record_data = {
+            "patient_id": patient_id,
+            "doctor_id": str(current_user["id"]),
+            "file_url": file_url,
+            "file_hash": file_hash,
+            "tx_hash": None,
+            "notarization_status": "pending",
+            "title": title,
+            "notes": notes,
+        }
+        with span("record_insert"):
+            inserted_record_res = timed_execute(
+                supabase.table("records").upsert(
+                    record_data, on_conflict="file_url", ignore_duplicates=True
+                ),
+                "records.insert",
+            )
+        if not inserted_record_res.data:
+            existing_res = timed_execute(
+                supabase.table("records").select("*").eq("file_url", file_url).limit(1),
+                "records.select",
+            )
+            if existing_res.data:
+                return existing_res.data[0]
+            raise Exception("No data returned from insert operation.")
+        new_record = inserted_record_res.data[0]
+    except Exception as e:
+        logging.exception("Failed to save record to database: %s", e)
+        try:
+            with track("storage", "records.remove"):
+                supabase.storage.from_("records").remove([file_path_in_storage])
+            logging.info("Cleaned up orphaned file: %s", file_path_in_storage)
+        except Exception as remove_e:
+            logging.exception("Failed to cleanup orphaned storage file: %s", remove_e)
+        raise HTTPException(status_code=500, detail="Failed to save record metadata.")
+    try:
+        with span("notarize"):
+            tx_hash = notarize_hash(file_hash)
+        notarization_status = "success" if tx_hash else "pending"
+    except Exception as e:
+        logging.exception("Blockchain notarization failed: %s", e)
+        tx_hash = None
+        notarization_status = "failed"
+    notarization = {"tx_hash": tx_hash, "notarization_status": notarization_status}
+    try:
+        timed_execute(
+            supabase.table("records").update(notarization).eq("id", new_record["id"]),
+            "records.update",
+        )
+        new_record.update(notarization)
+    except Exception as e:
+        logging.exception(
+            "Failed to store notarization for record %s: %s", new_record["id"], e
+        )
+    with span("search_index"):
+        index_record(new_record)
+    return new_record
+
+
+async def upload_record(
+    supabase: Client,
+    current_user: dict,
+    patient_email: str,
+    title: str,
+    notes: Optional[str],
+    file: bytes | BinaryIO,
+    filename: str,
+    content_type: str,
+) -> RecordResponse:
+    """Stores a file, notarizes it and creates its record.
+
+    `file` is either the content or an open binary file, which is hashed and
+    uploaded in chunks rather than read into memory.
+    """
+    ensure_role(current_user, UserRole.DOCTOR)
+    logging.info("Upload request from doctor %s", current_user["id"])
+    validate_content_type(content_type)
+    with span("patient_lookup"):
+        patient_id = lookup_patient_id(supabase, patient_email)
+    try:
+        with span("hash"):
+            if isinstance(file, bytes):
+                file_hash = calculate_file_hash(file)
+            else:
+                file_hash = calculate_stream_hash(file)
+                file.seek(0)
+        file_extension = filename.split(".")[-1]
+        file_path_in_storage = (
+            f"{current_user['id']}/{patient_id}/{file_hash}.{file_extension}"
+        )
+        with span("storage_upload"), track("storage", "records.upload"):
+            supabase.storage.from_("records").upload(
+                file_path_in_storage,
+                file,
+                file_options={"content-type": content_type},
+            )
+    except Exception as e:
+        logging.exception("Failed to upload file to Supabase: %s", e)
+        raise HTTPException(
+            status_code=500, detail="File upload failed during storage."
+        )
+    new_record = create_record(
+        supabase, current_user, patient_id, file_path_in_storage, file_hash, title, notes
+    )
+    rendition_source = file if isinstance(file, bytes) else new_record["file_url"]
+    run_in_background(
+        generate_record_renditions(supabase, file_hash, rendition_source, content_type)
+    )
+    return record_response(new_record)
+
+
+async def create_upload_url(
+    supabase: Client, current_user: dict, upload_in: UploadUrlRequest
+) -> UploadUrlResponse:
+    ensure_role(current_user, UserRole.DOCTOR)
+    validate_content_type(upload_in.content_type)
+    patient_id = lookup_patient_id(supabase, upload_in.patient_email)
+    file_extension = upload_in.filename.rsplit(".", 1)[-1].lower()
+    file_path_in_storage = (
+        f"{current_user['id']}/{patient_id}/{uuid.uuid4().hex}.{file_extension}"
+    )
+    try:
+        with track("storage", "records.create_signed_upload_url"):
+            signed = supabase.storage.from_("records").create_signed_upload_url(
+                file_path_in_storage
+            )
+    except Exception as e:
+        logging.exception("Failed to create signed upload URL: %s", e)
+        raise HTTPException(status_code=500, detail="Could not prepare file upload.")
+    return UploadUrlResponse(
+        upload_url=signed["signed_url"],
+        path=file_path_in_storage,
+        token=signed["token"],
+        max_bytes=MAX_UPLOAD_BYTES,
+    )
+
+
+async def finalize_upload(
+    supabase: Client, current_user: dict, finalize_in: RecordFinalize
+) -> RecordResponse:
+    ensure_role(current_user, UserRole.DOCTOR)
+    validate_content_type(finalize_in.content_type)
+    path_parts = finalize_in.path.split("/")
+    if (
+        len(path_parts) != 3
+        or path_parts[0] != str(current_user["id"])
+        or ".." in path_parts
+    ):
+        raise HTTPException(status_code=403, detail="Upload path is not yours.")
+    patient_id = path_parts[1]
+    bucket = supabase.storage.from_("records")
+    existing_res = timed_execute(
+        supabase.table("records")
+        .select("*")
+        .eq("doctor_id", str(current_user["id"]))
+        .eq("file_url", bucket.get_public_url(finalize_in.path))
+        .limit(1),
+        "records.select",
+    )
+    if existing_res.data:
+        return record_response(existing_res.data[0])
+    try:
+        with track("storage", "records.create_signed_url"):
+            signed = bucket.create_signed_url(finalize_in.path, 300)
+    except Exception as e:
+        logging.exception("Failed to sign uploaded object %s: %s", finalize_in.path, e)
+        raise HTTPException(status_code=502, detail="Could not read the uploaded file.")
+    try:
+        with span("storage_hash"), track("storage", "records.download"):
+            file_hash, file_size = await hash_remote_file(
+                signed["signedURL"], MAX_UPLOAD_BYTES
+            )
+    except FileTooLargeError:
+        try:
+            with track("storage", "records.remove"):
+                bucket.remove([finalize_in.path])
+        except Exception as e:
+            logging.exception("Failed to remove oversized upload %s: %s", finalize_in.path, e)
+        raise HTTPException(status_code=413, detail="Uploaded file is too large.")
+    except httpx.HTTPStatusError as e:
+        logging.exception("Failed to hash uploaded object %s: %s", finalize_in.path, e)
+        if e.response.status_code in (400, 404):
+            raise HTTPException(status_code=404, detail="Uploaded file not found.")
+        raise HTTPException(status_code=502, detail="Could not read the uploaded file.")
+    except httpx.HTTPError as e:
+        logging.exception("Failed to hash uploaded object %s: %s", finalize_in.path, e)
+        raise HTTPException(status_code=502, detail="Could not read the uploaded file.")
+    except Exception as e:
+        logging.exception("Failed to hash uploaded object %s: %s", finalize_in.path, e)
+        raise HTTPException(status_code=500, detail="Could not finalize the upload.")
+    logging.info("Finalizing %s byte upload %s", file_size, finalize_in.path)
+    new_record = create_record(
+        supabase,
+        current_user,
+        patient_id,
+        finalize_in.path,
+        file_hash,
+        finalize_in.title,
+        finalize_in.notes,
+    )
+    run_in_background(
+        generate_record_renditions(
+            supabase, file_hash, signed["signedURL"], finalize_in.content_type
+        )
+    )
+    return record_response(new_record)
+
+
+async def list_records(supabase: Client, current_user: dict) -> list[RecordResponse]:
+    user_id = str(current_user["id"])
+    user_role = current_user["role"]
+    query_field = "patient_id" if user_role == UserRole.PATIENT else "doctor_id"
+    records_res = timed_execute(
+        supabase.table("records")
+        .select("*")
+        .eq(query_field, user_id)
+        .order("created_at", desc=True),
+        "records.select",
+    )
+    if not records_res.data:
+        return []
+    return [record_response(record) for record in records_res.data]
+
+
+async def render_record_qr(
+    supabase: Client, record_id: str, image_format: str, if_none_match: Optional[str]
+) -> tuple[Optional[bytes], str]:
+    """Returns the QR code and its ETag, or None for the body when `if_none_match` is current."""
+    with span("record_lookup"):
+        record_res = timed_execute(
+            supabase.table("records")
+            .select("id, tx_hash")
+            .eq("id", record_id)
+            .limit(1),
+            "records.select",
+        )
+    if not record_res.data:
+        raise HTTPException(status_code=404, detail="Record not found.")
+    tx_hash = record_res.data[0]["tx_hash"]
+    etag = qr_code_etag(record_id, tx_hash, image_format)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return None, etag
+    try:
+        with span("qr_render"):
+            qr_code = await asyncio.to_thread(
+                render_qr_code, record_id, tx_hash, image_format
+            )
+        return qr_code, etag
+    except Exception as e:
+        logging.exception("Failed to render QR code for record %s: %s", record_id, e)
+        raise HTTPException(status_code=500, detail="Failed to generate QR code.")
+
+
+async def search(
+    supabase: Client, current_user: dict, q: str, limit: int, offset: int
+) -> SearchResponse:
+    try:
+        hits = search_content(
+            supabase, q, str(current_user["id"]), current_user["role"], limit + 1, offset
+        )
+    except Exception as e:
+        logging.exception("Search failed for query '%s': %s", q, e)
+        raise HTTPException(status_code=500, detail="Search is currently unavailable.")
+    return SearchResponse(
+        query=q,
+        results=hits[:limit],
+        limit=limit,
+        offset=offset,
+        has_more=len(hits) > limit,
+    )
+
+
+async def verify_record(supabase: Client, record_id: str) -> dict:
+    with span("record_lookup"):
+        record_res = timed_execute(
+            supabase.table("records")
+            .select("id, title, created_at, file_hash, tx_hash")
+            .eq("id", record_id)
+            .single(),
+            "records.select",
+        )
+    if not record_res.data:
+        raise HTTPException(status_code=404, detail="Record not found.")
+    record = record_res.data
+    file_hash = record["file_hash"]
+    with span("chain_verify"):
+        verification_details = verify_hash_on_chain(file_hash)
+    if not verification_details:
+        raise HTTPException(
+            status_code=500, detail="Blockchain verification service is unavailable."
+        )
+    return {
+        "record": {
+            "id": record["id"],
+            "title": record["title"],
+            "created_at": record["created_at"],
+            "tx_hash": record["tx_hash"],
+        },
+        "verification": verification_details,
+    }
+
+
+def meter_ai_request(current_user: dict, cost: int = 1):
+    """Applies the per-user AI quota and tags the request's usage events with the user."""
+    user_id = str(current_user["id"])
+    retry_after = ai_quota.consume(user_id, min(cost, ai_quota.limit))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="AI assistant quota exceeded. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    current_ai_user.set(user_id)
+
+
+def ai_usage_report() -> dict:
+    return {**ai_usage_summary(), "queue": ai_queue_stats()}
+
+
+def _ensure_profiler_enabled():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled.")
+
+
+async def profile_worker(
+    seconds: float, interval_ms: int, include_idle: bool, loop_only: bool
+) -> SamplingProfiler:
+    _ensure_profiler_enabled()
+    try:
+        return await profile_for(seconds, interval_ms / 1000, include_idle, loop_only)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+async def profile_matching_requests(
+    route: str, count: int, timeout: float, interval_ms: int, include_idle: bool
+) -> SamplingProfiler:
+    _ensure_profiler_enabled()
+    try:
+        profiler, session = await profile_requests(
+            route, count, timeout, interval_ms / 1000, include_idle
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logging.info(
+        "Profiled %s/%s requests matching %s (%s samples).",
+        session.finished,
+        count,
+        route,
+        profiler.samples,
+    )
+    return profiler
+
+
+def dump_async_tasks() -> dict:
+    _ensure_profiler_enabled()
+    return {"tasks": dump_tasks(), "threads": dump_threads()}
+
+
+async def medicine_alternatives(current_user: dict, medicine_name: str) -> MedicineLookup:
+    meter_ai_request(current_user)
+    logging.info(
+        "Medicine alternative request for '%s' from user %s", medicine_name, current_user["id"]
+    )
+    alternatives = await lookup_medicine_alternatives(medicine_name)
+    if not alternatives:
+        raise HTTPException(
+            status_code=503, detail="AI service is currently unavailable."
+        )
+    return alternatives
+
+
+async def medicine_alternatives_batch(
+    current_user: dict, medicine_names: list[str]
+) -> MedicineBatchResponse:
+    meter_ai_request(current_user, len(set(medicine_names)))
+    logging.info(
+        "Batch medicine alternative request for %s medicines from user %s",
+        len(medicine_names),
+        current_user["id"],
+    )
+    return await lookup_medicine_alternatives_batch(medicine_names)
+
+
+async def suggest_medicines(q: str, limit: int) -> list[MedicineSuggestion]:
+    return [
+        MedicineSuggestion(**suggestion)
+        for suggestion in get_medicine_catalog().suggest(q, limit)
+    ]
+
+
+def medicine_alternatives_stream(current_user: dict, medicine_name: str):
+    meter_ai_request(current_user)
+    logging.info(
+        "Streaming medicine alternatives for '%s' to user %s", medicine_name, current_user["id"]
+    )
+    return stream_medicine_alternatives(medicine_name)
+
+
+async def create_note(
+    supabase: Client, current_user: dict, note_in: NoteCreate
+) -> NoteResponse:
+    ensure_role(current_user, UserRole.PATIENT)
+    try:
+        note_data = note_in.dict()
+        note_data["patient_id"] = str(current_user["id"])
+        inserted_note_res = timed_execute(
+            supabase.table("notes").insert(note_data), "notes.insert"
+        )
+        if not inserted_note_res.data:
+            raise HTTPException(status_code=500, detail="Failed to create note.")
+        index_note(inserted_note_res.data[0])
+        invalidate_note_list(note_data["patient_id"])
+        return NoteResponse(**inserted_note_res.data[0])
+    except Exception as e:
+        logging.exception("Error creating note: %s", e)
+        raise HTTPException(status_code=500, detail="Could not create note.")
+
+
+def invalidate_note_list(patient_id: str):
+    _note_list_cache.pop(patient_id, None)
+
+
+def _note_list_version(supabase: Client, user_id: str) -> tuple[int, Optional[str]]:
+    """Note count and newest updated_at: changes on any create, edit or delete."""
+    version_res = timed_execute(
+        supabase.table("notes")
+        .select("updated_at", count="exact")
+        .eq("patient_id", user_id)
+        .order("updated_at", desc=True)
+        .limit(1),
+        "notes.select_version",
+    )
+    return version_res.count, version_res.data[0]["updated_at"] if version_res.data else None
+
+
+async def list_notes(
+    supabase: Client, current_user: dict, limit: int = 50, offset: int = 0
+) -> NotesPage:
+    """Returns a page of note summaries, cached per patient and list version.
+
+    The cache is process-local, so each request first reads the version stored
+    with the data; pages cached before a write in another worker are not reused.
+    """
+    ensure_role(current_user, UserRole.PATIENT)
+    user_id = str(current_user["id"])
+    version = _note_list_version(supabase, user_id)
+    cached = _note_list_cache.get(user_id)
+    if cached is not None and cached[0] == version and (limit, offset) in cached[1]:
+        return cached[1][(limit, offset)]
+    notes_res = timed_execute(
+        supabase.table("notes")
+        .select(
+            "id, patient_id, title, preview:content_preview, content_bytes, created_at, updated_at"
+        )
+        .eq("patient_id", user_id)
+        .order("updated_at", desc=True)
+        .range(offset, offset + limit),
+        "notes.select",
+    )
+    notes_page = NotesPage(
+        items=[NoteSummary(**note) for note in notes_res.data[:limit]],
+        limit=limit,
+        offset=offset,
+        has_more=len(notes_res.data) > limit,
+    )
+    if cached is None or cached[0] != version:
+        cached = _note_list_cache[user_id] = (version, {})
+    cached[1][(limit, offset)] = notes_page
+    return notes_page
+
+
+async def get_note(supabase: Client, current_user: dict, note_id: str) -> NoteResponse:
+    ensure_role(current_user, UserRole.PATIENT)
+    note_res = timed_execute(
+        supabase.table("notes")
+        .select("id, patient_id, title, content, created_at, updated_at")
+        .eq("id", note_id)
+        .eq("patient_id", str(current_user["id"])),
+        "notes.select",
+    )
+    if not note_res.data:
+        raise HTTPException(status_code=404, detail="Note not found or access denied.")
+    return NoteResponse(**note_res.data[0])
+
+
+def note_etag(note: NoteResponse) -> str:
+    return f'"{note.updated_at}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[str]:
+    """Returns the expected note version from an If-Match header, or None for '*'."""
+    if not if_match or if_match.strip() == "*":
+        return None
+    return if_match.strip().removeprefix("W/").strip('"')
+
+
+def _update_note_row(
+    supabase: Client,
+    user_id: str,
+    note_id: str,
+    changes: dict,
+    expected_version: Optional[str],
+) -> NoteResponse:
+    """Updates a note in one conditional statement.
+
+    The update is filtered on id, owner and, when given, the expected updated_at
+    version. Only when no row matches is a second query made to tell a missing
+    note (404) from a concurrent edit (409).
+    """
+    update_query = (
+        supabase.table("notes")
+        .update({**changes, "updated_at": datetime.now(timezone.utc).isoformat()})
+        .eq("id", note_id)
+        .eq("patient_id", user_id)
+    )
+    if expected_version:
+        update_query = update_query.eq("updated_at", expected_version)
+    updated_note_res = timed_execute(update_query, "notes.update")
+    if updated_note_res.data:
+        index_note(updated_note_res.data[0])
+        invalidate_note_list(user_id)
+        return NoteResponse(**updated_note_res.data[0])
+    if expected_version:
+        existing_note_res = timed_execute(
+            supabase.table("notes")
+            .select("id")
+            .eq("id", note_id)
+            .eq("patient_id", user_id),
+            "notes.select",
+        )
+        if existing_note_res.data:
+            raise HTTPException(
+                status_code=409,
+                detail="Note was modified elsewhere. Reload it and try again.",
+            )
+    raise HTTPException(status_code=404, detail="Note not found or access denied.")
+
+
+async def update_note(
+    supabase: Client,
+    current_user: dict,
+    note_id: str,
+    note_in: NoteUpdate,
+    expected_version: Optional[str] = None,
+) -> NoteResponse:
+    ensure_role(current_user, UserRole.PATIENT)
+    return _update_note_row(
+        supabase, str(current_user["id"]), note_id, note_in.dict(), expected_version
+    )
+
+
+async def patch_note(
+    supabase: Client,
+    current_user: dict,
+    note_id: str,
+    patch: NotePatch,
+    expected_version: Optional[str] = None,
+) -> NoteResponse:
+    """Applies partial fields or content edits against a known note version."""
+    ensure_role(current_user, UserRole.PATIENT)
+    user_id = str(current_user["id"])
+    changes = patch.dict(exclude_none=True, exclude={"content_edits"})
+    if patch.content_edits is not None:
+        if patch.content is not None:
+            raise HTTPException(
+                status_code=422, detail="Send either content or content_edits."
+            )
+        if not expected_version:
+            raise HTTPException(
+                status_code=428, detail="Content edits require an If-Match version."
+            )
+        note_res = timed_execute(
+            supabase.table("notes")
+            .select("content, updated_at")
+            .eq("id", note_id)
+            .eq("patient_id", user_id),
+            "notes.select",
+        )
+        if not note_res.data:
+            raise HTTPException(
+                status_code=404, detail="Note not found or access denied."
+            )
+        if note_res.data[0]["updated_at"] != expected_version:
+            raise HTTPException(
+                status_code=409,
+                detail="Note was modified elsewhere. Reload it and try again.",
+            )
+        try:
+            changes["content"] = apply_text_edits(
+                note_res.data[0]["content"], patch.content_edits
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    if not changes:
+        raise HTTPException(status_code=422, detail="Nothing to update.")
+    return _update_note_row(supabase, user_id, note_id, changes, expected_version)
+
+
+async def delete_note(
+    supabase: Client, current_user: dict, note_id: str
+) -> NoteResponse:
+    ensure_role(current_user, UserRole.PATIENT)
+    user_id = str(current_user["id"])
+    delete_res = timed_execute(
+        supabase.table("notes")
+        .delete()
+        .eq("id", note_id)
+        .eq("patient_id", user_id),
+        "notes.delete",
+    )
+    if not delete_res.data:
+        raise HTTPException(
+            status_code=404, detail="Note not found or could not be deleted."
+        )
+    unindex_note(note_id)
+    invalidate_note_list(user_id)
+    return NoteResponse(**delete_res.data[0])
+
+
+def export_patient_data(
+    supabase: Client, current_user: dict, export_format: ExportFormat
+):
+    """Checks access up front, then returns the NDJSON stream of the patient's data."""
+    ensure_role(current_user, UserRole.PATIENT)
+    return export_patient_ndjson(supabase, str(current_user["id"]), export_format)
+
+
+def _insert_note_batch(supabase: Client, batch: list[dict]) -> int:
+    inserted_res = timed_execute(supabase.table("notes").insert(batch), "notes.insert")
+    for note in inserted_res.data:
+        index_note(note)
+    return len(inserted_res.data)
+
+
+async def import_notes(supabase: Client, current_user: dict, upload_file) -> ImportResult:
+    """Imports notes from a native or FHIR NDJSON export, inserting in batches."""
+    ensure_role(current_user, UserRole.PATIENT)
+    patient_id = str(current_user["id"])
+    imported = skipped = 0
+    errors: list[str] = []
+    batch: list[dict] = []
+    line_number = 0
+    try:
+        async for line in iter_upload_lines(upload_file):
+            line_number += 1
+            try:
+                note = parse_import_line(json.loads(line))
+                if note is not None:
+                    note = NoteCreate(**note).model_dump()
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                # Pydantic's ValidationError is a ValueError, so a null or
+                # non-string title or content is skipped here, not in the insert.
+                skipped += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append(f"Line {line_number}: {e}")
+                continue
+            if note is None:
+                skipped += 1
+                continue
+            batch.append({**note, "patient_id": patient_id})
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += await asyncio.to_thread(_insert_note_batch, supabase, batch)
+                batch = []
+        if batch:
+            imported += await asyncio.to_thread(_insert_note_batch, supabase, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logging.exception("Note import failed after %s notes: %s", imported, e)
+        raise HTTPException(
+            status_code=500, detail=f"Import failed after {imported} notes."
+        )
+    finally:
+        if imported:
+            invalidate_note_list(patient_id)
+    return ImportResult(imported=imported, skipped=skipped, errors=errors)
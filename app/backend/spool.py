@@ -0,0 +1,90 @@
+import os
+import time
+import hashlib
+import logging
+import tempfile
+from typing import BinaryIO, TypedDict
+
+SPOOL_DIR = os.environ.get(
+    "UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "arogyachain-uploads")
+)
+SPOOL_TTL_SECONDS = int(os.environ.get("UPLOAD_SPOOL_TTL_SECONDS", "3600"))
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledUpload(TypedDict):
+    path: str
+    filename: str
+    size: int
+    content_type: str
+    sha256: str
+
+
+class SpoolTooLargeError(Exception):
+    pass
+
+
+def _spool_path(path: str) -> str:
+    """Resolves a spool handle path, refusing anything outside SPOOL_DIR."""
+    resolved = os.path.realpath(path)
+    if os.path.dirname(resolved) != os.path.realpath(SPOOL_DIR):
+        raise ValueError(f"Not a spooled upload: {path}")
+    return resolved
+
+
+async def spool_upload(upload_file, max_bytes: int) -> SpooledUpload:
+    """Streams an uploaded file to disk, hashing as it goes, and returns a small handle."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    expire_spools()
+    fd, path = tempfile.mkstemp(dir=SPOOL_DIR, suffix=".upload")
+    sha256_hash = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as spool_file:
+            while chunk := await upload_file.read(SPOOL_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise SpoolTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                sha256_hash.update(chunk)
+                spool_file.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return {
+        "path": path,
+        "filename": upload_file.filename,
+        "size": size,
+        "content_type": upload_file.content_type,
+        "sha256": sha256_hash.hexdigest(),
+    }
+
+
+def open_spool(handle: SpooledUpload) -> BinaryIO:
+    return open(_spool_path(handle["path"]), "rb")
+
+
+def discard_spool(handle: SpooledUpload | None):
+    if not handle:
+        return
+    try:
+        os.remove(_spool_path(handle["path"]))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.exception("Failed to remove spooled upload %s: %s", handle["path"], e)
+
+
+def expire_spools(max_age: int = SPOOL_TTL_SECONDS):
+    """Removes spooled uploads abandoned for longer than `max_age` seconds."""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(SPOOL_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                logging.info("Expired abandoned upload spool: %s", entry.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,104 @@
+import os
+import asyncio
+import logging
+import httpx
+from io import BytesIO
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from supabase import Client
+from app.backend.metrics import timed_execute, track
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+THUMBNAIL_BUCKET = "thumbnails"
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", "2"))
+RENDITIONS = {"thumb": ((320, 320), 70), "preview": ((1024, 1024), 80)}
+
+
+def rendition_path(file_hash: str, kind: str) -> str:
+    """Content-addressed storage path, shared by every record with the same file."""
+    return f"{file_hash[:2]}/{file_hash}_{kind}.webp"
+
+
+def _open_first_page(file_content: bytes, content_type: str) -> Image.Image | None:
+    if content_type == "application/pdf":
+        if pdfium is None:
+            return None
+        page = pdfium.PdfDocument(file_content)[0]
+        scale = max(RENDITIONS["preview"][0]) / max(page.get_size())
+        return page.render(scale=scale).to_pil()
+    image = Image.open(BytesIO(file_content))
+    image.draft("RGB", RENDITIONS["preview"][0])
+    return ImageOps.exif_transpose(image)
+
+
+def render_renditions(source: bytes | str, content_type: str) -> dict[str, bytes]:
+    """Renders WebP thumbnail and preview images. Runs in a worker process.
+
+    `source` is either the file content or a signed URL the worker downloads itself,
+    so direct uploads never pass through the API process.
+    """
+    if isinstance(source, str):
+        response = httpx.get(source, timeout=60)
+        response.raise_for_status()
+        source = response.content
+    image = _open_first_page(source, content_type)
+    if image is None:
+        return {}
+    image = image.convert("RGB")
+    renditions = {}
+    for kind, (size, quality) in sorted(
+        RENDITIONS.items(), key=lambda item: -item[1][0][0]
+    ):
+        image.thumbnail(size)
+        output = BytesIO()
+        image.save(output, format="WEBP", quality=quality, method=4)
+        renditions[kind] = output.getvalue()
+    return renditions
+
+
+@lru_cache
+def get_thumbnail_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+
+
+async def generate_record_renditions(
+    supabase: Client, file_hash: str, source: bytes | str, content_type: str
+):
+    """Background task: renders previews off the event loop and attaches them to records.
+
+    Rendering runs in a process pool and the blocking Supabase calls in threads.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        renditions = await loop.run_in_executor(
+            get_thumbnail_pool(), render_renditions, source, content_type
+        )
+        if not renditions:
+            logging.info("No preview available for %s file %s", content_type, file_hash)
+            return
+        bucket = supabase.storage.from_(THUMBNAIL_BUCKET)
+        urls = {}
+        for kind, image_bytes in renditions.items():
+            path = rendition_path(file_hash, kind)
+            with track("storage", "thumbnails.upload"):
+                await asyncio.to_thread(
+                    bucket.upload,
+                    path,
+                    image_bytes,
+                    file_options={"content-type": "image/webp", "upsert": "true"},
+                )
+            urls[f"{kind}_url"] = bucket.get_public_url(path)
+        await asyncio.to_thread(
+            timed_execute,
+            supabase.table("records")
+            .update({"thumbnail_url": urls["thumb_url"], "preview_url": urls["preview_url"]})
+            .eq("file_hash", file_hash),
+            "records.update",
+        )
+    except Exception as e:
+        logging.exception("Failed to generate previews for file %s: %s", file_hash, e)
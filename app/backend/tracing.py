@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import time
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TRACE_SLOW_STAGE_MS = float(os.environ.get("TRACE_SLOW_STAGE_MS", "1000"))
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH")
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "arogyachain")
+# Server-Timing exposes internal stage names and durations to every caller,
+# including unauthenticated ones, so it is only for internal deployments.
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_export_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "ok")
+
+    def __init__(self, name: str, parent_id: str | None, attributes: dict):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.ok = True
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """The spans of one request or Reflex event, rooted at a span named after it."""
+
+    def __init__(self, name: str, trace_id: str | None = None, parent_id: str | None = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.root = Span(name, parent_id, {})
+        self.spans: list[Span] = []
+
+    def stages(self) -> list[Span]:
+        return [span for span in self.spans if span.end_ns is not None]
+
+    def server_timing(self) -> str:
+        """Finished stages plus the elapsed total, as a `Server-Timing` header value."""
+        entries = [f"{span.name};dur={span.duration_ms:.1f}" for span in self.stages()]
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def breakdown(self) -> str:
+        return ", ".join(
+            f"{span.name}={span.duration_ms:.0f}ms" for span in [*self.stages(), self.root]
+        )
+
+    def to_otlp(self) -> dict:
+        """The trace as an OTLP/JSON `ExportTraceServiceRequest`."""
+
+        def otlp_span(span: Span) -> dict:
+            return {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 2 if span is self.root else 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in span.attributes.items()
+                ],
+                "status": {"code": 1 if span.ok else 2},
+            }
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": TRACE_SERVICE_NAME},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [otlp_span(self.root)]
+                            + [otlp_span(span) for span in self.stages()],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+def traceparent() -> str | None:
+    """W3C `traceparent` for the active span, so a downstream API call joins the trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    span = _current_span.get() or trace.root
+    return f"00-{trace.trace_id}-{span.span_id}-01"
+
+
+def parse_traceparent(header: str | None) -> tuple[str | None, str | None]:
+    match = _TRACEPARENT_RE.match(header or "")
+    return (match.group(1), match.group(2)) if match else (None, None)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times one stage of the active trace. Does nothing when no trace is active."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get() or trace.root
+    stage = Span(name, parent.span_id, attributes)
+    trace.spans.append(stage)
+    token = _current_span.set(stage)
+    try:
+        yield stage
+    except BaseException:
+        stage.ok = False
+        raise
+    finally:
+        stage.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def _export(trace: Trace):
+    line = json.dumps(trace.to_otlp(), separators=(",", ":"))
+    try:
+        with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as export_file:
+            export_file.write(line + "\n")
+    except OSError as e:
+        logging.warning("Failed to export trace to %s: %s", TRACE_EXPORT_PATH, e)
+
+
+def finish_trace(trace: Trace):
+    """Closes the root span, logs slow stages and exports the trace if configured."""
+    trace.root.end_ns = time.time_ns()
+    slow = [span for span in trace.stages() if span.duration_ms >= TRACE_SLOW_STAGE_MS]
+    if slow:
+        logging.warning(
+            "Slow %s (trace %s): %s over %.0fms; %s",
+            trace.root.name,
+            trace.trace_id,
+            ", ".join(span.name for span in slow),
+            TRACE_SLOW_STAGE_MS,
+            trace.breakdown(),
+        )
+    if TRACE_EXPORT_PATH:
+        _export(trace)
+
+
+@contextmanager
+def start_trace(name: str, trace_id: str | None = None, parent_id: str | None = None):
+    """Makes a new trace current for the enclosed code, or joins the active one as a span."""
+    if _current_trace.get() is not None:
+        with span(name):
+            yield _current_trace.get()
+        return
+    trace = Trace(name, trace_id, parent_id)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    except BaseException:
+        trace.root.ok = False
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        finish_trace(trace)
+
+
+class TracingMiddleware:
+    """ASGI middleware tracing each API request, reporting stages in `Server-Timing`
+    when SERVER_TIMING_ENABLED is set.
+
+    The header is added when the response starts, so it covers every stage of a
+    regular response but only those finished before the first byte of a stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        trace_id, parent_id = parse_traceparent(
+            headers.get(b"traceparent", b"").decode("latin-1")
+        )
+        name = f"{scope['method']} {scope['path']}"
+        with start_trace(name, trace_id, parent_id) as trace:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        trace.root.name = f"{scope['method']} {route}"
+                    trace.root.attributes["http.status_code"] = message["status"]
+                    if SERVER_TIMING_ENABLED:
+                        message["headers"] = [
+                            *message.get("headers", []),
+                            (b"server-timing", trace.server_timing().encode("latin-1")),
+                        ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
@@ -1,9 +1,25 @@
+import os
 import hashlib
+import httpx
 import qrcode
+import qrcode.image.svg
 import json
 from io import BytesIO
+from functools import lru_cache
 from typing import BinaryIO
 
+FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000").rstrip("/")
+API_URL = os.environ.get("API_URL", "http://localhost:8000").rstrip("/")
+QR_CACHE_SIZE = int(os.environ.get("QR_CACHE_SIZE", "1024"))
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+HASH_CHUNK_SIZE = 1024 * 1024
+NOTE_PREVIEW_CHARS = 200
+
+
+class FileTooLargeError(Exception):
+    pass
+
 
 def calculate_file_hash(file_content: bytes) -> str:
     sha256_hash = hashlib.sha256()
@@ -11,7 +27,31 @@ def calculate_file_hash(file_content: bytes) -> str:
     return sha256_hash.hexdigest()
 
 
-def generate_qr_code(record_id: str, tx_hash: str, frontend_url: str) -> bytes:
+def calculate_stream_hash(file: BinaryIO) -> str:
+    sha256_hash = hashlib.sha256()
+    while chunk := file.read(HASH_CHUNK_SIZE):
+        sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+async def hash_remote_file(url: str, max_bytes: int) -> tuple[str, int]:
+    """Streams a stored object and returns its SHA-256 and size without buffering it."""
+    sha256_hash = hashlib.sha256()
+    size = 0
+    async with httpx.AsyncClient(timeout=60) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(HASH_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FileTooLargeError(f"Object exceeds {max_bytes} bytes")
+                sha256_hash.update(chunk)
+    return sha256_hash.hexdigest(), size
+
+
+def generate_qr_code(
+    record_id: str, tx_hash: str, frontend_url: str, image_format: str = "png"
+) -> bytes:
     verify_url = f"{frontend_url}/verify/{record_id}"
     qr_data = {"record_id": record_id, "tx_hash": tx_hash, "verify_url": verify_url}
     qr = qrcode.QRCode(
@@ -22,8 +62,70 @@ def generate_qr_code(record_id: str, tx_hash: str, frontend_url: str) -> bytes:
     )
     qr.add_data(json.dumps(qr_data))
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
     img_byte_arr = BytesIO()
-    img.save(img_byte_arr, format="PNG")
+    if image_format == "svg":
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        img.save(img_byte_arr)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        img.save(img_byte_arr, format="PNG")
     img_byte_arr.seek(0)
-    return img_byte_arr.getvalue()
\ No newline at end of file
+    return img_byte_arr.getvalue()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr_code(record_id: str, tx_hash: str | None, image_format: str) -> bytes:
+    """Renders a record's QR code on demand; results are kept in a bounded LRU."""
+    return generate_qr_code(record_id, tx_hash, FRONTEND_URL, image_format)
+
+
+def qr_code_etag(record_id: str, tx_hash: str | None, image_format: str) -> str:
+    """Strong ETag for a QR code; it changes when a retried notarization sets a new tx_hash."""
+    digest = hashlib.sha256(f"{record_id}:{tx_hash}:{image_format}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def qr_code_url(record_id: str) -> str:
+    return f"{API_URL}/api/records/{record_id}/qr?format=svg"
+
+
+def diff_text(old: str, new: str) -> list[dict]:
+    """Returns a single {start, end, text} edit covering the changed middle of `old`.
+
+    Trimming the common prefix and suffix is linear and, for typical typing,
+    produces an edit the size of the change rather than of the note.
+    """
+    if old == new:
+        return []
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return [
+        {"start": prefix, "end": len(old) - suffix, "text": new[prefix : len(new) - suffix]}
+    ]
+
+
+def apply_text_edits(text: str, edits: list) -> str:
+    """Applies non-overlapping edits whose offsets refer to the original `text`."""
+    pieces = []
+    cursor = 0
+    for edit in sorted(edits, key=lambda edit: edit.start):
+        if edit.start < cursor or edit.end < edit.start or edit.end > len(text):
+            raise ValueError("Edits overlap or fall outside the note content.")
+        pieces.append(text[cursor : edit.start])
+        pieces.append(edit.text)
+        cursor = edit.end
+    pieces.append(text[cursor:])
+    return "".join(pieces)
+
+
+def summarize_note(note: dict) -> dict:
+    """Mirrors the notes content_preview/content_bytes columns for a full note row."""
+    summary = {key: value for key, value in note.items() if key != "content"}
+    summary["preview"] = note["content"][:NOTE_PREVIEW_CHARS]
+    summary["content_bytes"] = len(note["content"].encode("utf-8"))
+    return summary
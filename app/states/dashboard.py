@@ -1,6 +1,8 @@
 import reflex as rx
 from typing import TypedDict, Optional, Any
+from fastapi import HTTPException
 import logging
+from app.backend.client import get_api_client
 
 
 class NavItem(TypedDict):
@@ -18,6 +20,8 @@ class Record(TypedDict):
     tx_hash: Optional[str]
     notarization_status: str
     qr_url: Optional[str]
+    thumbnail_url: Optional[str]
+    preview_url: Optional[str]
     title: str
     notes: Optional[str]
     created_at: str
@@ -88,7 +92,6 @@ class DashboardState(rx.State):
             self.error_message = ""
         try:
             from app.states.state import AuthState
-            import httpx
 
             token = None
             async with self:
@@ -101,46 +104,25 @@ class DashboardState(rx.State):
                     )
                     self.is_loading = False
                 return
-            headers = {"Authorization": f"Bearer {token}"}
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    "http://localhost:8000/api/records", headers=headers
-                )
-            response.raise_for_status()
-            records_data = response.json()
-            from app.backend.database import get_supabase_client
-
-            supabase = get_supabase_client()
-            user_res = supabase.auth.get_user(token)
-            current_user = None
-            if user_res.user:
-                db_user_res = (
-                    supabase.table("users")
-                    .select("id, role, email")
-                    .eq("id", str(user_res.user.id))
-                    .single()
-                    .execute()
-                )
-                if db_user_res.data:
-                    current_user = db_user_res.data
+            client = get_api_client()
+            current_user = await client.current_user(token)
+            records_data = await client.list_records(token)
             async with self:
                 self.records = records_data if records_data else []
                 if current_user:
                     self.current_user_role = current_user.get("role", "")
                     self.current_user_email = current_user.get("email", "")
                     self.current_user_id = current_user.get("id", "")
-        except httpx.HTTPStatusError as e:
-            logging.exception(f"Error fetching records: {e}")
+        except HTTPException as e:
+            logging.exception("Error fetching records: %s", e.detail)
             async with self:
-                self.error_message = (
-                    f"Failed to fetch records: {e.response.status_code}"
-                )
+                self.error_message = f"Failed to fetch records: {e.status_code}"
         except Exception as e:
             logging.exception(
-                f"An unexpected error occurred while fetching records: {e}"
+                "An unexpected error occurred while fetching records: %s", e
             )
             async with self:
                 self.error_message = "An unexpected error occurred."
         finally:
             async with self:
-                self.is_loading = False
\ No newline at end of file
+                self.is_loading = False
@@ -1,13 +1,25 @@
 import reflex as rx
+import uuid
+import asyncio
+from datetime import datetime, timezone
 from typing import TypedDict, Optional
-import httpx
+from fastapi import HTTPException
 import logging
+from app.backend.client import get_api_client
+from app.backend.utils import diff_text, summarize_note
+
+AUTOSAVE_DEBOUNCE_MS = 800
+AUTOSAVE_WAIT_POLL_SECONDS = 0.05
+NOTES_PAGE_SIZE = 50
+MIN_SUGGEST_CHARS = 2
+SUGGEST_DEBOUNCE_MS = 150
 
 
 class Note(TypedDict):
     id: str
     title: str
-    content: str
+    preview: str
+    content_bytes: int
     created_at: str
     updated_at: str
 
@@ -21,17 +33,39 @@ class MedicineInfo(TypedDict):
     medicine_name: str
     generic_alternatives: list[Alternative]
     notes: str
+    source: str
+    cached: bool
+    stale: bool
+    cached_at: Optional[str]
+
+
+class MedicineSuggestion(TypedDict):
+    name: str
+    generic: str
 
 
 class NotesState(rx.State):
     notes: list[Note] = []
+    notes_has_more: bool = False
     is_loading: bool = False
+    is_loading_note: bool = False
     error_message: str = ""
     show_note_modal: bool = False
     current_note_id: Optional[str] = None
+    current_note_version: Optional[str] = None
+    editor_key: str = "new"
     current_title: str = ""
     current_content: str = ""
+    autosave_status: str = ""
+    _draft_title: str = ""
+    _draft_content: str = ""
+    _saved_title: str = ""
+    _saved_content: str = ""
+    _autosave_in_flight: bool = False
+    _autosave_dirty: bool = False
+    _save_in_flight: bool = False
     medicine_input: str = ""
+    medicine_suggestions: list[MedicineSuggestion] = []
     alternatives_result: Optional[MedicineInfo] = None
     is_fetching_alternatives: bool = False
     alternatives_error: str = ""
@@ -52,27 +86,64 @@ class NotesState(rx.State):
                     self.error_message = "Authentication token not found."
                     self.is_loading = False
                 return
-            headers = {"Authorization": f"Bearer {token}"}
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "http://localhost:8000/api/notes", headers=headers
-                )
-                response.raise_for_status()
-                notes_data = response.json()
-                async with self:
-                    self.notes = notes_data
-        except httpx.HTTPStatusError as e:
-            logging.exception(f"HTTP error fetching notes: {e}")
+            notes_page = await get_api_client().list_notes(token, NOTES_PAGE_SIZE, 0)
+            async with self:
+                self.notes = notes_page["items"]
+                self.notes_has_more = notes_page["has_more"]
+        except HTTPException as e:
+            logging.exception("HTTP error fetching notes: %s", e)
             async with self:
-                self.error_message = f"Failed to fetch notes: {e.response.status_code}"
+                self.error_message = f"Failed to fetch notes: {e.status_code}"
         except Exception as e:
-            logging.exception(f"Error fetching notes: {e}")
+            logging.exception("Error fetching notes: %s", e)
             async with self:
                 self.error_message = "An unexpected error occurred."
         finally:
             async with self:
                 self.is_loading = False
 
+    @rx.event(background=True)
+    async def fetch_more_notes(self):
+        from app.states.state import AuthState
+
+        async with self:
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
+            offset = len(self.notes)
+        try:
+            notes_page = await get_api_client().list_notes(
+                token, NOTES_PAGE_SIZE, offset
+            )
+            async with self:
+                loaded_ids = {note["id"] for note in self.notes}
+                self.notes = self.notes + [
+                    note for note in notes_page["items"] if note["id"] not in loaded_ids
+                ]
+                self.notes_has_more = notes_page["has_more"]
+        except Exception as e:
+            logging.exception("Error fetching more notes: %s", e)
+            yield rx.toast.error("Failed to load more notes.")
+
+    @rx.event(background=True)
+    async def update_medicine_input(self, value: str):
+        from app.states.state import AuthState
+
+        async with self:
+            self.medicine_input = value
+            if len(value.strip()) < MIN_SUGGEST_CHARS:
+                self.medicine_suggestions = []
+                return
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
+        try:
+            suggestions = await get_api_client().suggest_medicines(token, value)
+        except Exception as e:
+            logging.exception("Error fetching medicine suggestions: %s", e)
+            return
+        async with self:
+            if self.medicine_input == value:
+                self.medicine_suggestions = suggestions
+
     @rx.event(background=True)
     async def get_alternatives(self):
         if not self.medicine_input.strip():
@@ -92,31 +163,40 @@ class NotesState(rx.State):
                 token = auth_state.token
             if not token:
                 raise Exception("Not authenticated")
-            headers = {"Authorization": f"Bearer {token}"}
-            request_body = {"medicine_name": self.medicine_input}
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "http://localhost:8000/api/ai/medicine-alternatives",
-                    json=request_body,
-                    headers=headers,
-                    timeout=60,
-                )
-            response.raise_for_status()
-            result = response.json()
-            async with self:
-                self.alternatives_result = result
-        except httpx.HTTPStatusError as e:
-            error_detail = "AI service failed to process the request."
-            try:
-                error_detail = e.response.json().get("detail", error_detail)
-            except Exception as json_error:
-                logging.exception(f"Could not parse error response: {json_error}")
-            logging.exception(f"HTTP error fetching alternatives: {e} - {error_detail}")
+            medicine_name = self.medicine_input
+            async for event, data in get_api_client().stream_medicine_alternatives(
+                token, medicine_name
+            ):
+                async with self:
+                    if event == "alternative":
+                        partial = self.alternatives_result or {
+                            "medicine_name": medicine_name,
+                            "generic_alternatives": [],
+                            "notes": "",
+                            "source": "gemini",
+                            "cached": False,
+                            "stale": False,
+                            "cached_at": None,
+                        }
+                        self.alternatives_result = {
+                            **partial,
+                            "generic_alternatives": partial["generic_alternatives"]
+                            + [data],
+                        }
+                        self.is_fetching_alternatives = False
+                    elif event == "result":
+                        self.alternatives_result = data
+                    elif event == "error":
+                        raise HTTPException(status_code=503, detail=data["detail"])
+        except HTTPException as e:
+            error_detail = e.detail or "AI service failed to process the request."
+            logging.exception("HTTP error fetching alternatives: %s - %s", e, error_detail)
             async with self:
+                self.alternatives_result = None
                 self.alternatives_error = error_detail
             yield rx.toast.error(error_detail)
         except Exception as e:
-            logging.exception(f"Error fetching alternatives: {e}")
+            logging.exception("Error fetching alternatives: %s", e)
             async with self:
                 self.alternatives_error = "An unexpected error occurred."
             yield rx.toast.error("An unexpected error occurred.")
@@ -124,80 +204,269 @@ class NotesState(rx.State):
             async with self:
                 self.is_fetching_alternatives = False
 
-    @rx.event
-    def open_note_modal(self, note: Optional[Note] = None):
-        if note:
+    def _load_editor(self, note: Optional[dict]):
+        self.current_note_id = note["id"] if note else None
+        self.current_note_version = note["updated_at"] if note else None
+        self.current_title = note["title"] if note else ""
+        self.current_content = note["content"] if note else ""
+        self._saved_title = self._draft_title = self.current_title
+        self._saved_content = self._draft_content = self.current_content
+        self.autosave_status = ""
+
+    @rx.event(background=True)
+    async def open_note_modal(self, note: Optional[Note] = None):
+        """Opens the editor, loading the full note body only when it is needed."""
+        from app.states.state import AuthState
+
+        async with self:
+            self._load_editor(None)
+            # Stays fixed while the modal is open, so the first autosave of a new
+            # note assigning its id does not remount the inputs mid-typing.
+            self.editor_key = note["id"] if note else f"new-{uuid.uuid4().hex}"
+            self.show_note_modal = True
+            if not note:
+                return
             self.current_note_id = note["id"]
             self.current_title = note["title"]
-            self.current_content = note["content"]
-        else:
-            self.current_note_id = None
-            self.current_title = ""
-            self.current_content = ""
-        self.show_note_modal = True
+            self.is_loading_note = True
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
+        try:
+            full_note = await get_api_client().get_note(token, note["id"])
+            async with self:
+                if self.current_note_id == note["id"]:
+                    self._load_editor(full_note)
+        except Exception as e:
+            logging.exception("Error loading note %s: %s", note["id"], e)
+            async with self:
+                self.show_note_modal = False
+                self.current_note_id = None
+            yield rx.toast.error("Failed to load note.")
+        finally:
+            async with self:
+                self.is_loading_note = False
 
     @rx.event
     def close_note_modal(self):
+        """Closes the editor; any unsaved draft is flushed by a final autosave."""
         self.show_note_modal = False
-        self.current_note_id = None
-        self.current_title = ""
-        self.current_content = ""
+        return NotesState.autosave
+
+    @rx.event
+    def set_modal_open(self, is_open: bool):
+        if not is_open:
+            return NotesState.close_note_modal
+        self.show_note_modal = True
+
+    @rx.event
+    def set_draft_title(self, value: str):
+        self._draft_title = value
+        return NotesState.autosave
+
+    @rx.event
+    def set_draft_content(self, value: str):
+        self._draft_content = value
+        return NotesState.autosave
 
     @rx.event(background=True)
-    async def save_note(self, form_data: dict):
+    async def autosave(self):
+        """Saves the open draft, coalescing changes that arrive while a save is in flight.
+
+        Existing notes are sent as a PATCH holding only changed fields, with the
+        content as an edit against the last saved version.
+        """
+        from app.states.state import AuthState
+
         async with self:
-            self.is_loading = True
+            if self._save_in_flight:
+                return
+            if self._autosave_in_flight:
+                self._autosave_dirty = True
+                return
+            self._autosave_in_flight = True
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
         try:
-            from app.states.state import AuthState
+            while True:
+                async with self:
+                    self._autosave_dirty = False
+                    note_id = self.current_note_id
+                    note_version = self.current_note_version
+                    draft_title, draft_content = self._draft_title, self._draft_content
+                    saved_title, saved_content = self._saved_title, self._saved_content
+                if (draft_title, draft_content) == (saved_title, saved_content) or (
+                    not note_id and not draft_title.strip()
+                ):
+                    break
+                if note_id and note_version is None:
+                    # The full note is still loading; saving now would skip If-Match.
+                    break
+                async with self:
+                    self.autosave_status = "Saving..."
+                client = get_api_client()
+                if note_id:
+                    patch = {}
+                    if draft_title != saved_title:
+                        patch["title"] = draft_title
+                    if draft_content != saved_content:
+                        patch["content_edits"] = diff_text(saved_content, draft_content)
+                    saved_note = await client.patch_note(
+                        token, note_id, patch, note_version
+                    )
+                else:
+                    saved_note = await client.create_note(
+                        token, {"title": draft_title, "content": draft_content}
+                    )
+                async with self:
+                    if self.current_note_id == note_id:
+                        self.current_note_id = saved_note["id"]
+                        self.current_note_version = saved_note["updated_at"]
+                        self._saved_title = saved_note["title"]
+                        self._saved_content = saved_note["content"]
+                        self.current_title = self._draft_title
+                        self.current_content = self._draft_content
+                    self._put_first(saved_note)
+                    self.autosave_status = "Saved"
+                    if not self._autosave_dirty:
+                        break
+        except HTTPException as e:
+            logging.exception("Autosave failed: %s", e.detail)
+            async with self:
+                self.autosave_status = f"Not saved: {e.detail}"
+        except Exception as e:
+            logging.exception("Autosave failed: %s", e)
+            async with self:
+                self.autosave_status = "Not saved"
+        finally:
+            async with self:
+                self._autosave_in_flight = False
+
+    def _replace_note(self, note_id: str, note: Optional[Note]):
+        """Swaps one note in the list in place, or removes it when `note` is None."""
+        self.notes = [
+            (note if existing["id"] == note_id else existing)
+            for existing in self.notes
+            if existing["id"] != note_id or note is not None
+        ]
 
+    def _put_first(self, note: dict, replace_id: Optional[str] = None):
+        """Moves a saved note to the top, matching the list's updated_at ordering."""
+        if "content" in note:
+            note = summarize_note(note)
+        stale_ids = {note["id"], replace_id or note["id"]}
+        self.notes = [note] + [n for n in self.notes if n["id"] not in stale_ids]
+
+    async def _wait_for_autosave(self):
+        """Blocks new autosaves and waits for the one in flight, if any, to finish."""
+        async with self:
+            self._save_in_flight = True
+        while True:
             async with self:
-                auth_state = await self.get_state(AuthState)
-                token = auth_state.token
-                note_id = self.current_note_id
+                if not self._autosave_in_flight:
+                    return
+            await asyncio.sleep(AUTOSAVE_WAIT_POLL_SECONDS)
+
+    @rx.event(background=True)
+    async def save_note(self, form_data: dict):
+        """Saves the form explicitly, after any in-flight autosave has finished.
+
+        Waiting means the PUT carries the version that autosave produced, and a
+        new note created by autosave is updated rather than created twice.
+        """
+        note_data = {"title": form_data["title"], "content": form_data["content"]}
+        async with self:
+            self.show_note_modal = False
+        await self._wait_for_autosave()
+        try:
+            async for event in self._save_note(note_data):
+                yield event
+        finally:
+            async with self:
+                self._save_in_flight = False
+
+    async def _save_note(self, note_data: dict):
+        from app.states.state import AuthState
+
+        async with self:
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
+            note_id = self.current_note_id
+            note_version = self.current_note_version
+            already_saved = bool(note_id) and (self._saved_title, self._saved_content) == (
+                note_data["title"],
+                note_data["content"],
+            )
+            if already_saved:
+                self._draft_title, self._draft_content = self._saved_title, self._saved_content
+        if already_saved:
+            yield rx.toast.success("Note saved successfully!")
+            return
+        async with self:
+            previous_note = next((n for n in self.notes if n["id"] == note_id), None)
+            if previous_note:
+                optimistic_id = note_id
+                self._put_first({**previous_note, **note_data})
+            else:
+                optimistic_id = f"pending-{uuid.uuid4().hex}"
+                now = datetime.now(timezone.utc).isoformat()
+                self._put_first(
+                    {
+                        "id": optimistic_id,
+                        "created_at": now,
+                        "updated_at": now,
+                        **note_data,
+                    }
+                )
+        try:
             if not token:
                 raise Exception("Not authenticated")
-            headers = {"Authorization": f"Bearer {token}"}
-            note_data = {"title": form_data["title"], "content": form_data["content"]}
-            async with httpx.AsyncClient() as client:
-                if note_id:
-                    url = f"http://localhost:8000/api/notes/{note_id}"
-                    response = await client.put(url, json=note_data, headers=headers)
-                else:
-                    url = "http://localhost:8000/api/notes"
-                    response = await client.post(url, json=note_data, headers=headers)
-                response.raise_for_status()
-            yield NotesState.fetch_notes
-            yield NotesState.close_note_modal
+            client = get_api_client()
+            if note_id:
+                saved_note = await client.update_note(
+                    token, note_id, note_data, note_version
+                )
+            else:
+                saved_note = await client.create_note(token, note_data)
+            async with self:
+                self._put_first(saved_note, replace_id=optimistic_id)
+                if self.current_note_id == note_id:
+                    self.current_note_id = saved_note["id"]
+                    self.current_note_version = saved_note["updated_at"]
+                    self._saved_title = self._draft_title = saved_note["title"]
+                    self._saved_content = self._draft_content = saved_note["content"]
             yield rx.toast.success("Note saved successfully!")
         except Exception as e:
-            logging.exception(f"Error saving note: {e}")
-            yield rx.toast.error(f"Failed to save note: {e}")
-        finally:
+            error_detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logging.exception("Error saving note: %s", error_detail)
             async with self:
-                self.is_loading = False
+                self._replace_note(optimistic_id, previous_note)
+                self.current_title = note_data["title"]
+                self.current_content = note_data["content"]
+                self.show_note_modal = True
+            yield rx.toast.error(f"Failed to save note: {error_detail}")
 
     @rx.event(background=True)
     async def delete_note(self, note_id: str):
+        from app.states.state import AuthState
+
         async with self:
-            self.is_loading = True
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
+            position = next(
+                (i for i, n in enumerate(self.notes) if n["id"] == note_id), None
+            )
+            removed_note = self.notes[position] if position is not None else None
+            self._replace_note(note_id, None)
         try:
-            from app.states.state import AuthState
-
-            async with self:
-                auth_state = await self.get_state(AuthState)
-                token = auth_state.token
             if not token:
                 raise Exception("Not authenticated")
-            headers = {"Authorization": f"Bearer {token}"}
-            url = f"http://localhost:8000/api/notes/{note_id}"
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(url, headers=headers)
-            response.raise_for_status()
-            yield NotesState.fetch_notes
+            await get_api_client().delete_note(token, note_id)
             yield rx.toast.info("Note deleted.")
         except Exception as e:
-            logging.exception(f"Error deleting note: {e}")
+            logging.exception("Error deleting note: %s", e)
+            if removed_note:
+                async with self:
+                    self.notes = (
+                        self.notes[:position] + [removed_note] + self.notes[position:]
+                    )
             yield rx.toast.error("Failed to delete note.")
-        finally:
-            async with self:
-                self.is_loading = False
\ No newline at end of file
@@ -3,6 +3,7 @@ import os
 from supabase import create_client, Client
 from typing import Optional
 import logging
+from app.backend.metrics import timed_execute, track
 
 
 class State(rx.State):
@@ -36,18 +37,21 @@ class AuthState(rx.State):
             supabase = self._get_supabase_client()
             if self.is_signup:
                 try:
-                    response = supabase.auth.sign_up(
-                        {"email": self.email, "password": self.password}
-                    )
+                    with track("supabase", "auth.sign_up"):
+                        response = supabase.auth.sign_up(
+                            {"email": self.email, "password": self.password}
+                        )
                     user = response.user
                     if user:
-                        logging.info(f"Sign up initiated for {user.email}")
+                        logging.info("Sign up initiated for user %s", user.id)
                         user_data = {
                             "id": str(user.id),
                             "email": self.email,
                             "role": self.selected_role,
                         }
-                        supabase.table("users").insert(user_data).execute()
+                        timed_execute(
+                            supabase.table("users").insert(user_data), "users.insert"
+                        )
                         self.error_message = "Signup successful! Please check your email to confirm before logging in."
                         self.is_signup = False
                         self.email = ""
@@ -57,7 +61,7 @@ class AuthState(rx.State):
                             "Could not sign up user. Check password strength or logs."
                         )
                 except Exception as sign_up_error:
-                    logging.exception(f"Error during sign up: {sign_up_error}")
+                    logging.exception("Error during sign up: %s", sign_up_error)
                     if (
                         "already registered" in str(sign_up_error).lower()
                         or "user already registered" in str(sign_up_error).lower()
@@ -69,18 +73,19 @@ class AuthState(rx.State):
                         self.error_message = f"An error occurred during sign up."
             else:
                 try:
-                    response = supabase.auth.sign_in_with_password(
-                        {"email": self.email, "password": self.password}
-                    )
+                    with track("supabase", "auth.sign_in_with_password"):
+                        response = supabase.auth.sign_in_with_password(
+                            {"email": self.email, "password": self.password}
+                        )
                     if response.user and response.session:
-                        logging.info(f"Login successful for {response.user.email}")
+                        logging.info("Login successful for user %s", response.user.id)
                         self.token = response.session.access_token
-                        user_role_res = (
+                        user_role_res = timed_execute(
                             supabase.table("users")
                             .select("role")
                             .eq("id", str(response.user.id))
-                            .single()
-                            .execute()
+                            .single(),
+                            "users.select",
                         )
                         if user_role_res.data:
                             role = user_role_res.data.get("role")
@@ -93,10 +98,10 @@ class AuthState(rx.State):
                         else:
                             yield rx.redirect("/dashboard")
                 except Exception as e:
-                    logging.exception(f"Error during login: {e}")
+                    logging.exception("Error during login: %s", e)
                     self.error_message = "Invalid login credentials."
         except Exception as e:
-            logging.exception(f"Error during authentication: {e}")
+            logging.exception("Error during authentication: %s", e)
             self.error_message = f"An unexpected error occurred: {e}"
         self.is_loading = False
         yield
@@ -111,20 +116,20 @@ class AuthState(rx.State):
     @rx.event
     def on_load(self) -> rx.event.EventSpec | None:
         """Check if the user is authenticated on page load."""
-        logging.info(f"on_load triggered for path: {self.router.page.path}")
+        logging.info("on_load triggered for path: %s", self.router.page.path)
         is_public_page = (
             self.router.page.path == "/" or self.router.page.path.startswith("/verify")
         )
         if is_public_page:
-            logging.info(f"Allowing access to public page: {self.router.page.path}")
+            logging.info("Allowing access to public page: %s", self.router.page.path)
             return None
         if not self.token:
             logging.warning(
-                f"No token found. Redirecting to login page from: {self.router.page.path}"
+                "No token found. Redirecting to login page from: %s", self.router.page.path
             )
             return rx.redirect("/")
         logging.info(
-            f"User is authenticated on {self.router.page.path}, fetching records."
+            "User is authenticated on %s, fetching records.", self.router.page.path
         )
         from .dashboard import DashboardState
 
@@ -1,30 +1,70 @@
 import reflex as rx
+import os
+import json
 from typing import Optional
-import httpx
+from fastapi import HTTPException
 import logging
+from app.backend.client import get_api_client
+from app.backend.spool import (
+    SpooledUpload,
+    SpoolTooLargeError,
+    spool_upload,
+    discard_spool,
+)
+from app.backend.utils import MAX_UPLOAD_BYTES
+
+DIRECT_UPLOADS = os.environ.get("DIRECT_UPLOADS", "true").lower() == "true"
+FILE_INPUT_ID = "record-file"
+SELECTED_FILE_JS = f"""(() => {{
+    const input = document.getElementById("{FILE_INPUT_ID}");
+    const file = input && input.files[0];
+    return file ? {{name: file.name, type: file.type, size: file.size}} : null;
+}})()"""
+PUT_FILE_JS = """(async () => {{
+    const file = document.getElementById("{input_id}").files[0];
+    try {{
+        const response = await fetch({upload_url}, {{
+            method: "PUT",
+            headers: {{"content-type": file.type, "x-upsert": "false"}},
+            body: file,
+        }});
+        return response.ok ? {{ok: true}} : {{ok: false, error: `Storage returned ${{response.status}}`}};
+    }} catch (error) {{
+        return {{ok: false, error: String(error)}};
+    }}
+}})()"""
 
 
 class UploadState(rx.State):
     patient_email: str = ""
     record_title: str = ""
     notes: str = ""
-    uploaded_file: Optional[rx.UploadFile] = None
+    spooled_file: Optional[SpooledUpload] = None
     is_uploading: bool = False
     upload_progress: int = 0
     upload_error: str = ""
+    pending_upload_path: str = ""
+    pending_content_type: str = ""
 
     @rx.event
     async def handle_upload(self, files: list[rx.UploadFile]):
         if not files:
             self.upload_error = "No file was selected for upload."
             return
-        self.uploaded_file = files[0]
+        try:
+            spooled_file = await spool_upload(files[0], MAX_UPLOAD_BYTES)
+        except SpoolTooLargeError:
+            self.upload_error = "File is larger than the upload limit."
+            return
+        if self.spooled_file and self.spooled_file["path"] != spooled_file["path"]:
+            discard_spool(self.spooled_file)
+        self.spooled_file = spooled_file
         self.upload_error = ""
-        yield rx.toast.info(f"Selected file: {self.uploaded_file.filename}")
+        yield rx.toast.info(f"Selected file: {spooled_file['filename']}")
 
     @rx.event
     async def submit_record(self):
-        if not self.patient_email or not self.record_title or (not self.uploaded_file):
+        if not self.patient_email or not self.record_title or (not self.spooled_file):
             yield rx.toast.error(
                 "Patient Email, Record Title, and a file are required."
             )
@@ -42,49 +82,127 @@ class UploadState(rx.State):
                     "Authentication token not found. Please log in again."
                 )
                 return
-            file_content = await self.uploaded_file.read()
-            async with httpx.AsyncClient(timeout=60) as client:
-                files = {
-                    "file": (
-                        self.uploaded_file.filename,
-                        file_content,
-                        self.uploaded_file.content_type,
-                    )
-                }
-                data = {
-                    "patient_email": self.patient_email,
-                    "title": self.record_title,
-                    "notes": self.notes,
-                }
-                headers = {"Authorization": f"Bearer {token}"}
-                response = await client.post(
-                    "http://localhost:8000/api/records/upload",
-                    files=files,
-                    data=data,
-                    headers=headers,
-                )
-            response.raise_for_status()
-            self.patient_email = ""
-            self.record_title = ""
-            self.notes = ""
-            self.uploaded_file = None
-            self.upload_error = ""
+            await get_api_client().upload_record(
+                token,
+                self.patient_email,
+                self.record_title,
+                self.notes,
+                self.spooled_file,
+            )
+            discard_spool(self.spooled_file)
+            self._reset_form()
             yield rx.toast.success("Record uploaded successfully!")
             yield rx.redirect("/records")
-        except httpx.HTTPStatusError as e:
-            error_detail = "An error occurred during upload."
-            try:
-                error_detail = e.response.json().get("detail", error_detail)
-            except Exception as json_error:
-                logging.exception(f"Error parsing error response: {json_error}")
+        except HTTPException as e:
+            error_detail = e.detail or "An error occurred during upload."
             logging.exception(
-                f"HTTP error during record submission: {e} - {error_detail}"
+                "HTTP error during record submission: %s - %s", e, error_detail
             )
             self.upload_error = f"Upload failed: {error_detail}"
             yield rx.toast.error(f"Upload failed: {error_detail}")
         except Exception as e:
-            logging.exception(f"Failed to upload record: {e}")
+            logging.exception("Failed to upload record: %s", e)
             self.upload_error = f"An unexpected error occurred: {e}"
             yield rx.toast.error(f"An unexpected error occurred: {e}")
         finally:
-            self.is_uploading = False
\ No newline at end of file
+            self.is_uploading = False
+
+    def _reset_form(self):
+        self.patient_email = ""
+        self.record_title = ""
+        self.notes = ""
+        self.spooled_file = None
+        self.upload_error = ""
+        self.pending_upload_path = ""
+        self.pending_content_type = ""
+
+    def _fail_direct_upload(self, error_detail: str):
+        logging.error("Direct upload failed: %s", error_detail)
+        self.upload_error = f"Upload failed: {error_detail}"
+        self.is_uploading = False
+        self.pending_upload_path = ""
+        return rx.toast.error(f"Upload failed: {error_detail}")
+
+    @rx.event
+    def start_direct_upload(self):
+        """Reads the selected file's metadata in the browser; bytes never reach the app tier."""
+        if not self.patient_email or not self.record_title:
+            return rx.toast.error("Patient Email, Record Title, and a file are required.")
+        self.is_uploading = True
+        self.upload_error = ""
+        return rx.call_script(SELECTED_FILE_JS, callback=UploadState.request_upload_url)
+
+    @rx.event
+    async def request_upload_url(self, file_info: Optional[dict]):
+        if not file_info:
+            self.is_uploading = False
+            yield rx.toast.error("Patient Email, Record Title, and a file are required.")
+            return
+        try:
+            from app.states.state import AuthState
+
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.token
+            if not token:
+                yield self._fail_direct_upload("Authentication token not found.")
+                return
+            upload = await get_api_client().create_upload_url(
+                token,
+                {
+                    "patient_email": self.patient_email,
+                    "filename": file_info["name"],
+                    "content_type": file_info["type"],
+                },
+            )
+            if file_info["size"] > upload["max_bytes"]:
+                yield self._fail_direct_upload(
+                    f"File is larger than {upload['max_bytes'] // (1024 * 1024)}MB."
+                )
+                return
+            self.pending_upload_path = upload["path"]
+            self.pending_content_type = file_info["type"]
+            yield rx.call_script(
+                PUT_FILE_JS.format(
+                    input_id=FILE_INPUT_ID, upload_url=json.dumps(upload["upload_url"])
+                ),
+                callback=UploadState.finalize_direct_upload,
+            )
+        except HTTPException as e:
+            yield self._fail_direct_upload(
+                e.detail or "An error occurred during upload."
+            )
+        except Exception as e:
+            logging.exception("Failed to prepare direct upload: %s", e)
+            yield self._fail_direct_upload(str(e))
+
+    @rx.event
+    async def finalize_direct_upload(self, result: dict):
+        if not result or not result.get("ok"):
+            yield self._fail_direct_upload(
+                (result or {}).get("error", "Storage upload failed.")
+            )
+            return
+        try:
+            from app.states.state import AuthState
+
+            auth_state = await self.get_state(AuthState)
+            await get_api_client().finalize_upload(
+                auth_state.token,
+                {
+                    "path": self.pending_upload_path,
+                    "content_type": self.pending_content_type,
+                    "title": self.record_title,
+                    "notes": self.notes,
+                },
+            )
+            self._reset_form()
+            self.is_uploading = False
+            yield rx.toast.success("Record uploaded successfully!")
+            yield rx.redirect("/records")
+        except HTTPException as e:
+            yield self._fail_direct_upload(
+                e.detail or "An error occurred during upload."
+            )
+        except Exception as e:
+            logging.exception("Failed to finalize direct upload: %s", e)
+            yield self._fail_direct_upload(str(e))
@@ -1,7 +1,8 @@
 import reflex as rx
 from typing import Optional, TypedDict
-import httpx
+from fastapi import HTTPException
 import logging
+from app.backend.client import get_api_client
 
 
 class VerificationDetails(TypedDict):
@@ -50,30 +51,20 @@ class VerifyState(rx.State):
             self.verification_result = None
             yield
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"http://localhost:8000/api/verify/{record_id_to_verify}"
-                )
-            response.raise_for_status()
-            result = response.json()
+            result = await get_api_client().verify_record(record_id_to_verify)
             async with self:
                 self.verification_result = result
-        except httpx.HTTPStatusError as e:
-            error_detail = f"Verification failed: {e.response.status_code}"
-            try:
-                error_detail = e.response.json().get("detail", error_detail)
-            except Exception as json_e:
-                logging.exception(f"Error parsing error response: {json_e}")
-                pass
+        except HTTPException as e:
+            error_detail = e.detail or f"Verification failed: {e.status_code}"
             async with self:
                 self.error_message = error_detail
             logging.exception(
-                f"Verification HTTP error for {record_id_to_verify}: {e} - {error_detail}"
+                "Verification HTTP error for %s: %s - %s", record_id_to_verify, e, error_detail
             )
         except Exception as e:
             async with self:
                 self.error_message = f"An unexpected error occurred."
-            logging.exception(f"Verification failed for {record_id_to_verify}: {e}")
+            logging.exception("Verification failed for %s: %s", record_id_to_verify, e)
         finally:
             async with self:
                 self.is_verifying = False
\ No newline at end of file
@@ -0,0 +1,52 @@
+import sys
+import argparse
+from benchmarks.report import compare_operations, format_table, load_results
+
+# Compares two saved runs of the same kind and exits non-zero on a regression:
+#   python -m benchmarks.compare benchmarks/results/load-main-....json \
+#       benchmarks/results/load-branch-....json --threshold 0.15
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change that counts as a regression (default 0.1 = 10%%).",
+    )
+    args = parser.parse_args(argv)
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    if baseline["kind"] != current["kind"]:
+        parser.error(f"Cannot compare a {baseline['kind']} run with a {current['kind']} run.")
+    rows = compare_operations(baseline, current, args.threshold)
+    print(f"baseline: {baseline['label']} @ {baseline['git_commit']} ({baseline['timestamp']})")
+    print(f"current:  {current['label']} @ {current['git_commit']} ({current['timestamp']})")
+    print(
+        format_table(
+            ["operation", "metric", "baseline", "current", "change", ""],
+            [
+                [
+                    row["operation"],
+                    row["metric"],
+                    f"{row['baseline']:.3f}",
+                    f"{row['current']:.3f}",
+                    f"{row['change']:+.1%}",
+                    "REGRESSION" if row["regression"] else "",
+                ]
+                for row in rows
+            ],
+        )
+    )
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
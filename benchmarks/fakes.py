@@ -0,0 +1,390 @@
+import os
+import sys
+import time
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from app.backend.fake_gemini import sample_latency
+
+FAKE_DB_LATENCY = os.environ.get("FAKE_DB_LATENCY", "lognormal:0.004,0.4")
+FAKE_STORAGE_LATENCY = os.environ.get("FAKE_STORAGE_LATENCY", "lognormal:0.04,0.5")
+FAKE_AUTH_LATENCY = os.environ.get("FAKE_AUTH_LATENCY", "lognormal:0.02,0.3")
+FAKE_CHAIN_LATENCY = os.environ.get("FAKE_CHAIN_LATENCY", "lognormal:0.5,0.5")
+FAKE_STORAGE_URL = "http://fake-storage.local"
+NOTE_PREVIEW_CHARS = 200
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _wait(spec: str):
+    # The real supabase-py and web3 clients block the calling thread, so the
+    # fakes do too; an event loop stalled on them is part of what gets measured.
+    seconds = sample_latency(spec)
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _note_columns(row: dict):
+    """Mirrors the generated columns from the note_summaries migration."""
+    content = row.get("content") or ""
+    row["content_preview"] = content[:NOTE_PREVIEW_CHARS]
+    row["content_bytes"] = len(content.encode("utf-8"))
+
+
+_GENERATED_COLUMNS = {"notes": _note_columns}
+
+
+class FakeTable:
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def write(self, row: dict) -> dict:
+        if generate := _GENERATED_COLUMNS.get(self.name):
+            generate(row)
+        self.rows[row["id"]] = row
+        return dict(row)
+
+
+class FakeQuery:
+    """The subset of the postgrest query builder the service layer uses."""
+
+    def __init__(self, database: "FakeDatabase", table: FakeTable):
+        self._database = database
+        self._table = table
+        self._action = "select"
+        self._payload = None
+        self._columns = "*"
+        self._filters: list[tuple[str, str, object]] = []
+        self._order: list[tuple[str, bool]] = []
+        self._range: tuple[int, int] | None = None
+        self._limit: int | None = None
+        self._single = False
+        self._on_conflict = "id"
+        self._ignore_duplicates = False
+
+    def select(self, columns: str = "*", count=None):
+        self._columns = columns
+        return self
+
+    def insert(self, data):
+        self._action, self._payload = "insert", data
+        return self
+
+    def upsert(self, data, on_conflict: str = "", ignore_duplicates: bool = False):
+        self._action, self._payload = "upsert", data
+        self._on_conflict = on_conflict or "id"
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: dict):
+        self._action, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def _filter(self, op: str, column: str, value):
+        self._filters.append((op, column, value))
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column: str, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column: str, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column: str, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column: str, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column: str, value):
+        return self._filter("lte", column, value)
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self._range = (start, end)
+        return self
+
+    def limit(self, size: int):
+        self._limit = size
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    maybe_single = single
+
+    def _matches(self, row: dict) -> bool:
+        for op, column, value in self._filters:
+            actual = row.get(column)
+            if op == "eq" and actual != value:
+                return False
+            if op == "neq" and actual == value:
+                return False
+            if op in ("gt", "gte", "lt", "lte"):
+                if actual is None:
+                    return False
+                if op == "gt" and not actual > value:
+                    return False
+                if op == "gte" and not actual >= value:
+                    return False
+                if op == "lt" and not actual < value:
+                    return False
+                if op == "lte" and not actual <= value:
+                    return False
+        return True
+
+    def _candidates(self) -> list[dict]:
+        for op, column, value in self._filters:
+            if op == "eq" and column == "id":
+                row = self._table.rows.get(value)
+                return [row] if row is not None and self._matches(row) else []
+        return [row for row in self._table.rows.values() if self._matches(row)]
+
+    def _project(self, row: dict) -> dict:
+        if self._columns.strip() == "*":
+            return dict(row)
+        projected = {}
+        for column in self._columns.split(","):
+            alias, _, source = column.strip().rpartition(":")
+            projected[alias or source] = row.get(source)
+        return projected
+
+    def _rows(self, payload) -> list[dict]:
+        return payload if isinstance(payload, list) else [payload]
+
+    def _conflicting(self, item: dict) -> dict | None:
+        if self._on_conflict == "id":
+            return self._table.rows.get(item.get("id"))
+        value = item.get(self._on_conflict)
+        return next(
+            (row for row in self._table.rows.values() if row.get(self._on_conflict) == value),
+            None,
+        )
+
+    def _run(self) -> list[dict]:
+        table = self._table
+        with table.lock:
+            if self._action in ("insert", "upsert"):
+                written = []
+                for item in self._rows(self._payload):
+                    existing = self._conflicting(item) if self._action == "upsert" else None
+                    if existing and self._ignore_duplicates:
+                        continue
+                    row = {**(existing or {}), **item}
+                    row.setdefault("id", str(uuid.uuid4()))
+                    row.setdefault("created_at", _now())
+                    row.setdefault("updated_at", row["created_at"])
+                    written.append(table.write(row))
+                return written
+            rows = self._candidates()
+            if self._action == "update":
+                return [table.write({**row, **self._payload}) for row in rows]
+            if self._action == "delete":
+                return [table.rows.pop(row["id"]) for row in rows]
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self._range is not None:
+            rows = rows[self._range[0] : self._range[1] + 1]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        return [self._project(row) for row in rows]
+
+    def execute(self):
+        _wait(self._database.latency)
+        self._database.calls += 1
+        rows = self._run()
+        if self._single:
+            return SimpleNamespace(data=rows[0] if rows else None, count=None)
+        return SimpleNamespace(data=rows, count=len(rows))
+
+
+class FakeRpc:
+    def __init__(self, database: "FakeDatabase", name: str, params: dict):
+        self._database = database
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        _wait(self._database.latency)
+        self._database.calls += 1
+        return SimpleNamespace(data=[], count=0)
+
+
+class FakeDatabase:
+    def __init__(self, latency: str = FAKE_DB_LATENCY):
+        self.latency = latency
+        self.calls = 0
+        self._tables: dict[str, FakeTable] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        if name not in self._tables:
+            self._tables[name] = FakeTable(name)
+        return FakeQuery(self, self._tables[name])
+
+    def load(self, name: str, rows: list[dict]) -> list[dict]:
+        """Inserts seed rows without the simulated round trip."""
+        return self.table(name).insert(rows)._run()
+
+    def rows(self, name: str) -> list[dict]:
+        return list(self._tables[name].rows.values()) if name in self._tables else []
+
+
+class FakeBucket:
+    def __init__(self, storage: "FakeStorage", name: str):
+        self._storage = storage
+        self.name = name
+
+    def _url(self, path: str) -> str:
+        return f"{FAKE_STORAGE_URL}/{self.name}/{path}"
+
+    def upload(self, path: str, file, file_options: dict | None = None):
+        # Reading the whole stream stands in for sending it over the network.
+        size = len(file) if isinstance(file, bytes) else len(file.read())
+        _wait(self._storage.latency)
+        with self._storage.lock:
+            self._storage.objects[(self.name, path)] = size
+        return SimpleNamespace(path=path, full_path=f"{self.name}/{path}")
+
+    def get_public_url(self, path: str) -> str:
+        return self._url(path)
+
+    def remove(self, paths: list[str]):
+        _wait(self._storage.latency)
+        with self._storage.lock:
+            for path in paths:
+                self._storage.objects.pop((self.name, path), None)
+        return [{"name": path} for path in paths]
+
+    def create_signed_upload_url(self, path: str) -> dict:
+        _wait(self._storage.latency)
+        token = uuid.uuid4().hex
+        return {"signed_url": f"{self._url(path)}?token={token}", "token": token, "path": path}
+
+    def create_signed_url(self, path: str, expires_in: int) -> dict:
+        _wait(self._storage.latency)
+        return {"signedURL": f"{self._url(path)}?expires={expires_in}"}
+
+
+class FakeStorage:
+    def __init__(self, latency: str = FAKE_STORAGE_LATENCY):
+        self.latency = latency
+        self.objects: dict[tuple[str, str], int] = {}
+        self.lock = threading.Lock()
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self, bucket)
+
+
+class FakeUser(SimpleNamespace):
+    def dict(self) -> dict:
+        return dict(vars(self))
+
+
+class FakeAuth:
+    def __init__(self, latency: str = FAKE_AUTH_LATENCY):
+        self.latency = latency
+        self.tokens: dict[str, FakeUser] = {}
+
+    def add_user(self, token: str, user_id: str, email: str):
+        self.tokens[token] = FakeUser(id=user_id, email=email, aud="authenticated")
+
+    def get_user(self, token: str):
+        _wait(self.latency)
+        user = self.tokens.get(token)
+        if user is None:
+            raise ValueError("Invalid token")
+        return SimpleNamespace(user=user)
+
+
+class FakeSupabase:
+    """In-memory stand-in for the supabase-py `Client`: tables, RPC, storage and auth."""
+
+    def __init__(
+        self,
+        db_latency: str = FAKE_DB_LATENCY,
+        storage_latency: str = FAKE_STORAGE_LATENCY,
+        auth_latency: str = FAKE_AUTH_LATENCY,
+    ):
+        self.database = FakeDatabase(db_latency)
+        self.storage = FakeStorage(storage_latency)
+        self.auth = FakeAuth(auth_latency)
+
+    def table(self, name: str) -> FakeQuery:
+        return self.database.table(name)
+
+    def rpc(self, name: str, params: dict | None = None) -> FakeRpc:
+        return FakeRpc(self.database, name, params or {})
+
+    def add_user(self, role: str, email: str, token: str) -> dict:
+        user_id = str(uuid.uuid4())
+        self.database.load("users", [{"id": user_id, "email": email, "role": role}])
+        self.auth.add_user(token, user_id, email)
+        return {"id": user_id, "email": email, "role": role, "token": token}
+
+
+class FakeChain:
+    """Stands in for the notarization contract with a configurable confirmation delay."""
+
+    def __init__(self, latency: str = FAKE_CHAIN_LATENCY):
+        self.latency = latency
+        self.notarized: dict[str, int] = {}
+
+    def notarize_hash(self, record_hash: str) -> str:
+        _wait(self.latency)
+        self.notarized[record_hash] = int(time.time())
+        return "0x" + hashlib.sha256(record_hash.encode()).hexdigest()
+
+    def verify_hash_on_chain(self, record_hash: str) -> dict:
+        _wait(self.latency)
+        timestamp = self.notarized.get(record_hash)
+        return {
+            "is_verified": timestamp is not None,
+            "timestamp": timestamp or 0,
+            "doctor_address": "0x_fake_doctor_address" if timestamp else None,
+            "error": None,
+        }
+
+
+def install_fakes(api, supabase: FakeSupabase, chain: FakeChain):
+    """Points the API and every loaded `app` module at the fakes.
+
+    FastAPI routes get the fake client through dependency overrides; modules that
+    imported `get_supabase_client` or the chain helpers by name are patched so
+    background work (usage metering, thumbnails) uses the fakes as well.
+    """
+    from app.backend import blockchain, database
+
+    real_client = database.get_supabase_client
+    patches = {
+        real_client: lambda: supabase,
+        blockchain.notarize_hash: chain.notarize_hash,
+        blockchain.verify_hash_on_chain: chain.verify_hash_on_chain,
+    }
+    for module in list(sys.modules.values()):
+        if not getattr(module, "__name__", "").startswith("app."):
+            continue
+        for attribute, value in list(vars(module).items()):
+            try:
+                replacement = patches.get(value)
+            except TypeError:
+                continue
+            if replacement is not None:
+                setattr(module, attribute, replacement)
+    api.dependency_overrides[real_client] = lambda: supabase
@@ -0,0 +1,480 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from io import BytesIO
+from collections import Counter, defaultdict
+
+# End-to-end load test: boots the FastAPI `api` in process with Supabase (DB,
+# storage, auth), the chain and Gemini replaced by local fakes, then drives a
+# weighted mix of requests from concurrent closed-loop clients:
+#   python -m benchmarks.load --concurrency 32 --duration 30 --label main
+#   python -m benchmarks.load --mix verify=5,upload=1 --chain-latency fixed:2
+# Each run is saved under benchmarks/results/ for `python -m benchmarks.compare`.
+
+DEFAULT_MIX = (
+    "list_records=20,verify=15,note_list=15,note_get=15,note_create=8,"
+    "note_update=8,note_delete=3,upload=4,ai=8,ai_suggest=4"
+)
+CATALOG_MEDICINES = [
+    "Lipitor",
+    "Atorvastatin",
+    "Crestor",
+    "Glucophage",
+    "Metformin",
+    "Norvasc",
+    "Nexium",
+    "Synthroid",
+    "Toprol XL",
+    "Protonix",
+]
+UNCATALOGED_MEDICINES = 500
+LOOP_LAG_INTERVAL_SECONDS = 0.05
+MEMORY_SAMPLE_SECONDS = 0.25
+
+
+class BenchState:
+    """Users and ids the request mix draws from; grows as uploads and notes land."""
+
+    def __init__(self, doctors: list[dict], patients: list[dict], record_ids: list[str]):
+        self.doctors = doctors
+        self.patients = patients
+        self.record_ids = record_ids
+        self.note_ids: dict[str, list[str]] = defaultdict(list)
+        self.upload_body = _png_bytes()
+
+
+def _png_bytes(width: int = 1024, height: int = 768) -> bytes:
+    from PIL import Image
+
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    output = BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _headers(user: dict) -> dict:
+    return {"Authorization": f"Bearer {user['token']}"}
+
+
+def _note_body(rng: random.Random) -> dict:
+    words = rng.randint(30, 600)
+    return {
+        "title": f"Bench note {rng.randrange(10**6)}",
+        "content": " ".join(
+            rng.choice(("dose", "bp", "fever", "sleep", "diet")) for _ in range(words)
+        ),
+    }
+
+
+def _medicine_name(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return rng.choice(CATALOG_MEDICINES)
+    return f"Benchmedin {min(int(rng.paretovariate(1.2)), UNCATALOGED_MEDICINES)}"
+
+
+async def op_upload(client, state: BenchState, rng: random.Random):
+    doctor = rng.choice(state.doctors)
+    patient = rng.choice(state.patients)
+    body = state.upload_body + rng.randbytes(16)
+    response = await client.post(
+        "/api/records/upload",
+        headers=_headers(doctor),
+        data={"patient_email": patient["email"], "title": "Bench scan", "notes": "load test"},
+        files={"file": ("scan.png", body, "image/png")},
+    )
+    if response.status_code == 200:
+        state.record_ids.append(response.json()["id"])
+    return response
+
+
+async def op_list_records(client, state: BenchState, rng: random.Random):
+    user = rng.choice(state.doctors if rng.random() < 0.5 else state.patients)
+    return await client.get("/api/records", headers=_headers(user))
+
+
+async def op_verify(client, state: BenchState, rng: random.Random):
+    return await client.get(f"/api/verify/{rng.choice(state.record_ids)}")
+
+
+async def op_note_create(client, state: BenchState, rng: random.Random):
+    patient = rng.choice(state.patients)
+    response = await client.post(
+        "/api/notes", headers=_headers(patient), json=_note_body(rng)
+    )
+    if response.status_code == 200:
+        state.note_ids[patient["id"]].append(response.json()["id"])
+    return response
+
+
+async def op_note_list(client, state: BenchState, rng: random.Random):
+    patient = rng.choice(state.patients)
+    return await client.get("/api/notes", headers=_headers(patient), params={"limit": 50})
+
+
+async def op_note_get(client, state: BenchState, rng: random.Random):
+    patient = rng.choice(state.patients)
+    if not state.note_ids[patient["id"]]:
+        return await op_note_create(client, state, rng)
+    note_id = rng.choice(state.note_ids[patient["id"]])
+    return await client.get(f"/api/notes/{note_id}", headers=_headers(patient))
+
+
+async def op_note_update(client, state: BenchState, rng: random.Random):
+    patient = rng.choice(state.patients)
+    if not state.note_ids[patient["id"]]:
+        return await op_note_create(client, state, rng)
+    note_id = rng.choice(state.note_ids[patient["id"]])
+    return await client.put(
+        f"/api/notes/{note_id}", headers=_headers(patient), json=_note_body(rng)
+    )
+
+
+async def op_note_delete(client, state: BenchState, rng: random.Random):
+    patient = rng.choice(state.patients)
+    note_ids = state.note_ids[patient["id"]]
+    if not note_ids:
+        return await op_note_create(client, state, rng)
+    note_id = note_ids.pop(rng.randrange(len(note_ids)))
+    return await client.delete(f"/api/notes/{note_id}", headers=_headers(patient))
+
+
+async def op_ai(client, state: BenchState, rng: random.Random):
+    return await client.post(
+        "/api/ai/medicine-alternatives",
+        headers=_headers(rng.choice(state.patients)),
+        json={"medicine_name": _medicine_name(rng)},
+    )
+
+
+async def op_ai_suggest(client, state: BenchState, rng: random.Random):
+    name = rng.choice(CATALOG_MEDICINES)
+    return await client.get(
+        "/api/ai/medicines/suggest",
+        headers=_headers(rng.choice(state.patients)),
+        params={"q": name[: rng.randint(2, 5)]},
+    )
+
+
+OPERATIONS = {
+    "upload": op_upload,
+    "list_records": op_list_records,
+    "verify": op_verify,
+    "note_create": op_note_create,
+    "note_list": op_note_list,
+    "note_get": op_note_get,
+    "note_update": op_note_update,
+    "note_delete": op_note_delete,
+    "ai": op_ai,
+    "ai_suggest": op_ai_suggest,
+}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'. Choose from {', '.join(OPERATIONS)}.")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def configure_environment(args: argparse.Namespace, workdir: str):
+    """Settings read at import time by the app, so this runs before it is imported."""
+    os.environ["AI_BACKEND"] = "fake"
+    if args.ai_latency:
+        os.environ["FAKE_AI_LATENCY"] = args.ai_latency
+    os.environ["FAKE_AI_SEED"] = str(args.seed)
+    os.environ["AI_CACHE_PATH"] = os.path.join(workdir, "ai_cache.db")
+    os.environ["SEARCH_INDEX_PATH"] = os.path.join(workdir, "search_index.db")
+    os.environ.setdefault("AI_QUOTA_REQUESTS", str(10**9))
+
+
+def seed(supabase, chain, args: argparse.Namespace, rng: random.Random) -> BenchState:
+    doctors = [
+        supabase.add_user("doctor", f"doctor{index}@bench.local", f"bench-doctor-{index}")
+        for index in range(args.doctors)
+    ]
+    patients = [
+        supabase.add_user("patient", f"patient{index}@bench.local", f"bench-patient-{index}")
+        for index in range(args.patients)
+    ]
+    records = []
+    for index in range(args.records):
+        file_hash = rng.randbytes(32).hex()
+        if rng.random() < 0.9:
+            chain.notarized[file_hash] = int(time.time())
+        records.append(
+            {
+                "patient_id": rng.choice(patients)["id"],
+                "doctor_id": rng.choice(doctors)["id"],
+                "file_url": f"http://fake-storage.local/records/seed/{file_hash}.pdf",
+                "file_hash": file_hash,
+                "tx_hash": f"0x{file_hash}",
+                "notarization_status": "success",
+                "title": f"Seed record {index}",
+                "notes": None,
+            }
+        )
+    record_ids = [row["id"] for row in supabase.database.load("records", records)]
+    state = BenchState(doctors, patients, record_ids)
+    for patient in patients:
+        notes = [
+            {**_note_body(rng), "patient_id": patient["id"]}
+            for _ in range(args.notes_per_patient)
+        ]
+        state.note_ids[patient["id"]] = [
+            row["id"] for row in supabase.database.load("notes", notes)
+        ]
+    return state
+
+
+async def sample_memory(process, stop: asyncio.Event, samples: list[int]):
+    while not stop.is_set():
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except Exception:
+                pass
+        samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), MEMORY_SAMPLE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def sample_loop_lag(stop: asyncio.Event, lags: list[float]):
+    """How late the event loop wakes a sleeper; high values mean blocking calls on it."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LOOP_LAG_INTERVAL_SECONDS
+        await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def drive(client, state: BenchState, args: argparse.Namespace, weights: dict) -> dict:
+    names = list(weights)
+    name_weights = list(weights.values())
+    samples: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + args.warmup
+    deadline = measure_from + args.duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(args.seed * 1000 + worker_id)
+        while loop.time() < deadline:
+            name = rng.choices(names, name_weights)[0]
+            started = loop.time()
+            try:
+                status = (await OPERATIONS[name](client, state, rng)).status_code
+            except Exception as e:
+                status = type(e).__name__
+            if started >= measure_from:
+                samples[name].append(loop.time() - started)
+                statuses[name][str(status)] += 1
+
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(args.concurrency)))
+    return {"samples": samples, "statuses": statuses}
+
+
+def summarize(outcome: dict, args: argparse.Namespace) -> dict:
+    from benchmarks.report import latency_summary
+
+    operations = {}
+    all_samples = []
+    total_errors = 0
+    for name, samples in sorted(outcome["samples"].items()):
+        statuses = outcome["statuses"][name]
+        errors = sum(
+            count for status, count in statuses.items() if not status.startswith("2")
+        )
+        total_errors += errors
+        all_samples.extend(samples)
+        operations[name] = {
+            "count": len(samples),
+            "errors": errors,
+            "statuses": dict(statuses),
+            "throughput_rps": round(len(samples) / args.duration, 3),
+            "latency_ms": latency_summary(samples),
+        }
+    return {
+        "duration_seconds": args.duration,
+        "total_requests": len(all_samples),
+        "throughput_rps": round(len(all_samples) / args.duration, 3),
+        "error_rate": round(total_errors / len(all_samples), 5) if all_samples else None,
+        "latency_ms": latency_summary(all_samples),
+        "operations": operations,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+    import psutil
+    from app.api import api
+    from app.backend import services
+    from app.backend.fake_gemini import FAKE_AI_LATENCY
+    from app.backend.thumbnails import get_thumbnail_pool
+    from benchmarks import fakes
+    from benchmarks.report import latency_summary, run_metadata
+
+    rng = random.Random(args.seed)
+    supabase = fakes.FakeSupabase(
+        args.db_latency or fakes.FAKE_DB_LATENCY,
+        args.storage_latency or fakes.FAKE_STORAGE_LATENCY,
+        args.auth_latency or fakes.FAKE_AUTH_LATENCY,
+    )
+    chain = fakes.FakeChain(args.chain_latency or fakes.FAKE_CHAIN_LATENCY)
+    fakes.install_fakes(api, supabase, chain)
+    state = seed(supabase, chain, args, rng)
+    weights = parse_mix(args.mix)
+
+    process = psutil.Process()
+    stop = asyncio.Event()
+    memory_samples: list[int] = []
+    loop_lags: list[float] = []
+    rss_start = process.memory_info().rss
+    if args.tracemalloc:
+        tracemalloc.start()
+    samplers = [
+        asyncio.create_task(sample_memory(process, stop, memory_samples)),
+        asyncio.create_task(sample_loop_lag(stop, loop_lags)),
+    ]
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench.local", timeout=None
+    ) as client:
+        outcome = await drive(client, state, args, weights)
+    if services._background_tasks:
+        await asyncio.wait(services._background_tasks, timeout=30)
+    stop.set()
+    await asyncio.gather(*samplers)
+    tracemalloc_peak = None
+    if args.tracemalloc:
+        tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if get_thumbnail_pool.cache_info().currsize:
+        get_thumbnail_pool().shutdown()
+
+    results = run_metadata(
+        "load",
+        args.label,
+        {
+            "concurrency": args.concurrency,
+            "warmup_seconds": args.warmup,
+            "mix": weights,
+            "seed": args.seed,
+            "doctors": args.doctors,
+            "patients": args.patients,
+            "records": args.records,
+            "notes_per_patient": args.notes_per_patient,
+            "latency": {
+                "db": supabase.database.latency,
+                "storage": supabase.storage.latency,
+                "auth": supabase.auth.latency,
+                "chain": chain.latency,
+                "ai": FAKE_AI_LATENCY,
+            },
+        },
+    )
+    results.update(summarize(outcome, args))
+    megabyte = 1024 * 1024
+    results["memory_mb"] = {
+        "rss_start": round(rss_start / megabyte, 1),
+        "rss_peak": round(max(memory_samples, default=rss_start) / megabyte, 1),
+        "rss_end": round(process.memory_info().rss / megabyte, 1),
+        "tracemalloc_peak": round(tracemalloc_peak / megabyte, 1) if tracemalloc_peak else None,
+    }
+    results["event_loop_lag_ms"] = latency_summary(loop_lags)
+    results["fake_calls"] = {
+        "database": supabase.database.calls,
+        "storage_objects": len(supabase.storage.objects),
+    }
+    return results
+
+
+def print_summary(results: dict):
+    from benchmarks.report import format_table
+
+    rows = [
+        [
+            name,
+            op["count"],
+            op["errors"],
+            op["throughput_rps"],
+            op["latency_ms"]["p50"],
+            op["latency_ms"]["p95"],
+            op["latency_ms"]["p99"],
+        ]
+        for name, op in results["operations"].items()
+    ]
+    overall = results["latency_ms"]
+    rows.append(
+        [
+            "all",
+            results["total_requests"],
+            round((results["error_rate"] or 0) * results["total_requests"]),
+            results["throughput_rps"],
+            overall["p50"],
+            overall["p95"],
+            overall["p99"],
+        ]
+    )
+    headers = ["operation", "count", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms"]
+    print(format_table(headers, rows))
+    memory = results["memory_mb"]
+    print(
+        f"\nRSS {memory['rss_start']} -> peak {memory['rss_peak']} MB; "
+        f"event loop lag p99 {results['event_loop_lag_ms']['p99']} ms"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="End-to-end API load test against local fakes."
+    )
+    parser.add_argument("--label", default="local", help="Name stored with the results.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds first.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted operations, name=weight,...")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--notes-per-patient", type=int, default=20)
+    for service in ("db", "storage", "auth", "chain", "ai"):
+        parser.add_argument(
+            f"--{service}-latency",
+            help="Latency distribution, e.g. fixed:0.01, uniform:0.01,0.1 or "
+            "lognormal:<median>,<sigma>. Defaults to the FAKE_*_LATENCY settings.",
+        )
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap peak.")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with tempfile.TemporaryDirectory(prefix="arogyachain-bench-") as workdir:
+        configure_environment(args, workdir)
+        results = asyncio.run(run(args))
+    print_summary(results)
+    if not args.no_save:
+        from benchmarks.report import RESULTS_DIR, save_results
+
+        print(f"\nSaved {save_results(results, args.output_dir or RESULTS_DIR)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+import gc
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import tempfile
+from contextlib import ExitStack
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+# Micro-benchmarks for the CPU hot paths of a request, each next to the
+# alternatives worth considering:
+#   python -m benchmarks.micro                      # hash, qr and records groups
+#   python -m benchmarks.micro --group hash --full  # include the 500 MB inputs
+#   python -m benchmarks.micro --baseline benchmarks/results/micro-main-....json
+# With --baseline the run exits non-zero if any case regressed past --threshold.
+
+KIB = 1024
+MIB = 1024 * KIB
+HASH_SIZES = [10 * KIB, 1 * MIB, 32 * MIB, 128 * MIB]
+HASH_SIZES_FULL = HASH_SIZES + [500 * MIB]
+RECORD_ID_LENGTHS = [36, 128, 512]
+RECORD_COUNTS = [1, 100, 1000, 10000]
+RECORD_COUNTS_FULL = RECORD_COUNTS + [50000]
+GROUPS = ("hash", "qr", "records")
+
+
+class Case(NamedTuple):
+    group: str
+    param: str
+    name: str
+    func: Callable[[], object]
+    current: bool = False
+    bytes_per_call: int | None = None
+
+
+def _size_label(size: int) -> str:
+    return f"{size // MIB} MB" if size >= MIB else f"{size // KIB} KB"
+
+
+def _hash_chunks(path: str, chunk_size: int) -> str:
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+def _hash_readinto(path: str, chunk_size: int) -> str:
+    """Reuses one buffer instead of allocating a bytes object per chunk."""
+    sha256_hash = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as file:
+        while size := file.readinto(buffer):
+            sha256_hash.update(view[:size])
+    return sha256_hash.hexdigest()
+
+
+def _hash_file_digest(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def _write_random_file(path: str, size: int):
+    with open(path, "wb") as file:
+        for offset in range(0, size, 8 * MIB):
+            file.write(os.urandom(min(8 * MIB, size - offset)))
+
+
+def hash_cases(stack: ExitStack, full: bool) -> Iterator[Case]:
+    """Hashing an upload from memory or from its spooled file.
+
+    The app uses `calculate_file_hash` for bytes and `calculate_stream_hash` for
+    spooled files; both are compared with other chunk sizes, a reused read
+    buffer and `hashlib.file_digest`. Cases are generated one size at a time, so
+    only the input being measured is held in memory.
+    """
+    from app.backend.utils import calculate_file_hash, calculate_stream_hash
+
+    workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="arogyachain-micro-"))
+    for size in HASH_SIZES_FULL if full else HASH_SIZES:
+        path = os.path.join(workdir, f"{size}.bin")
+        _write_random_file(path, size)
+        with open(path, "rb") as file:
+            content = file.read()
+        param = _size_label(size)
+
+        def stream_hash(path=path):
+            with open(path, "rb") as file:
+                return calculate_stream_hash(file)
+
+        implementations = [
+            ("calculate_file_hash (bytes)", lambda content=content: calculate_file_hash(content)),
+            ("calculate_stream_hash (file, 1 MiB)", stream_hash),
+            ("file, 64 KiB chunks", lambda path=path: _hash_chunks(path, 64 * KIB)),
+            ("file, 8 MiB chunks", lambda path=path: _hash_chunks(path, 8 * MIB)),
+            ("file, readinto 1 MiB buffer", lambda path=path: _hash_readinto(path, MIB)),
+        ]
+        if hasattr(hashlib, "file_digest"):
+            implementations.append(
+                ("hashlib.file_digest", lambda path=path: _hash_file_digest(path))
+            )
+        for name, func in implementations:
+            yield Case("hash", param, name, func, name.startswith("calculate_"), size)
+        del content, implementations, func
+        os.remove(path)
+
+
+def _qr_code(record_id: str, tx_hash: str, box_size: int = 10):
+    import qrcode
+    from app.backend.utils import FRONTEND_URL
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(
+        json.dumps(
+            {
+                "record_id": record_id,
+                "tx_hash": tx_hash,
+                "verify_url": f"{FRONTEND_URL}/verify/{record_id}",
+            }
+        )
+    )
+    qr.make(fit=True)
+    return qr
+
+
+def _qr_png(record_id: str, tx_hash: str, box_size: int = 10, **save_options) -> bytes:
+    from io import BytesIO
+
+    output = BytesIO()
+    image = _qr_code(record_id, tx_hash, box_size).make_image(
+        fill_color="black", back_color="white"
+    )
+    image.save(output, format="PNG", **save_options)
+    return output.getvalue()
+
+
+def qr_cases(stack: ExitStack, full: bool) -> list[Case]:
+    """`generate_qr_code` for short and long record ids.
+
+    Compared with SVG output, faster PNG compression, a smaller raster, the bare
+    QR matrix (encoding without imaging) and a `render_qr_code` cache hit.
+    """
+    from app.backend.utils import FRONTEND_URL, generate_qr_code, render_qr_code
+
+    cases = []
+    tx_hash = "0x" + "ab" * 32
+    for length in RECORD_ID_LENGTHS:
+        record_id = (str(uuid.uuid4()) * (length // 36 + 1))[:length]
+        param = f"id {length} chars"
+        render_qr_code(record_id, tx_hash, "png")
+        implementations = [
+            (
+                "generate_qr_code png",
+                lambda r=record_id: generate_qr_code(r, tx_hash, FRONTEND_URL, "png"),
+            ),
+            (
+                "generate_qr_code svg",
+                lambda r=record_id: generate_qr_code(r, tx_hash, FRONTEND_URL, "svg"),
+            ),
+            ("png compress_level=1", lambda r=record_id: _qr_png(r, tx_hash, compress_level=1)),
+            ("png box_size=4", lambda r=record_id: _qr_png(r, tx_hash, box_size=4)),
+            ("matrix only (no image)", lambda r=record_id: _qr_code(r, tx_hash).get_matrix()),
+            ("render_qr_code cache hit", lambda r=record_id: render_qr_code(r, tx_hash, "png")),
+        ]
+        cases += [
+            Case("qr", param, name, func, name == "generate_qr_code png")
+            for name, func in implementations
+        ]
+    return cases
+
+
+def _record_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "patient_id": str(uuid.uuid4()),
+            "doctor_id": str(uuid.uuid4()),
+            "file_url": f"https://example.supabase.co/storage/v1/object/public/records/{index}.pdf",
+            "file_hash": hashlib.sha256(str(index).encode()).hexdigest(),
+            "tx_hash": "0x" + hashlib.sha256(str(-index).encode()).hexdigest(),
+            "notarization_status": "success",
+            "qr_url": None,
+            "thumbnail_url": None,
+            "preview_url": None,
+            "title": f"Lab report {index}",
+            "notes": "Routine blood work." if index % 2 else None,
+            "created_at": "2026-10-19T10:00:00.000000+00:00",
+        }
+        for index in range(count)
+    ]
+
+
+def _render_json(content) -> bytes:
+    # Same settings as starlette's JSONResponse.render.
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def records_cases(stack: ExitStack, full: bool) -> list[Case]:
+    """Serializing the `GET /api/records` response.
+
+    Today the service builds RecordResponse models, then FastAPI dumps them and
+    validates them again against `response_model` before encoding. The
+    alternatives validate once, or not at all, and let pydantic-core write JSON.
+    """
+    from pydantic import TypeAdapter
+    from app.backend.models import RecordResponse
+    from app.backend.services import record_response
+    from app.backend.utils import qr_code_url
+
+    adapter = TypeAdapter(list[RecordResponse])
+
+    def current(rows):
+        # What FastAPI's serialize_response does with a list of models.
+        models = [record_response(row) for row in rows]
+        content = [model.model_dump(by_alias=True) for model in models]
+        validated = adapter.validate_python(content)
+        return _render_json(adapter.dump_python(validated, mode="json"))
+
+    def dicts_then_response_model(rows):
+        content = [{**row, "qr_url": row["qr_url"] or qr_code_url(row["id"])} for row in rows]
+        validated = adapter.validate_python(content)
+        return _render_json(adapter.dump_python(validated, mode="json"))
+
+    def validate_once_dump_json(rows):
+        content = [{**row, "qr_url": row["qr_url"] or qr_code_url(row["id"])} for row in rows]
+        return adapter.dump_json(adapter.validate_python(content))
+
+    def construct_dump_json(rows):
+        models = [
+            RecordResponse.model_construct(
+                **{**row, "qr_url": row["qr_url"] or qr_code_url(row["id"])}
+            )
+            for row in rows
+        ]
+        return adapter.dump_json(models)
+
+    cases = []
+    for count in RECORD_COUNTS_FULL if full else RECORD_COUNTS:
+        rows = _record_rows(count)
+        param = f"{count} records"
+        implementations = [
+            ("models + response_model", current),
+            ("dicts + response_model", dicts_then_response_model),
+            ("validate once + dump_json", validate_once_dump_json),
+            ("model_construct + dump_json", construct_dump_json),
+        ]
+        cases += [
+            Case("records", param, name, lambda func=func, rows=rows: func(rows), func is current)
+            for name, func in implementations
+        ]
+    return cases
+
+
+CASE_BUILDERS = {"hash": hash_cases, "qr": qr_cases, "records": records_cases}
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> list[float]:
+    """Seconds per call for each of `repeat` batches, sized so a batch takes `min_time`."""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - started) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return timings
+
+
+def run_cases(cases: Iterable[Case], repeat: int, min_time: float) -> dict:
+    """Measures cases as they are produced, so builders can release inputs as they go."""
+    from benchmarks.report import latency_summary
+
+    operations = {}
+    current_p50 = {}
+    for case in cases:
+        timings = measure(case.func, repeat, min_time)
+        latency = latency_summary(timings, digits=6)
+        key = f"{case.group} | {case.param} | {case.name}"
+        operations[key] = {
+            "group": case.group,
+            "param": case.param,
+            "implementation": case.name,
+            "current": case.current,
+            "runs": len(timings),
+            "throughput_rps": round(1000 / latency["p50"], 3) if latency["p50"] else None,
+            "latency_ms": latency,
+            "mb_per_second": (
+                round(case.bytes_per_call / MIB / (latency["p50"] / 1000), 1)
+                if case.bytes_per_call
+                else None
+            ),
+        }
+        if case.current:
+            current_p50.setdefault((case.group, case.param), latency["p50"])
+        baseline = current_p50.get((case.group, case.param))
+        operations[key]["speedup_vs_current"] = (
+            round(baseline / latency["p50"], 2) if baseline and latency["p50"] else None
+        )
+        print(f"  {key}: {latency['p50']:.4f} ms", file=sys.stderr)
+    return operations
+
+
+def _format_ms(value: float) -> str:
+    return f"{value:.4f}" if value < 1 else f"{value:.1f}"
+
+
+def print_table(operations: dict):
+    from benchmarks.report import format_table
+
+    rows = [
+        [
+            op["group"],
+            op["param"],
+            op["implementation"] + (" *" if op["current"] else ""),
+            _format_ms(op["latency_ms"]["p50"]),
+            _format_ms(op["latency_ms"]["p95"]),
+            op["mb_per_second"] or "",
+            f"{op['speedup_vs_current']}x" if op["speedup_vs_current"] else "",
+        ]
+        for op in operations.values()
+    ]
+    print(
+        format_table(
+            ["group", "input", "implementation", "p50 ms", "p95 ms", "MB/s", "vs current"],
+            rows,
+        )
+    )
+    print("\n* implementation the app uses today")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for CPU hot paths.")
+    parser.add_argument("--label", default="local")
+    parser.add_argument(
+        "--group", default=",".join(GROUPS), help=f"Comma-separated: {', '.join(GROUPS)}."
+    )
+    parser.add_argument("--full", action="store_true", help="Include 500 MB and 50k inputs.")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Seconds per batch.")
+    parser.add_argument("--baseline", help="Earlier micro results file to check against.")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+    groups = [group.strip() for group in args.group.split(",") if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"Unknown group(s): {', '.join(sorted(unknown))}")
+
+    from benchmarks.report import (
+        RESULTS_DIR,
+        compare_operations,
+        format_table,
+        load_results,
+        run_metadata,
+        save_results,
+    )
+
+    with ExitStack() as stack:
+        cases = (case for group in groups for case in CASE_BUILDERS[group](stack, args.full))
+        operations = run_cases(cases, args.repeat, args.min_time)
+    results = run_metadata(
+        "micro",
+        args.label,
+        {"groups": groups, "full": args.full, "repeat": args.repeat, "min_time": args.min_time},
+    )
+    results["operations"] = operations
+    print_table(operations)
+    if not args.no_save:
+        print(f"\nSaved {save_results(results, args.output_dir or RESULTS_DIR)}")
+    if not args.baseline:
+        return 0
+    regressions = [
+        row
+        for row in compare_operations(load_results(args.baseline), results, args.threshold)
+        if row["regression"] and row["metric"] == "latency p50"
+    ]
+    if not regressions:
+        print(f"\nNo p50 regressions beyond {args.threshold:.0%} against {args.baseline}.")
+        return 0
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+    print(
+        format_table(
+            ["case", "baseline ms", "current ms", "change"],
+            [
+                [
+                    row["operation"],
+                    _format_ms(row["baseline"]),
+                    _format_ms(row["current"]),
+                    f"{row['change']:+.1%}",
+                ]
+                for row in regressions
+            ],
+        )
+    )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list, `q` in [0, 100]."""
+    if not sorted_values:
+        return math.nan
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+def latency_summary(seconds: list[float], digits: int = 3) -> dict:
+    """p50/p95/p99, mean and max of a list of durations, in milliseconds."""
+    values = sorted(seconds)
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    return {
+        "p50": round(percentile(values, 50) * 1000, digits),
+        "p95": round(percentile(values, 95) * 1000, digits),
+        "p99": round(percentile(values, 99) * 1000, digits),
+        "mean": round(sum(values) / len(values) * 1000, digits),
+        "max": round(values[-1] * 1000, digits),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(kind: str, label: str, config: dict) -> dict:
+    return {
+        "kind": kind,
+        "label": label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+    }
+
+
+def save_results(results: dict, output_dir: str = RESULTS_DIR) -> str:
+    """Writes one run to `<output_dir>/<kind>-<label>-<timestamp>.json` and returns the path."""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = results["timestamp"].replace(":", "").replace("-", "").split(".")[0]
+    path = os.path.join(output_dir, f"{results['kind']}-{results['label']}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump(results, results_file, indent=2, sort_keys=True)
+        results_file.write("\n")
+    return path
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as results_file:
+        return json.load(results_file)
+
+
+def compare_operations(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """Per-operation changes in p50/p95/p99 and throughput between two runs.
+
+    A row is a regression when latency grew, or throughput fell, by more than
+    `threshold` (a fraction, e.g. 0.1 for 10%).
+    """
+    rows = []
+    for name, current_op in current["operations"].items():
+        baseline_op = baseline["operations"].get(name)
+        if baseline_op is None:
+            continue
+        metrics = [
+            (f"latency {key}", baseline_op["latency_ms"][key], current_op["latency_ms"][key], 1)
+            for key in ("p50", "p95", "p99")
+        ]
+        metrics.append(
+            ("throughput", baseline_op["throughput_rps"], current_op["throughput_rps"], -1)
+        )
+        for metric, before, after, direction in metrics:
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            rows.append(
+                {
+                    "operation": name,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": change,
+                    "regression": change * direction > threshold,
+                }
+            )
+    return rows
+
+
+def format_table(headers: list[str], rows: list[list]) -> str:
+    widths = [
+        max(len(str(cell)) for cell in [header, *column])
+        for header, column in zip(headers, zip(*rows) if rows else [[]] * len(headers))
+    ]
+    lines = ["  ".join(str(cell).ljust(width) for cell, width in zip(headers, widths))]
+    lines.append("  ".join("-" * width for width in widths))
+    for row in rows:
+        lines.append("  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)))
+    return "\n".join(lines)
@@ -0,0 +1,81 @@
+-- Full-text search over records (title, notes) and patient notes (title, content).
+-- The 'simple' configuration keeps drug names and abbreviations unstemmed.
+
+alter table public.records
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+    ) stored;
+
+alter table public.notes
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+    ) stored;
+
+create index if not exists records_search_vector_idx on public.records using gin (search_vector);
+create index if not exists notes_search_vector_idx on public.notes using gin (search_vector);
+create index if not exists records_patient_id_idx on public.records (patient_id);
+create index if not exists records_doctor_id_idx on public.records (doctor_id);
+create index if not exists notes_patient_id_idx on public.notes (patient_id);
+
+-- Ranked, paginated search scoped to the caller. Headlines are only computed
+-- for the returned page, not for every match.
+create or replace function public.search_user_content(
+    p_query text,
+    p_user_id uuid,
+    p_role text,
+    p_limit int default 20,
+    p_offset int default 0
+)
+returns table (
+    kind text,
+    id uuid,
+    title text,
+    snippet text,
+    rank real,
+    created_at timestamptz
+)
+language sql
+stable
+as $$
+    with q as (
+        select to_tsquery('simple', p_query) as tsq
+    ),
+    hits as (
+        select 'record'::text as kind, r.id, ts_rank_cd(r.search_vector, q.tsq) as rank, r.created_at
+        from public.records r, q
+        where r.search_vector @@ q.tsq
+          and (
+              (p_role = 'patient' and r.patient_id = p_user_id)
+              or (p_role = 'doctor' and r.doctor_id = p_user_id)
+          )
+        union all
+        select 'note'::text, n.id, ts_rank_cd(n.search_vector, q.tsq), n.created_at
+        from public.notes n, q
+        where p_role = 'patient'
+          and n.patient_id = p_user_id
+          and n.search_vector @@ q.tsq
+        order by rank desc, created_at desc
+        limit p_limit offset p_offset
+    )
+    select
+        h.kind,
+        h.id,
+        coalesce(r.title, n.title) as title,
+        ts_headline(
+            'simple',
+            coalesce(r.notes, n.content, ''),
+            q.tsq,
+            'StartSel=, StopSel=, MaxFragments=1, MaxWords=20, MinWords=5'
+        ) as snippet,
+        h.rank,
+        h.created_at
+    from hits h
+    cross join q
+    left join public.records r on h.kind = 'record' and r.id = h.id
+    left join public.notes n on h.kind = 'note' and n.id = h.id
+    order by h.rank desc, h.created_at desc;
+$$;
@@ -0,0 +1,12 @@
+-- Small WebP renditions generated in the background after upload. Paths in the
+-- thumbnails bucket are derived from file_hash, so identical files share them.
+
+alter table public.records
+    add column if not exists thumbnail_url text,
+    add column if not exists preview_url text;
+
+create index if not exists records_file_hash_idx on public.records (file_hash);
+
+insert into storage.buckets (id, name, public)
+values ('thumbnails', 'thumbnails', true)
+on conflict (id) do nothing;
@@ -0,0 +1,11 @@
+-- Summary projection for the notes list: a short preview and the body size are
+-- computed once on write so list queries never read the full content column.
+
+alter table public.notes
+    add column if not exists content_preview text
+        generated always as (left(content, 200)) stored,
+    add column if not exists content_bytes integer
+        generated always as (octet_length(content)) stored;
+
+create index if not exists notes_patient_updated_idx
+    on public.notes (patient_id, updated_at desc);
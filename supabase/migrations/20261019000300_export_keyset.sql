@@ -0,0 +1,5 @@
+-- Keyset pagination for bulk export: each page is `owner = $1 and id > $2
+-- order by id limit n`, served straight from these indexes.
+
+create index if not exists notes_patient_id_id_idx on public.notes (patient_id, id);
+create index if not exists records_patient_id_id_idx on public.records (patient_id, id);
@@ -0,0 +1,19 @@
+-- Raw AI assistant usage events, flushed in batches by each API worker.
+-- kind = 'lookup' (one per medicine answered, with its source) or
+-- 'upstream' (one per Gemini call, with token counts and latency).
+
+create table if not exists public.ai_usage (
+    id bigint generated always as identity primary key,
+    created_at timestamptz not null default now(),
+    kind text not null,
+    user_id uuid references public.users (id) on delete set null,
+    medicine text,
+    source text,
+    prompt_tokens int not null default 0,
+    response_tokens int not null default 0,
+    latency_ms int not null default 0,
+    ok boolean not null default true
+);
+
+create index if not exists ai_usage_created_at_idx on public.ai_usage (created_at);
+create index if not exists ai_usage_user_id_idx on public.ai_usage (user_id, created_at);
@@ -0,0 +1,3 @@
+-- Finalizing a direct upload looks up an existing record for the stored object
+-- first, so a retried finalize returns it instead of inserting a duplicate.
+create index if not exists records_file_url_idx on public.records (file_url);
@@ -0,0 +1,5 @@
+-- One record per stored object. create_record inserts with
+-- ON CONFLICT (file_url) DO NOTHING, so concurrent finalizes of the same upload
+-- cannot both insert, and the hash is notarized once.
+create unique index if not exists records_file_url_key on public.records (file_url);
+drop index if exists records_file_url_idx;
@@ -0,0 +1,43 @@
+import pytest
+from app.backend.ai_cache import normalize_medicine_name
+
+
+@pytest.mark.parametrize(
+    "medicine_name, cache_key",
+    [
+        ("Metformin  HCl", "metformin"),
+        ("metformin hydrochloride", "metformin"),
+        ("Amlodipine Besylate", "amlodipine"),
+        ("levothyroxine sodium", "levothyroxine"),
+        ("atorvastatin calcium", "atorvastatin"),
+        ("Paracetamol", "paracetamol"),
+    ],
+)
+def test_salt_suffix_is_dropped_from_drug_names(medicine_name, cache_key):
+    assert normalize_medicine_name(medicine_name) == cache_key
+
+
+@pytest.mark.parametrize(
+    "medicine_name",
+    [
+        "magnesium sulfate",
+        "magnesium citrate",
+        "potassium citrate",
+        "potassium phosphate",
+        "zinc acetate",
+        "zinc sulfate",
+        "calcium acetate",
+        "sodium citrate",
+        "ferrous sulfate",
+    ],
+)
+def test_mineral_salts_keep_their_full_name(medicine_name):
+    assert normalize_medicine_name(medicine_name) == medicine_name
+
+
+def test_distinct_mineral_salts_get_distinct_keys():
+    keys = {
+        normalize_medicine_name(name)
+        for name in ("magnesium sulfate", "magnesium citrate", "magnesium")
+    }
+    assert len(keys) == 3
@@ -0,0 +1,69 @@
+import json
+import pytest
+from pydantic import BaseModel
+from app.backend.ai_stream import ArrayItemStreamParser, sse_event
+
+
+class Alternative(BaseModel):
+    name: str
+    price_range: str
+
+
+DOCUMENT = json.dumps(
+    {
+        "medicine_name": "Metformin",
+        "generic_alternatives": [
+            {"name": "Glycomet", "price_range": "$1-$2"},
+            {"name": "Obimet {SR}", "price_range": "$2-$3"},
+            {"name": 'Gluformin "XL"', "price_range": "$3]"},
+        ],
+        "notes": "Take with food.",
+    }
+)
+
+
+def names(items):
+    return [item.name for item in items]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(DOCUMENT)])
+def test_items_are_parsed_whatever_the_chunking(chunk_size):
+    parser = ArrayItemStreamParser("generic_alternatives", Alternative)
+    items = []
+    for start in range(0, len(DOCUMENT), chunk_size):
+        items += parser.feed(DOCUMENT[start : start + chunk_size])
+    assert names(items) == ["Glycomet", "Obimet {SR}", 'Gluformin "XL"']
+
+
+def test_each_item_is_returned_as_soon_as_it_closes():
+    parser = ArrayItemStreamParser("generic_alternatives", Alternative)
+    first_item_end = DOCUMENT.index("}") + 1
+    assert names(parser.feed(DOCUMENT[: first_item_end - 1])) == []
+    assert names(parser.feed(DOCUMENT[first_item_end - 1 : first_item_end])) == ["Glycomet"]
+
+
+def test_nothing_is_returned_after_the_array_closes():
+    parser = ArrayItemStreamParser("generic_alternatives", Alternative)
+    parser.feed(DOCUMENT)
+    assert parser.feed('{"name": "Late", "price_range": "$1"}]') == []
+
+
+def test_malformed_items_are_skipped():
+    parser = ArrayItemStreamParser("generic_alternatives", Alternative)
+    items = parser.feed(
+        '{"generic_alternatives": [{"name": "Glycomet"}, {"name": "Obimet", "price_range": "$2"}]}'
+    )
+    assert names(items) == ["Obimet"]
+
+
+def test_other_arrays_before_the_key_are_ignored():
+    parser = ArrayItemStreamParser("generic_alternatives", Alternative)
+    items = parser.feed(
+        '{"other": [{"name": "Wrong", "price_range": "$0"}], '
+        '"generic_alternatives": [{"name": "Glycomet", "price_range": "$1"}]}'
+    )
+    assert names(items) == ["Glycomet"]
+
+
+def test_sse_event_format():
+    assert sse_event("item", {"name": "Glycomet"}) == b'event: item\ndata: {"name":"Glycomet"}\n\n'
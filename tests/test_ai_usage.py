@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+import pytest
+from app.backend import ai_usage
+from app.backend.ai_usage import SlidingWindowQuota
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(ai_usage, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_requests_within_the_limit_are_allowed(clock):
+    quota = SlidingWindowQuota(limit=3, window_seconds=60)
+    assert [quota.consume("patient-1") for _ in range(3)] == [None, None, None]
+
+
+def test_request_over_the_limit_waits_for_the_oldest_to_expire(clock):
+    quota = SlidingWindowQuota(limit=2, window_seconds=60)
+    quota.consume("patient-1")
+    clock.value += 20
+    quota.consume("patient-1")
+    clock.value += 10
+    assert quota.consume("patient-1") == pytest.approx(30)
+
+
+def test_window_slides_instead_of_resetting(clock):
+    quota = SlidingWindowQuota(limit=2, window_seconds=60)
+    quota.consume("patient-1")
+    clock.value += 30
+    quota.consume("patient-1")
+    clock.value += 30
+    assert quota.consume("patient-1") is None
+    assert quota.consume("patient-1") == pytest.approx(30)
+
+
+def test_users_have_separate_quotas(clock):
+    quota = SlidingWindowQuota(limit=1, window_seconds=60)
+    assert quota.consume("patient-1") is None
+    assert quota.consume("patient-2") is None
+    assert quota.consume("patient-1") is not None
+
+
+def test_rejected_requests_do_not_use_quota(clock):
+    quota = SlidingWindowQuota(limit=1, window_seconds=60)
+    quota.consume("patient-1")
+    for _ in range(5):
+        quota.consume("patient-1")
+    clock.value += 60
+    assert quota.consume("patient-1") is None
+
+
+def test_cost_above_the_limit_waits_a_full_window(clock):
+    quota = SlidingWindowQuota(limit=3, window_seconds=60)
+    assert quota.consume("patient-1", cost=4) == 60
+    assert quota.consume("patient-1", cost=3) is None
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from app.backend.coalesce import SingleFlight
+
+
+def test_concurrent_calls_for_a_key_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def lookup():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "metformin"
+
+        results = await asyncio.gather(*(flights.do("metformin", lookup) for _ in range(5)))
+        return calls, results, flights.in_flight()
+
+    calls, results, in_flight = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["metformin"] * 5
+    assert in_flight == 0
+
+
+def test_different_keys_are_not_coalesced():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def lookup(name):
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            return name
+
+        await asyncio.gather(
+            flights.do("metformin", lambda: lookup("metformin")),
+            flights.do("amlodipine", lambda: lookup("amlodipine")),
+        )
+        return calls
+
+    assert sorted(asyncio.run(scenario())) == ["amlodipine", "metformin"]
+
+
+def test_every_caller_gets_the_shared_exception():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def lookup():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        return await asyncio.gather(
+            *(flights.do("metformin", lookup) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_one_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def lookup():
+            await asyncio.sleep(0.05)
+            return "metformin"
+
+        first = asyncio.ensure_future(flights.do("metformin", lookup))
+        second = asyncio.ensure_future(flights.do("metformin", lookup))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first
+
+    result, first = asyncio.run(scenario())
+    assert result == "metformin"
+    assert first.cancelled()
+
+
+def test_shared_call_is_cancelled_once_every_caller_is_gone():
+    async def scenario():
+        flights = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def lookup():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flights.do("metformin", lookup)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        return flights.in_flight()
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_a_finished_key_starts_a_new_call():
+    async def scenario():
+        flights = SingleFlight()
+        calls = 0
+
+        async def lookup():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        return [await flights.do("metformin", lookup) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+@pytest.mark.parametrize("callers", [1, 10])
+def test_in_flight_counts_keys_not_callers(callers):
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def lookup():
+            await release.wait()
+
+        tasks = [asyncio.ensure_future(flights.do("metformin", lookup)) for _ in range(callers)]
+        await asyncio.sleep(0)
+        in_flight = flights.in_flight()
+        release.set()
+        await asyncio.gather(*tasks)
+        return in_flight
+
+    assert asyncio.run(scenario()) == 1
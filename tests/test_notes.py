@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.backend import services
+from app.backend.models import NotePatch, NoteResponse, NoteUpdate, TextEdit
+from app.backend.utils import apply_text_edits, diff_text
+from benchmarks.fakes import FakeDatabase
+
+PATIENT = {"id": "patient-1", "role": "patient"}
+VERSION = "2026-10-01T09:00:00+00:00"
+
+
+@pytest.fixture
+def supabase():
+    database = FakeDatabase(latency="fixed:0")
+    database.load(
+        "notes",
+        [
+            {
+                "id": "note-1",
+                "patient_id": PATIENT["id"],
+                "title": "Dosage",
+                "content": "Take one tablet daily.",
+                "created_at": VERSION,
+                "updated_at": VERSION,
+            }
+        ],
+    )
+    return database
+
+
+@pytest.mark.parametrize("header_prefix", ["", "W/"])
+def test_etag_round_trips_through_if_match(header_prefix):
+    note = NoteResponse(
+        id="note-1",
+        patient_id=PATIENT["id"],
+        title="Dosage",
+        content="",
+        created_at=VERSION,
+        updated_at=VERSION,
+    )
+    if_match = header_prefix + services.note_etag(note)
+    assert services.parse_if_match(if_match) == VERSION
+
+
+@pytest.mark.parametrize("if_match", [None, "", "*"])
+def test_wildcard_or_missing_if_match_has_no_version(if_match):
+    assert services.parse_if_match(if_match) is None
+
+
+def test_update_with_stale_if_match_conflicts(supabase):
+    note_in = NoteUpdate(title="Dosage", content="Stop.")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(
+            services.update_note(
+                supabase, PATIENT, "note-1", note_in, "2026-09-01T00:00:00+00:00"
+            )
+        )
+    assert error.value.status_code == 409
+
+
+def test_update_of_missing_note_is_not_found(supabase):
+    note_in = NoteUpdate(title="Dosage", content="Stop.")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(services.update_note(supabase, PATIENT, "note-2", note_in, VERSION))
+    assert error.value.status_code == 404
+
+
+def test_update_at_the_current_version_moves_the_etag(supabase):
+    note_in = NoteUpdate(title="Dosage", content="Stop.")
+    note = asyncio.run(services.update_note(supabase, PATIENT, "note-1", note_in, VERSION))
+    assert note.content == "Stop."
+    assert services.parse_if_match(services.note_etag(note)) != VERSION
+
+
+def test_text_edits_apply_against_original_offsets():
+    edits = [TextEdit(start=16, end=21, text="twice"), TextEdit(start=5, end=8, text="two")]
+    assert apply_text_edits("Take one tablet daily.", edits) == "Take two tablet twice."
+
+
+@pytest.mark.parametrize(
+    "edits",
+    [
+        [TextEdit(start=20, end=30, text="x")],
+        [TextEdit(start=5, end=3, text="x")],
+        [TextEdit(start=0, end=6, text="x"), TextEdit(start=4, end=8, text="y")],
+    ],
+)
+def test_out_of_range_or_overlapping_edits_are_rejected(edits):
+    with pytest.raises(ValueError):
+        apply_text_edits("Take one tablet daily.", edits)
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("Take one tablet daily.", "Take two tablets daily."),
+        ("Take one tablet daily.", "Take one tablet daily with food."),
+        ("Take one tablet daily.", "one tablet daily."),
+        ("", "New note"),
+        ("aaa", "aa"),
+    ],
+)
+def test_diff_text_edits_reproduce_the_new_text(old, new):
+    edits = [TextEdit(**edit) for edit in diff_text(old, new)]
+    assert apply_text_edits(old, edits) == new
+
+
+def test_diff_text_covers_only_the_changed_span():
+    assert diff_text("Take one tablet daily.", "Take two tablet daily.") == [
+        {"start": 5, "end": 8, "text": "two"}
+    ]
+    assert diff_text("unchanged", "unchanged") == []
+
+
+def test_patch_applies_content_edits_at_the_current_version(supabase):
+    patch = NotePatch(content_edits=[TextEdit(start=5, end=8, text="two")])
+    note = asyncio.run(services.patch_note(supabase, PATIENT, "note-1", patch, VERSION))
+    assert note.content == "Take two tablet daily."
+    assert note.updated_at != VERSION
+
+
+def test_patch_with_stale_if_match_conflicts(supabase):
+    patch = NotePatch(content_edits=[TextEdit(start=5, end=8, text="two")])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(
+            services.patch_note(supabase, PATIENT, "note-1", patch, "2026-09-01T00:00:00+00:00")
+        )
+    assert error.value.status_code == 409
+    assert supabase.rows("notes")[0]["content"] == "Take one tablet daily."
+
+
+def test_patch_edits_without_if_match_require_a_precondition(supabase):
+    patch = NotePatch(content_edits=[TextEdit(start=5, end=8, text="two")])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(services.patch_note(supabase, PATIENT, "note-1", patch))
+    assert error.value.status_code == 428
+
+
+def test_patch_with_out_of_range_edit_is_unprocessable(supabase):
+    patch = NotePatch(content_edits=[TextEdit(start=0, end=100, text="x")])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(services.patch_note(supabase, PATIENT, "note-1", patch, VERSION))
+    assert error.value.status_code == 422